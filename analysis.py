@@ -1,12 +1,56 @@
-import pandas as pd
+from __future__ import annotations
+import numpy as np
+import itertools
+import json
 import math
-from util import getMatchupCSVPath, getSynergyCSVPath, cleanString
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import global_logger
+from config import SCORING_MODES, config
+from data_store import ChampTable, table_cache
+from global_logger import metrics, show
+from snapshot_store import loadSnapshots
+from typing import TYPE_CHECKING
+from util import cleanString, ROLES, champ_pool
+
+# pandas is only needed to display bestPick's tables, and costs more to import
+# than scoring a draft, so it's imported where it's used
+if TYPE_CHECKING:
+    import pandas as pd
+
+MIN_GAMES = 33
+
+# SCORING_MODES (checked against the config by config.loadConfig):
+# "cutoff": matchups under MIN_GAMES games count as wr=50, delta=0
+# "shrinkage": every matchup is pulled toward wr=50, delta=0 by its sample size
+# Games the prior is worth, a matchup with this many games lands halfway
+PRIOR_GAMES = 100
+# Opponents picked less often than this (pr, %) get a stronger prior, up to
+# MAX_PRIOR_SCALE times PRIOR_GAMES, as their few games are the noisiest
+PRIOR_PR = 1.0
+MAX_PRIOR_SCALE = 4.0
+
+# Weight of a matchup/synergy score by role, ROLE_SCALING[my_role][other_role]
+# with both indexed in ROLES order (top, jungle, middle, bottom, support)
+ROLE_SCALING = [
+    [1.00, 0.50, 0.33, 0.25, 0.25],  # top
+    [0.35, 1.00, 0.50, 0.25, 0.35],  # jungle
+    [0.10, 0.35, 1.00, 0.10, 0.25],  # middle
+    [0.10, 0.50, 0.33, 1.00, 1.00],  # bottom
+    [0.30, 0.65, 0.50, 1.00, 1.00],  # support
+]
+ROLE_SCALING_MATRIX = np.array(ROLE_SCALING)
+ROLE_INDEX = {role: idx for idx, role in enumerate(ROLES)}
 
 
 def sigmoid(x):
     return 1 / (1 + math.exp(-x))
 
 
+def sigmoidArray(x: np.ndarray):
+    return 1 / (1 + np.exp(-x))
+
+
 def removeUnavailableChampions(
     my_role_pool: list[str],
     bans: list[str],
@@ -41,21 +85,20 @@ def cleanChampNamesList(
     return cleaned
 
 
-def matchupExists(matchup_df, my_champ, other_champ, role):
-    matchup_exists = matchup_df.shape[0] != 0
+def matchupExists(found, my_champ, other_champ, role):
+    matchup_exists = bool(found)
     if not matchup_exists:
-        print(
+        show(
             f"Matchup not found: {my_champ.capitalize()} vs "
             + f"{other_champ.capitalize()} {role}"
         )
     return matchup_exists
 
 
-def sufficientGames(matchup_df, my_champ, other_champ, role):
-    num_games = matchup_df.loc[0]["games"]
-    sufficient_quantity = num_games >= 33
+def sufficientGames(num_games, my_champ, other_champ, role):
+    sufficient_quantity = num_games >= MIN_GAMES
     if not sufficient_quantity:
-        print(
+        show(
             f"Insufficent matchup games({num_games}): "
             + f"{my_champ.capitalize()} vs {other_champ.capitalize()}"
             + f" {role}"
@@ -63,92 +106,371 @@ def sufficientGames(matchup_df, my_champ, other_champ, role):
     return sufficient_quantity
 
 
-def filtedValidMatches(all_entries_df, team, my_champ, my_role):
-    valid_entries = []
-    for role, champ in team.items():
-        # Skip unitialized entries
-        if champ == None or champ == "":
-            continue
+def teamSlots(team: dict[str, str]):
+    """(role, champ) of every filled slot of a team, in role order"""
+    # Skip unitialized entries
+    return [(role, champ) for role, champ in team.items() if champ != None and champ != ""]
+
+
+def gatherPoolStats(tables: list[ChampTable], slots: list[tuple[str, str]], scoring: str = None):
+    """
+    Pulls the stats of every slot out of every table into (len(tables), len(slots))
+      arrays. Slots without a matchup get wr=50, delta=0, as do slots with too
+      few games when scoring is "cutoff". With "shrinkage" the stats come from
+      shrunkStats instead.
+
+    Returns:
+      (dict[str, np.ndarray]) "wr", "delta1", "delta2", "games" and "found"
+    """
+    shrinkage = (config["scoring"] if scoring is None else scoring) == "shrinkage"
+    shape = (len(tables), len(slots))
+    pool_stats = {
+        "wr": np.full(shape, 50.0),
+        "delta1": np.zeros(shape),
+        "delta2": np.zeros(shape),
+        "games": np.zeros(shape, dtype=np.int64),
+        "found": np.zeros(shape, dtype=bool),
+    }
+    for table_num, table in enumerate(tables):
+        stats = table.stats
+        values = shrunkStats(table) if shrinkage else stats
+        for slot_num, (role, champ) in enumerate(slots):
+            # Try to pull matchup data from table (O(1) through the table's (role, champ) index)
+            row = table.lookup(role, champ)
+            if row is None:
+                continue
+            num_games = stats["games"][row]
+            pool_stats["found"][table_num, slot_num] = True
+            pool_stats["games"][table_num, slot_num] = num_games
+            if shrinkage or num_games >= MIN_GAMES:
+                pool_stats["wr"][table_num, slot_num] = values["wr"][row]
+                pool_stats["delta1"][table_num, slot_num] = values["delta1"][row]
+                pool_stats["delta2"][table_num, slot_num] = values["delta2"][row]
+    return pool_stats
+
+
+def shrinkStats(wr, delta1, delta2, games, pr):
+    """
+    Bayesian shrinkage of the stats toward the prior wr=50, delta=0: each is
+      averaged with the prior, weighted games : prior games. Works on arrays
+      of any shape.
+
+    Returns:
+      (dict[str, np.ndarray]) shrunk "wr", "delta1", "delta2"
+    """
+    games = np.asarray(games, dtype=np.float64)
+    prior_scale = np.clip(PRIOR_PR / np.maximum(pr, 1e-9), 1.0, MAX_PRIOR_SCALE)
+    weight = games / (games + PRIOR_GAMES * prior_scale)
+    return {
+        "wr": 50.0 + weight * (np.asarray(wr) - 50.0),
+        "delta1": weight * delta1,
+        "delta2": weight * delta2,
+    }
+
+
+def shrunkStats(table: ChampTable):
+    """shrinkStats of a whole table, computed on first use and kept with the table"""
+    shrunk = table.derived.get("shrinkage")
+    if shrunk is None:
+        stats = table.stats
+        shrunk = shrinkStats(stats["wr"], stats["delta1"], stats["delta2"], stats["games"], stats["pr"])
+        table.derived["shrinkage"] = shrunk
+    return shrunk
+
+
+def reportMissing(my_champ, slots, found, games, scoring: str = None):
+    """Prints the slots that fell back to wr=50, delta=0 for my_champ"""
+    scoring = config["scoring"] if scoring is None else scoring
+    for (role, champ), slot_found, num_games in zip(slots, found, games):
+        # Shrinkage uses every row, however few its games
+        if matchupExists(slot_found, my_champ, champ, role) and scoring == "cutoff":
+            sufficientGames(num_games, my_champ, champ, role)
+
+
+class SlotRecord:
+    """One pool champion scored against one draft slot"""
+
+    __slots__ = ("my_champ", "champ", "role", "score1", "score2", "wr", "delta1", "delta2")
+
+    def __init__(self, my_champ, champ, role, score1, score2, wr, delta1, delta2):
+        self.my_champ = my_champ
+        self.champ = champ
+        self.role = role
+        self.score1 = score1
+        self.score2 = score2
+        self.wr = wr
+        self.delta1 = delta1
+        self.delta2 = delta2
+
+    def __repr__(self):
+        return (
+            f"SlotRecord({self.my_champ} and {self.champ} {self.role}: "
+            + f"score1={self.score1}, score2={self.score2}, wr={self.wr}, "
+            + f"delta1={self.delta1}, delta2={self.delta2})"
+        )
 
-        # Try to pull matchup data from table
-        matchup_df = getWithChampDf(all_entries_df, champ, role)
 
-        if not matchupExists(matchup_df, my_champ, champ, role) or not sufficientGames(
-            matchup_df, my_champ, champ, role
-        ):
-            wr = 50.0
-            delta1 = 0.00
-            delta2 = 0.00
-        else:
-            wr = matchup_df.loc[0]["wr"]
-            delta1 = matchup_df.loc[0]["delta1"]
-            delta2 = matchup_df.loc[0]["delta2"]
+def filtedValidMatches(all_entries: ChampTable, team, my_champ, my_role, scoring: str = None):
+    """
+    Scores one champion's table against every filled slot of a team
+
+    Returns:
+      (list[SlotRecord]) one per slot, in ROLES order
+    """
+    slots = teamSlots(team)
+    pool_stats = gatherPoolStats([all_entries], slots, scoring)
+    reportMissing(my_champ, slots, pool_stats["found"][0], pool_stats["games"][0], scoring)
+
+    slot_roles = slotRoleIndices(slots)
+    scores1 = calcScores(my_role, slot_roles, pool_stats["delta1"][0])
+    scores2 = calcScores(my_role, slot_roles, pool_stats["delta2"][0])
+    return slotRecords(
+        my_champ,
+        slots,
+        scores1,
+        scores2,
+        pool_stats["wr"][0],
+        pool_stats["delta1"][0],
+        pool_stats["delta2"][0],
+    )
 
-        score1 = calcScore(my_role, role, delta1)
-        score2 = calcScore(my_role, role, delta2)
-        valid_entries.append([my_champ, "and", champ, role, score1, score2, wr, delta1, delta2])
-    return valid_entries
 
+def slotRecords(my_champ: str, slots: list[tuple[str, str]], scores1, scores2, wr, delta1, delta2):
+    """
+    One champion's row of the (pool champ x slot) arrays as records
+
+    Returns:
+      (list[SlotRecord]) one per slot, in the order of slots
+    """
+    return [
+        SlotRecord(
+            my_champ,
+            champ,
+            role,
+            scores1[slot_num],
+            scores2[slot_num],
+            wr[slot_num],
+            delta1[slot_num],
+            delta2[slot_num],
+        )
+        for slot_num, (role, champ) in enumerate(slots)
+    ]
 
-def bestPick(
-    my_role: str,
+
+def slotTable(records: list[SlotRecord]):
+    """bestPick's per-champion table of its slot records, only built for display"""
+    import pandas as pd
+
+    columns = ["", "", "", "", "score1", "score2", "wr", "delta1", "delta2"]
+    return pd.DataFrame(
+        {
+            0: [record.my_champ for record in records],
+            1: ["and"] * len(records),
+            2: [record.champ for record in records],
+            3: [record.role for record in records],
+            4: [record.score1 for record in records],
+            5: [record.score2 for record in records],
+            6: [record.wr for record in records],
+            7: [record.delta1 for record in records],
+            8: [record.delta2 for record in records],
+        }
+    ).set_axis(columns, axis=1)
+
+
+def summaryTable(my_champs: list[str], pool_scores: dict):
+    """
+    bestPick's summary, one row per pool champion straight from scorePool's
+      arrays. The index counts down from the first champion, as it always has.
+    """
+    import pandas as pd
+
+    summary_columns = {
+        "my_champ": my_champs,
+        "sc1": pool_scores["sc1"],
+        "sc2": pool_scores["sc2"],
+        "∑sc": pool_scores["sum"],
+        "wr": pool_scores["wr"],
+        "Δ1": pool_scores["delta1"],
+        "Δ2": pool_scores["delta2"],
+    }
+    return pd.DataFrame(summary_columns, index=range(len(my_champs) - 1, -1, -1))
+
+
+def prepareDraft(
+    my_role_pool: list[str],
     bans: list[str],
-    my_pool: dict[str, list[str]],
     enemy_team: dict[str, str],
     ally_team: dict[str, str],
 ):
-    summary_columns = [
-        "my_champ",
-        "sc1",
-        "sc2",
-        "∑sc",
-        "wr",
-        "Δ1",
-        "Δ2",
-    ]
-    summarized = pd.DataFrame(columns=summary_columns)
+    """
+    Cleans every name in the draft and drops unavailable pool champions
 
-    my_pool[my_role] = cleanChampNamesList(my_pool[my_role])
+    Returns:
+      (tuple) available pool champions, cleaned enemy team, cleaned ally team
+    """
+    my_role_pool = cleanChampNamesList(my_role_pool)
     bans = cleanChampNamesList(bans)
     enemy_team = cleanChampNamesDict(enemy_team)
     ally_team = cleanChampNamesDict(ally_team)
 
-    my_pool[my_role] = removeUnavailableChampions(
-        my_pool[my_role],
+    my_role_pool = removeUnavailableChampions(
+        my_role_pool,
         bans,
         list(enemy_team.values()),
         list(ally_team.values()),
     )
+    return my_role_pool, enemy_team, ally_team
 
-    for my_champ in my_pool[my_role]:
-        skipped = 0
-        print("\n" + my_champ.upper() + " " + my_role.upper())
-        # MATCHUPS -------------------------------------------------------------------------------
-        all_matchups_df = pd.read_csv(getMatchupCSVPath(my_role, my_champ))
-        game_matchups = filtedValidMatches(all_matchups_df, enemy_team, my_champ, my_role)
-
-        # SYNERGIES ------------------------------------------------------------------------------
-        all_synergies_df = pd.read_csv(getSynergyCSVPath(my_role, my_champ))
-        game_synergies = filtedValidMatches(all_synergies_df, ally_team, my_champ, my_role)
-
-        columns = ["", "", "", "", "score1", "score2", "wr", "delta1", "delta2"]
-        print(f"Matchup Data {'-'*60}")
-        matchups_df = pd.DataFrame(game_matchups, columns=columns)
-        print(matchups_df)
-        print(f"Synergy Data {'-'*60}")
-        synergies_df = pd.DataFrame(game_synergies, columns=columns)
-        print(synergies_df)
-
-        total_score1 = pd.concat([matchups_df["score1"], synergies_df["score1"]]).sum()
-        total_score2 = pd.concat([matchups_df["score2"], synergies_df["score2"]]).sum()
-        total_score_sum = pd.concat([matchups_df["score1"], synergies_df["score1"], matchups_df["score2"], synergies_df["score2"]]).sum()
-        mean_wr = pd.concat([matchups_df["wr"], synergies_df["wr"]]).mean()
-        mean_delta1 = pd.concat([matchups_df["delta1"], synergies_df["delta1"]]).mean()
-        mean_delta2 = pd.concat([matchups_df["delta2"], synergies_df["delta2"]]).mean()
-        row = [my_champ, total_score1, total_score2, total_score_sum, mean_wr, mean_delta1, mean_delta2]
-        summarized.loc[-1] = row  # adding a row
-        summarized.index = summarized.index + 1  # shifting index
 
+def scorePool(
+    my_role: str,
+    matchup_tables: list[ChampTable],
+    synergy_tables: list[ChampTable],
+    enemy_team: dict[str, str],
+    ally_team: dict[str, str],
+    scoring: str = None,
+):
+    """
+    Scores every pool champion (one matchup and synergy table each) against
+      every filled slot of the draft, scoring as in SCORING_MODES (the config's
+      by default)
+
+    Returns:
+      (dict) "slots" (enemy slots then ally slots), "num_enemy", "stats"
+          (gatherPoolStats arrays), per slot "scores1"/"scores2" and per
+          champion "sc1", "sc2", "sum", "wr", "delta1", "delta2"
+    """
+    # MATCHUPS (vs enemy slots) then SYNERGIES (with ally slots), as (pool champ x slot) arrays
+    enemy_slots = teamSlots(enemy_team)
+    ally_slots = teamSlots(ally_team)
+    matchup_stats = gatherPoolStats(matchup_tables, enemy_slots, scoring)
+    synergy_stats = gatherPoolStats(synergy_tables, ally_slots, scoring)
+    return scoreSlots(my_role, enemy_slots, ally_slots, matchup_stats, synergy_stats)
+
+
+def scoreSlots(
+    my_role: str,
+    enemy_slots: list[tuple[str, str]],
+    ally_slots: list[tuple[str, str]],
+    matchup_stats: dict[str, np.ndarray],
+    synergy_stats: dict[str, np.ndarray],
+):
+    """
+    Scores already gathered (pool champ x slot) stats, see scorePool. The
+      stats can come from gatherPoolStats or roster_tensor.RosterTensor.
+    """
+    slots = enemy_slots + ally_slots
+    pool_stats = {
+        stat: np.concatenate([matchup_stats[stat], synergy_stats[stat]], axis=1)
+        for stat in matchup_stats
+    }
+
+    # Score every (pool champ x draft slot) at once
+    slot_roles = slotRoleIndices(slots)
+    scores1 = calcScores(my_role, slot_roles, pool_stats["delta1"])
+    scores2 = calcScores(my_role, slot_roles, pool_stats["delta2"])
+    total_scores1 = scores1.sum(axis=1)
+    total_scores2 = scores2.sum(axis=1)
+
+    num_champs = len(matchup_stats["wr"])
+    if len(slots) != 0:
+        mean_wr = pool_stats["wr"].mean(axis=1)
+        mean_delta1 = pool_stats["delta1"].mean(axis=1)
+        mean_delta2 = pool_stats["delta2"].mean(axis=1)
+    else:
+        mean_wr = mean_delta1 = mean_delta2 = np.full(num_champs, np.nan)
+    return {
+        "slots": slots,
+        "num_enemy": len(enemy_slots),
+        "stats": pool_stats,
+        "scores1": scores1,
+        "scores2": scores2,
+        "sc1": total_scores1,
+        "sc2": total_scores2,
+        "sum": total_scores1 + total_scores2,
+        "wr": mean_wr,
+        "delta1": mean_delta1,
+        "delta2": mean_delta2,
+    }
+
+
+def poolTable(kind: str, my_role: str, my_champ: str, as_of: str = None):
+    """
+    The latest table of a pool champion, or with as_of (a patch like "14.1" or
+      a YYYY-MM-DD date) the one snapshotted at that point (see snapshot_store)
+    """
+    if as_of is None:
+        # Tables stay cached across calls, so later queries in a session skip the store entirely
+        return table_cache.table(kind, my_role, my_champ)
+    return loadSnapshots().table(kind, my_role, my_champ, as_of)
+
+
+def checkAsOf(my_pool: dict[str, list[str]], as_of: str = None):
+    """Raises ValueError if as_of is set and none of the pool was snapshotted by then"""
+    if as_of is not None:
+        keys = [
+            (my_role, my_champ)
+            for my_role, my_champs in my_pool.items()
+            for my_champ in cleanChampNamesList(my_champs)
+        ]
+        loadSnapshots().checkAsOf(keys, as_of)
+
+
+@metrics.timed("score.best_pick")
+def bestPick(
+    my_role: str,
+    bans: list[str],
+    my_pool: dict[str, list[str]],
+    enemy_team: dict[str, str],
+    ally_team: dict[str, str],
+    scoring: str = None,
+    as_of: str = None,
+):
+    my_pool[my_role], enemy_team, ally_team = prepareDraft(
+        my_pool[my_role], bans, enemy_team, ally_team
+    )
+    my_champs = my_pool[my_role]
+    checkAsOf({my_role: my_champs}, as_of)
+
+    pool_scores = scorePool(
+        my_role,
+        [poolTable("matchups", my_role, my_champ, as_of) for my_champ in my_champs],
+        [poolTable("synergies", my_role, my_champ, as_of) for my_champ in my_champs],
+        enemy_team,
+        ally_team,
+        scoring,
+    )
+    slots = pool_scores["slots"]
+    num_enemy = pool_scores["num_enemy"]
+    pool_stats = pool_scores["stats"]
+
+    for champ_num, my_champ in enumerate(my_champs):
+        show("\n" + my_champ.upper() + " " + my_role.upper())
+        reportMissing(
+            my_champ,
+            slots,
+            pool_stats["found"][champ_num],
+            pool_stats["games"][champ_num],
+            scoring,
+        )
+
+        # The tables are only built when they'll be shown
+        if global_logger.quiet:
+            continue
+        for title, part in (("Matchup", slice(0, num_enemy)), ("Synergy", slice(num_enemy, None))):
+            show(f"{title} Data {'-'*60}")
+            records = slotRecords(
+                my_champ,
+                slots[part],
+                pool_scores["scores1"][champ_num, part],
+                pool_scores["scores2"][champ_num, part],
+                pool_stats["wr"][champ_num, part],
+                pool_stats["delta1"][champ_num, part],
+                pool_stats["delta2"][champ_num, part],
+            )
+            show(slotTable(records))
+
+    summarized = summaryTable(my_champs, pool_scores)
     print("\nMAX MID SCORES RANGE -180 <---> 180")
     print("-" * 75)
     print(" SUMMARIZED BEST PICK DATA (Highest Score = Best Pick)")
@@ -156,7 +478,306 @@ def bestPick(
     print(summarized.sort_values(by=["∑sc"]))
 
 
+def parseDraft(draft):
+    """
+    Accepts a draft as a (my_role, bans, enemy_team, ally_team) tuple or as a
+      dict with those keys (one JSONL line)
+
+    Raises:
+      ValueError if the draft isn't shaped like one: bans a list of names, and
+          each team a dict of role to name ("" for an empty slot)
+    """
+    if isinstance(draft, dict):
+        my_role, bans, enemy_team, ally_team = (
+            draft["my_role"],
+            draft.get("bans", []),
+            draft.get("enemy_team", {}),
+            draft.get("ally_team", {}),
+        )
+    else:
+        my_role, bans, enemy_team, ally_team = draft
+    if my_role not in ROLES:
+        raise ValueError(f"my_role must be one of {ROLES}, got {my_role!r}")
+    if not isinstance(bans, list) or not all(isinstance(champ, str) for champ in bans):
+        raise ValueError(f"bans must be a list of champion names, got {bans!r}")
+    for name, team in (("enemy_team", enemy_team), ("ally_team", ally_team)):
+        if not isinstance(team, dict) or not all(
+            role in ROLES and isinstance(champ, str) for role, champ in team.items()
+        ):
+            raise ValueError(f"{name} must map roles in {ROLES} to champion names, got {team!r}")
+    return my_role, bans, enemy_team, ally_team
+
+
+def readDraftsJsonl(path: str):
+    """Lazily yields one draft per non-empty line of a JSONL file"""
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+@metrics.timed("load.pool_tables")
+def loadPoolTables(my_pool: dict[str, list[str]], as_of: str = None):
+    """
+    Loads the matchup and synergy tables of every pool champion once, as of a
+      patch or date if given (see poolTable)
+
+    Returns:
+      (dict[str, dict[tuple[str, str], ChampTable]]) tables per kind, keyed by
+          (my_role, my_champ) with cleaned champion names
+
+    Raises:
+      ValueError if as_of is set and none of the pool has snapshots by then
+    """
+    checkAsOf(my_pool, as_of)
+    pool_tables = {"matchups": {}, "synergies": {}}
+    for my_role, my_champs in my_pool.items():
+        for my_champ in cleanChampNamesList(my_champs):
+            key = (my_role, my_champ)
+            pool_tables["matchups"][key] = poolTable("matchups", my_role, my_champ, as_of)
+            pool_tables["synergies"][key] = poolTable("synergies", my_role, my_champ, as_of)
+    return pool_tables
+
+
+@metrics.timed("score.draft")
+def scoreDraft(draft, my_pool: dict[str, list[str]], pool_tables, scoring: str = None):
+    """
+    Scores one draft against preloaded tables (see loadPoolTables), scoring as
+      in SCORING_MODES
+
+    Returns:
+      (dict) "my_role" and "rankings", a list of per champion totals sorted
+          from best to worst "sum" (∑sc)
+    """
+    my_role, bans, enemy_team, ally_team = parseDraft(draft)
+    my_champs, enemy_team, ally_team = prepareDraft(my_pool[my_role], bans, enemy_team, ally_team)
+    pool_scores = scorePool(
+        my_role,
+        [pool_tables["matchups"][(my_role, my_champ)] for my_champ in my_champs],
+        [pool_tables["synergies"][(my_role, my_champ)] for my_champ in my_champs],
+        enemy_team,
+        ally_team,
+        scoring,
+    )
+
+    return {"my_role": my_role, "rankings": rankPool(my_champs, pool_scores)}
+
+
+def rankPool(my_champs: list[str], pool_scores: dict[str, np.ndarray], available: np.ndarray = None):
+    """
+    Per champion totals ("sc1", "sc2", "sum", "wr", "delta1", "delta2") as a
+      list of dicts sorted from best to worst "sum" (∑sc), ties in pool order.
+      Champions where `available` is False are left out.
+    """
+    rankings = []
+    for champ_num in np.argsort(-pool_scores["sum"], kind="stable"):
+        if available is not None and not available[champ_num]:
+            continue
+        ranking = {"my_champ": my_champs[champ_num]}
+        for column in ["sc1", "sc2", "sum"]:
+            ranking[column] = int(pool_scores[column][champ_num])
+        for column in ["wr", "delta1", "delta2"]:
+            value = float(pool_scores[column][champ_num])
+            ranking[column] = None if math.isnan(value) else value
+        rankings.append(ranking)
+    return rankings
+
+
+class DraftSession:
+    """
+    Live champ select for one role: keeps running score totals for the whole
+      pool and applies only the new slot's delta as each ban or pick arrives,
+      instead of rescoring all 10 slots through bestPick.
+
+      session = DraftSession("middle", champ_pool["middle"])
+      session.enemy_pick("top", "Garen")
+      session.ally_pick("support", "Lux")
+      session.ban("Ahri")
+      session.rankings()
+    """
+
+    def __init__(self, my_role: str, my_role_pool: list[str], scoring: str = None):
+        self.my_role = my_role
+        self.scoring = config["scoring"] if scoring is None else scoring
+        self.my_champs = cleanChampNamesList(my_role_pool)
+        self.tables = {
+            "matchups": [table_cache.table("matchups", my_role, my_champ) for my_champ in self.my_champs],
+            "synergies": [table_cache.table("synergies", my_role, my_champ) for my_champ in self.my_champs],
+        }
+        num_champs = len(self.my_champs)
+        self.available = np.ones(num_champs, dtype=bool)
+        self.totals = {
+            "sc1": np.zeros(num_champs, dtype=np.int64),
+            "sc2": np.zeros(num_champs, dtype=np.int64),
+            "wr": np.zeros(num_champs),
+            "delta1": np.zeros(num_champs),
+            "delta2": np.zeros(num_champs),
+        }
+        # (kind, role) -> (champ, that slot's contribution to self.totals)
+        self.slots: dict[tuple[str, str], tuple[str, dict[str, np.ndarray]]] = {}
+        # Kept apart from the picks, so a replaced pick only frees a champion nobody banned
+        self.bans: set[str] = set()
+
+    def ban(self, champ: str):
+        champ = cleanString(champ)
+        self.bans.add(champ)
+        self._removeFromPool(champ)
+
+    def enemy_pick(self, role: str, champ: str):
+        self._pick("matchups", role, cleanString(champ))
+
+    def ally_pick(self, role: str, champ: str):
+        self._pick("synergies", role, cleanString(champ))
+
+    def _removeFromPool(self, champ: str):
+        # What removeUnavailableChampions does for a whole draft, one champion at a time
+        for champ_num, my_champ in enumerate(self.my_champs):
+            if my_champ == champ:
+                self.available[champ_num] = False
+
+    def _restoreToPool(self, champ: str):
+        if champ in self.bans or any(picked == champ for picked, _ in self.slots.values()):
+            return
+        for champ_num, my_champ in enumerate(self.my_champs):
+            if my_champ == champ:
+                self.available[champ_num] = True
+
+    def _pick(self, kind: str, role: str, champ: str):
+        if (kind, role) in self.slots:
+            # A re-pick of the same slot replaces the earlier champion's contribution
+            previous_champ, previous = self.slots.pop((kind, role))
+            for column, values in previous.items():
+                self.totals[column] -= values
+            self._restoreToPool(previous_champ)
+        if champ == "":
+            return
+        self._removeFromPool(champ)
+
+        slot = [(role, champ)]
+        slot_stats = gatherPoolStats(self.tables[kind], slot, self.scoring)
+        slot_roles = slotRoleIndices(slot)
+        contribution = {
+            "sc1": calcScores(self.my_role, slot_roles, slot_stats["delta1"])[:, 0],
+            "sc2": calcScores(self.my_role, slot_roles, slot_stats["delta2"])[:, 0],
+            "wr": slot_stats["wr"][:, 0],
+            "delta1": slot_stats["delta1"][:, 0],
+            "delta2": slot_stats["delta2"][:, 0],
+        }
+        for column, values in contribution.items():
+            self.totals[column] += values
+        self.slots[(kind, role)] = (champ, contribution)
+
+    def scores(self):
+        """Current totals in the shape scorePool returns ("sc1", "sc2", "sum", and mean "wr"/"delta1"/"delta2")"""
+        num_slots = len(self.slots)
+        pool_scores = {
+            "sc1": self.totals["sc1"],
+            "sc2": self.totals["sc2"],
+            "sum": self.totals["sc1"] + self.totals["sc2"],
+        }
+        for column in ["wr", "delta1", "delta2"]:
+            if num_slots != 0:
+                pool_scores[column] = self.totals[column] / num_slots
+            else:
+                pool_scores[column] = np.full(len(self.my_champs), np.nan)
+        return pool_scores
+
+    def rankings(self):
+        """Available pool champions from best to worst ∑sc, see rankPool"""
+        return rankPool(self.my_champs, self.scores(), self.available)
+
+
+def _chunked(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Tables of the worker process, loaded once by _initBatchWorker
+_worker_pool = None
+_worker_tables = None
+_worker_scoring = None
+
+
+def _initBatchWorker(my_pool: dict[str, list[str]], scoring: str = None):
+    global _worker_pool, _worker_tables, _worker_scoring
+    _worker_pool = my_pool
+    _worker_tables = loadPoolTables(my_pool)
+    _worker_scoring = scoring
+
+
+def _scoreDraftChunk(drafts: list):
+    return [scoreDraft(draft, _worker_pool, _worker_tables, _worker_scoring) for draft in drafts]
+
+
+def bestPickBatch(
+    drafts,
+    my_pool: dict[str, list[str]] = None,
+    workers: int = 1,
+    chunk_size: int = 64,
+    scoring: str = None,
+):
+    """
+    Scores many drafts, loading the pool's tables once
+
+    Parameters:
+      drafts: iterable of drafts (see parseDraft) or the path of a JSONL file
+      my_pool (dict[str, list[str]]): pool to score, util.champ_pool by default
+      workers (int): number of worker processes, 1 scores in this process
+      chunk_size (int): drafts sent to a worker at a time
+      scoring (str): one of SCORING_MODES, the config's by default
+
+    Returns:
+      (generator of dict) one scoreDraft result per draft, in input order. At
+          most 2 chunks per worker are in flight, so memory stays flat no
+          matter how many drafts are streamed through.
+    """
+    if my_pool is None:
+        my_pool = champ_pool
+    # Resolved here so workers score the same way whatever config they load
+    scoring = config["scoring"] if scoring is None else scoring
+    if isinstance(drafts, str):
+        drafts = readDraftsJsonl(drafts)
+    chunks = _chunked(drafts, chunk_size)
+
+    if workers <= 1:
+        pool_tables = loadPoolTables(my_pool)
+        for chunk in chunks:
+            for draft in chunk:
+                yield scoreDraft(draft, my_pool, pool_tables, scoring)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_initBatchWorker, initargs=(my_pool, scoring)
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_scoreDraftChunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def writeResultsJsonl(results, fp):
+    """
+    Streams results to an open text file as JSON lines
+
+    Returns:
+      (int) number of results written
+    """
+    count = 0
+    for count, result in enumerate(results, start=1):
+        fp.write(json.dumps(result) + "\n")
+    return count
+
+
 def getWithChampDf(with_champ_df: pd.DataFrame, their_champ: str, their_role: str):
+    """The original boolean-mask slot lookup, kept for benchmark.py's comparison"""
     df = with_champ_df.loc[with_champ_df["role"] == their_role]
     df = df.loc[df["champ"] == their_champ]
     df.reset_index(drop=True, inplace=True)
@@ -164,30 +785,40 @@ def getWithChampDf(with_champ_df: pd.DataFrame, their_champ: str, their_role: st
 
 
 def calcScore(my_role, enemy_role, metric):
-    TOP, JUNGLE, MIDDLE, BOTTOM, SUPPORT = 0, 1, 2, 3, 4
-    if enemy_role == "top":
-        scaling_idx = TOP
-    elif enemy_role == "jungle":
-        scaling_idx = JUNGLE
-    elif enemy_role == "middle":
-        scaling_idx = MIDDLE
-    elif enemy_role == "bottom":
-        scaling_idx = BOTTOM
-    elif enemy_role == "support":
-        scaling_idx = SUPPORT
-
-    if my_role == "top":
-        scale_values = [1.00, 0.50, 0.33, 0.25, 0.25]
-    elif my_role == "jungle":
-        scale_values = [0.35, 1.00, 0.50, 0.25, 0.35]
-    elif my_role == "middle":
-        scale_values = [0.10, 0.35, 1.00, 0.10, 0.25]
-    elif my_role == "bottom":
-        scale_values = [0.10, 0.50, 0.33, 1.00, 1.00]
-    elif my_role == "support":
-        scale_values = [0.30, 0.65, 0.50, 1.00, 1.00]
-
-    scaled_score = sigmoid(metric) * scale_values[scaling_idx]
-    scaled_average_score = 0.5 * scale_values[scaling_idx]
+    scale = ROLE_SCALING[ROLE_INDEX[my_role]][ROLE_INDEX[enemy_role]]
+    scaled_score = sigmoid(metric) * scale
+    scaled_average_score = 0.5 * scale
 
     return round((scaled_score - scaled_average_score) * 100)
+
+
+def slotRoleIndices(slots: list[tuple[str, str]]):
+    return np.array([ROLE_INDEX[role] for role, _ in slots], dtype=np.intp)
+
+
+def calcScores(my_role: str, other_roles: np.ndarray, deltas: np.ndarray):
+    """
+    Vectorized calcScore over whole arrays of deltas
+
+    Parameters:
+      my_role (str): role being picked for
+      other_roles (np.ndarray): ROLES indices of the other champions, broadcast
+          against deltas (e.g. one per slot for a (pool champ x slot) array)
+      deltas (np.ndarray): delta1 or delta2 values
+
+    Returns:
+      (np.ndarray) int64 scores, identical to calling calcScore per element
+    """
+    other_roles, deltas = np.broadcast_arrays(other_roles, np.asarray(deltas, dtype=np.float64))
+    scale = ROLE_SCALING_MATRIX[ROLE_INDEX[my_role]][other_roles]
+    scaled_score = sigmoidArray(deltas) * scale
+    scaled_average_score = 0.5 * scale
+    unrounded = (scaled_score - scaled_average_score) * 100
+    scores = np.rint(unrounded).astype(np.int64)
+
+    # np.exp can be an ulp away from math.exp, which only matters right at a .5
+    # rounding boundary, so redo those few elements with the scalar path
+    near_half = np.abs(np.abs(unrounded - np.trunc(unrounded)) - 0.5) < 1e-9
+    for idx in zip(*np.nonzero(near_half)):
+        scores[idx] = calcScore(my_role, ROLES[other_roles[idx]], float(deltas[idx]))
+    return scores
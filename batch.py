@@ -0,0 +1,45 @@
+"""
+Replays a JSONL file of drafts through analysis.bestPickBatch and streams one
+JSON result per draft.
+
+Each input line looks like
+  {"my_role": "middle", "bans": ["zed"], "enemy_team": {"top": "garen", ...},
+   "ally_team": {"support": "lux", ...}}
+
+  python batch.py drafts.jsonl -o results.jsonl --workers 4
+"""
+import argparse
+import sys
+import time
+import global_logger
+
+global_logger.init()
+
+from global_logger import logger
+import analysis
+from util import champ_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many drafts against the champion pool")
+    parser.add_argument("drafts", help="JSONL file with one draft per line")
+    parser.add_argument("-o", "--output", help="JSONL file for the results (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk-size", type=int, default=64, help="drafts per worker task")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = analysis.bestPickBatch(
+        args.drafts, champ_pool, workers=args.workers, chunk_size=args.chunk_size
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fp:
+            count = analysis.writeResultsJsonl(results, fp)
+    else:
+        count = analysis.writeResultsJsonl(results, sys.stdout)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Scored {count} drafts in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} drafts/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""
+Benchmarks for the scrape, parse and pick stages, run against the panel
+fixtures in fixtures/, synthetic tables at a realistic roster size and a
+stand-in lolalytics page served locally, so no scraped data (or network) is
+needed.
+
+  python benchmark.py lookup
+  python benchmark.py parse [--dump data/middle/html/ahri_matchups.html]
+  python benchmark.py startup
+  python benchmark.py parse_stages | pick | scrape
+  python benchmark.py suite [--json results.json] [--compare baseline.json]
+  python benchmark.py fixtures    (regenerate the fixtures/ panel dumps)
+
+suite runs the stage benchmarks and writes one JSON document, and with
+--compare exits non-zero if any timing regressed past --tolerance.
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from bs4 import BeautifulSoup
+import analysis
+from analysis import getWithChampDf
+from config import config
+from data_store import ChampTable, KINDS, table_cache, writeStore
+from parse_lolalytics import (
+    CELL_CLASS,
+    bucketCellsByRole,
+    iterCells,
+    getLxmlCellStats,
+    getMatchupsDataFrame,
+    parseMatchupsForRole,
+)
+from util import ROLES, stat_types
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STANDIN_PAGE = "lolalytics_standin.html"
+# Roughly the live champion count, the size every stage sees in practice
+ROSTER_SIZE = 168
+STAGE_BENCHES = ["parse_stages", "pick", "scrape"]
+
+
+def syntheticRoster(roster_size: int):
+    """Letters only, so the names survive util.cleanString like real ones"""
+    return ["champ" + chr(97 + num // 26) + chr(97 + num % 26) for num in range(roster_size)]
+
+
+def syntheticTable(roster: list[str], rnd: random.Random):
+    """A DataFrame shaped like the parsed per-champion CSVs"""
+    rows = []
+    for role in ROLES:
+        for champ in roster:
+            rows.append(
+                [
+                    role + champ,
+                    role,
+                    champ,
+                    round(rnd.uniform(40, 60), 2),
+                    round(rnd.uniform(-8, 8), 2),
+                    round(rnd.uniform(-8, 8), 2),
+                    round(rnd.uniform(0.1, 20), 2),
+                    rnd.randint(0, 5000),
+                ]
+            )
+    return pd.DataFrame(rows, columns=(["id", "role", "champ"] + stat_types))
+
+
+def randomDraft(roster: list[str], rnd: random.Random):
+    picks = rnd.sample(roster, 10)
+    enemy_team = dict(zip(ROLES, picks[:5]))
+    ally_team = dict(zip(ROLES, picks[5:]))
+    return enemy_team, ally_team
+
+
+def benchLookup(pool_size: int = 8, num_drafts: int = 200, roster_size: int = 160):
+    """
+    Times the per-draft cost of pulling every slot's stats for a whole pool,
+      via boolean masks (getWithChampDf) vs. the precomputed ChampTable index
+
+    Returns:
+      (dict[str, float]) milliseconds per draft for "mask" and "index"
+    """
+    rnd = random.Random(0)
+    roster = syntheticRoster(roster_size)
+    pool_dfs = [(syntheticTable(roster, rnd), syntheticTable(roster, rnd)) for _ in range(pool_size)]
+    drafts = [randomDraft(roster, rnd) for _ in range(num_drafts)]
+
+    start = time.perf_counter()
+    for enemy_team, ally_team in drafts:
+        for matchups_df, synergies_df in pool_dfs:
+            for table_df, team in ((matchups_df, enemy_team), (synergies_df, ally_team)):
+                for role, champ in team.items():
+                    df = getWithChampDf(table_df, champ, role)
+                    if df.shape[0] != 0 and df.loc[0]["games"] >= 33:
+                        df.loc[0]["delta1"]
+    mask_ms = (time.perf_counter() - start) * 1000 / num_drafts
+
+    # The index is built once per loaded table, so that cost is part of the run
+    start = time.perf_counter()
+    pool_tables = [
+        (ChampTable.fromDataFrame(matchups_df), ChampTable.fromDataFrame(synergies_df))
+        for matchups_df, synergies_df in pool_dfs
+    ]
+    for enemy_team, ally_team in drafts:
+        for matchups, synergies in pool_tables:
+            for table, team in ((matchups, enemy_team), (synergies, ally_team)):
+                for role, champ in team.items():
+                    row = table.lookup(role, champ)
+                    if row is not None and table.stats["games"][row] >= 33:
+                        table.stats["delta1"][row]
+    index_ms = (time.perf_counter() - start) * 1000 / num_drafts
+
+    print(f"Slot lookups for a pool of {pool_size} over {num_drafts} drafts ({roster_size} champion roster)")
+    print(f"  boolean masks: {mask_ms:8.3f} ms/draft")
+    print(f"  (role, champ) index: {index_ms:8.3f} ms/draft  ({mask_ms / index_ms:.0f}x)")
+    return {"mask": mask_ms, "index": index_ms}
+
+
+def syntheticPanelDump(kind: str, roster_size: int = 160, snapshots: int = 8):
+    """
+    HTML shaped like a scraped panel dump: per role, `snapshots` overlapping
+      windows of champion cells, as the scroll drags produce them
+    """
+    rnd = random.Random(0)
+    roster = syntheticRoster(roster_size)
+    roles = ROLES if kind == "matchups" else ROLES[:2] + ROLES[3:]
+    html = ""
+    for role in roles:
+        cells = []
+        for champ in roster:
+            if kind == "matchups":
+                href = f"/lol/ahri/vs/{champ}/build/?lane=middle&amp;vslane={role}"
+            else:
+                href = f"/lol/{champ}/build/?lane={role}"
+            cells.append(
+                f'<div class="{CELL_CLASS}"><a href="{href}"><img alt="{champ}" src="{champ}.webp"/></a>'
+                + f"<div>{rnd.uniform(40, 60):.2f}</div><div>{rnd.uniform(-8, 8):.2f}</div>"
+                + f"<div>{rnd.uniform(-8, 8):.2f}</div><div>{rnd.uniform(0.1, 20):.2f}</div>"
+                + f"<div>{rnd.randint(0, 50000):,}</div></div>"
+            )
+        window = roster_size // 3
+        for snapshot in range(snapshots):
+            start = snapshot * (roster_size - window) // (snapshots - 1)
+            html += '<div class="Panel_data__dtE8F">' + "".join(cells[start : start + window]) + "</div>"
+    return html
+
+
+def _perRoleCells(soup: BeautifulSoup, kind: str):
+    """The original lookup: a find_all and a freshly compiled regex per cell, for every role"""
+    prefix = r".+vslane=" if kind == "matchups" else r".+lane="
+    cells_by_role = {}
+    for role in ROLES:
+        cells_by_role[role] = []
+        for cell in soup.find_all("div", {"class": CELL_CLASS}):
+            regex = re.compile(prefix + role)
+            if cell.find("a", href=regex) != None:
+                cells_by_role[role].append(cell)
+    return cells_by_role
+
+
+def benchParse(dump_path: str = None, kind: str = "matchups", repeats: int = 3):
+    """
+    Times bucketing the cells of one panel dump by role: the per-role
+      find_all + regex loop, the single bs4 pass, and the single lxml pass
+
+    Returns:
+      (dict[str, float]) best-of-repeats milliseconds for "per_role",
+          "single_pass" and "lxml"
+    """
+    if dump_path is None:
+        html = syntheticPanelDump(kind)
+    else:
+        with open(dump_path, encoding="utf-8") as fp:
+            html = fp.read()
+
+    def best(parse):
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            parse()
+            times.append((time.perf_counter() - start) * 1000)
+        return min(times)
+
+    results = {
+        "per_role": best(lambda: _perRoleCells(BeautifulSoup(html, "lxml"), kind)),
+        "single_pass": best(lambda: bucketCellsByRole(BeautifulSoup(html, "lxml"), kind)),
+        "lxml": best(lambda: [getLxmlCellStats(cell) for _, _, cell in iterCells(html, kind)]),
+    }
+    print(f"Bucketing {kind} cells of a {len(html) / 1024:.0f} KiB panel dump (best of {repeats})")
+    print(f"  per role find_all + regex: {results['per_role']:8.1f} ms")
+    print(f"  single pass (bs4):         {results['single_pass']:8.1f} ms")
+    print(f"  single pass (lxml, stats): {results['lxml']:8.1f} ms")
+    return results
+
+
+# What each query path imported before and after cli.py deferred the heavy modules
+STARTUP_CASES = {
+    "pick (before)": "import pandas, analysis",
+    "pick (after)": "import cli, analysis",
+    "no-op update (before)": "import web_scraping, parse_lolalytics",
+    "no-op update (after)": "import cli",
+}
+
+
+def importTime(statement: str):
+    """Total microseconds of top-level imports reported by python -X importtime"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    total_us = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line.split("|")
+        # Nested imports are indented under the module that pulled them in
+        if len(fields) == 3 and fields[1].strip().isdigit() and not fields[2].startswith("  "):
+            total_us += int(fields[1])
+    return total_us
+
+
+def benchStartup(repeats: int = 3):
+    """
+    Compares import cost of the pick and no-op update paths before and after
+      the lazy imports, best of `repeats` fresh interpreters each
+
+    Returns:
+      (dict[str, float]) milliseconds per case in STARTUP_CASES
+    """
+    results = {}
+    for case, statement in STARTUP_CASES.items():
+        results[case] = min(importTime(statement) for _ in range(repeats)) / 1000
+    print(f"Import time (python -X importtime, best of {repeats})")
+    for case, ms in results.items():
+        print(f"  {case:<24}{ms:8.1f} ms")
+    return results
+
+
+def fixturePath(kind: str):
+    return os.path.join(FIXTURE_DIR, f"ahri_middle_{kind}.html.gz")
+
+
+def writeFixtures(roster_size: int = ROSTER_SIZE):
+    """Regenerates the checked-in panel dumps (gzipped, they're mostly repeated cells)"""
+    for kind in KINDS:
+        # mtime=0 keeps the bytes, and so the checked-in files, reproducible
+        with open(fixturePath(kind), "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as fp:
+            fp.write(syntheticPanelDump(kind, roster_size).encode("utf-8"))
+        print(f"Wrote {fixturePath(kind)}")
+
+
+def loadFixture(kind: str):
+    with gzip.open(fixturePath(kind), "rt", encoding="utf-8") as fp:
+        return fp.read()
+
+
+def best(run, repeats: int):
+    """Best-of-repeats milliseconds of run(), with its prints kept off the terminal"""
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run()
+            times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def benchParseStages(repeats: int = 3):
+    """
+    Times parsing the matchup fixture: the whole getMatchupsDataFrame, and
+      parseMatchupsForRole over each role's already bucketed cells
+
+    Returns:
+      (dict[str, float]) best-of-repeats milliseconds for "getMatchupsDataFrame"
+          and "parseMatchupsForRole.<role>"
+    """
+    html = loadFixture("matchups")
+    soup = BeautifulSoup(html, "lxml")
+    results = {"getMatchupsDataFrame": best(lambda: getMatchupsDataFrame(soup), repeats)}
+    cells_by_role = bucketCellsByRole(soup, "matchups")
+    for role in ROLES:
+        results["parseMatchupsForRole." + role] = best(
+            lambda: parseMatchupsForRole(role, cells_by_role[role], [], set()), repeats
+        )
+    print(f"Parsing the {len(html) / 1024:.0f} KiB matchup fixture (best of {repeats})")
+    for name, ms in results.items():
+        print(f"  {name:<36}{ms:8.2f} ms")
+    return results
+
+
+def syntheticDataRoot(data_root: str, my_pool: dict[str, list[str]], roster_size: int, rnd: random.Random):
+    """Points the config at data_root and stores synthetic tables for every pool champion"""
+    config["data_root"] = data_root
+    table_cache.clear()
+    roster = syntheticRoster(roster_size)
+    for kind in KINDS:
+        tables = {}
+        for my_role, my_champs in my_pool.items():
+            for my_champ in my_champs:
+                tables[(my_role, my_champ)] = syntheticTable(roster, rnd)
+        with contextlib.redirect_stdout(io.StringIO()):
+            writeStore(kind, tables)
+
+
+def benchPick(pool_size: int = 8, num_drafts: int = 50, roster_size: int = ROSTER_SIZE, repeats: int = 3):
+    """
+    Times the pick stage on synthetic tables: analysis.bestPick (with its
+      printing), scoreDraft, and filtedValidMatches for one pool champion
+
+    Returns:
+      (dict[str, float]) best-of-repeats milliseconds per draft for
+          "bestPick", "scoreDraft" and "filtedValidMatches"
+    """
+    rnd = random.Random(0)
+    roster = syntheticRoster(roster_size)
+    my_pool = {"middle": roster[:pool_size]}
+    drafts = [randomDraft(roster[pool_size:], rnd) for _ in range(num_drafts)]
+    data_root = config["data_root"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            syntheticDataRoot(tmp_dir, my_pool, roster_size, rnd)
+            pool_tables = analysis.loadPoolTables(my_pool)
+            table = pool_tables["matchups"][("middle", roster[0])]
+
+            def bestPicks():
+                for enemy_team, ally_team in drafts:
+                    analysis.bestPick("middle", [], dict(my_pool), enemy_team, ally_team)
+
+            def scoreDrafts():
+                for enemy_team, ally_team in drafts:
+                    analysis.scoreDraft(("middle", [], enemy_team, ally_team), my_pool, pool_tables)
+
+            def validMatches():
+                for enemy_team, _ in drafts:
+                    analysis.filtedValidMatches(table, enemy_team, roster[0], "middle")
+
+            results = {
+                "bestPick": best(bestPicks, repeats) / num_drafts,
+                "scoreDraft": best(scoreDrafts, repeats) / num_drafts,
+                "filtedValidMatches": best(validMatches, repeats) / num_drafts,
+            }
+        finally:
+            config["data_root"] = data_root
+            table_cache.clear()
+    print(f"Pick stage for a pool of {pool_size} ({roster_size} champion roster, best of {repeats})")
+    for name, ms in results.items():
+        print(f"  {name:<20}{ms:8.3f} ms/draft")
+    return results
+
+
+class StandInHandler(SimpleHTTPRequestHandler):
+    """Serves the stand-in page for every path, as lolalytics serves every champion"""
+
+    def do_GET(self):
+        with open(os.path.join(FIXTURE_DIR, STANDIN_PAGE), "rb") as fp:
+            body = fp.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def benchScrape(repeats: int = 3, headless: bool = True):
+    """
+    Times web_scraping.scrapeMatchup and scrapeSynergy against the stand-in
+      page on a local server, with one Chrome driver for every repeat
+
+    Returns:
+      (dict) best-of-repeats milliseconds for "load", "scrapeMatchup" and
+          "scrapeSynergy", or {"skipped": reason} without a usable Chrome
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/lol/ahri/build/?lane=middle"
+    try:
+        import browser_pool
+        import web_scraping
+        from selenium.webdriver.chrome.service import Service
+
+        driver = web_scraping.createDriver(Service(browser_pool.driverPath()), headless)
+    except Exception as e:
+        server.shutdown()
+        print(f"Skipping the scrape benchmark, no usable Chrome driver ({type(e).__name__})")
+        return {"skipped": f"{type(e).__name__}: {e}"}
+
+    timings = {"load": [], "scrapeMatchup": [], "scrapeSynergy": []}
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            driver.get(url)
+            actions = web_scraping.freshActions(driver)
+            timings["load"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            web_scraping.scrapeMatchup(driver, actions)
+            timings["scrapeMatchup"].append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            web_scraping.scrapeSynergy(driver, actions)
+            timings["scrapeSynergy"].append((time.perf_counter() - start) * 1000)
+    finally:
+        driver.quit()
+        server.shutdown()
+    results = {name: min(times) for name, times in timings.items()}
+    print(f"Scraping the stand-in page (best of {repeats})")
+    for name, ms in results.items():
+        print(f"  {name:<16}{ms:8.1f} ms")
+    return results
+
+
+def gitCommit():
+    completed = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    return completed.stdout.strip() or None
+
+
+def runSuite(benches: list[str] = STAGE_BENCHES):
+    """
+    Runs the given benchmarks into one machine-readable document
+
+    Returns:
+      (dict) "commit", "python", "platform", "timestamp" and "results" (each
+          benchmark's return value)
+    """
+    runners = {"parse_stages": benchParseStages, "pick": benchPick, "scrape": benchScrape}
+    return {
+        "commit": gitCommit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "results": {bench: runners[bench]() for bench in benches},
+    }
+
+
+def compareResults(current: dict, baseline: dict, tolerance: float = 0.2):
+    """
+    Finds every timing more than `tolerance` (as a fraction) slower than the
+      baseline run's. Timings either run doesn't have (e.g. a skipped
+      scrape) are ignored.
+
+    Returns:
+      (list[str]) one description per regression
+    """
+    regressions = []
+    for bench, timings in current["results"].items():
+        baseline_timings = baseline["results"].get(bench, {})
+        for name, ms in timings.items():
+            baseline_ms = baseline_timings.get(name)
+            if not isinstance(ms, (int, float)) or not isinstance(baseline_ms, (int, float)):
+                continue
+            if ms > baseline_ms * (1 + tolerance):
+                regressions.append(
+                    f"{bench}.{name}: {ms:.3f} ms vs {baseline_ms:.3f} ms ({ms / baseline_ms - 1:+.0%})"
+                )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run benchmarks")
+    parser.add_argument(
+        "bench", choices=["lookup", "parse", "startup"] + STAGE_BENCHES + ["suite", "fixtures"]
+    )
+    parser.add_argument("--dump", help="saved panel HTML for the parse benchmark")
+    parser.add_argument("--kind", choices=["matchups", "synergies"], default="matchups")
+    parser.add_argument(
+        "--json", help="with suite, write the results to this file instead of stdout (progress goes to stderr then)"
+    )
+    parser.add_argument("--compare", help="with suite, a previous --json file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown allowed by --compare")
+    args = parser.parse_args()
+    if args.bench == "lookup":
+        benchLookup()
+    elif args.bench == "parse":
+        benchParse(args.dump, args.kind)
+    elif args.bench == "startup":
+        benchStartup()
+    elif args.bench == "parse_stages":
+        benchParseStages()
+    elif args.bench == "pick":
+        benchPick()
+    elif args.bench == "scrape":
+        benchScrape()
+    elif args.bench == "fixtures":
+        writeFixtures()
+    else:
+        # With the JSON on stdout, the benches' progress lines would make it unparsable
+        progress = sys.stdout if args.json else sys.stderr
+        with contextlib.redirect_stdout(progress):
+            suite = runSuite()
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as fp:
+                json.dump(suite, fp, indent=2)
+        else:
+            print(json.dumps(suite, indent=2))
+        if args.compare:
+            with open(args.compare, encoding="utf-8") as fp:
+                regressions = compareResults(suite, json.load(fp), args.tolerance)
+            for regression in regressions:
+                print("REGRESSION " + regression, file=progress)
+            sys.exit(1 if regressions else 0)
@@ -0,0 +1,277 @@
+"""
+Warm Chrome browsers that outlive a scrape, so incremental refreshes skip the
+driver download check and the browser cold start.
+
+Each browser runs detached with its own profile and a remote debugging port,
+and scrape workers attach a driver to it (ChromeOptions.debugger_address).
+Quitting an attached driver leaves its browser running for the next run. The
+chromedriver path returned by webdriver_manager is cached too, with the Chrome
+major version it was installed for, and looked up again once the binary is
+gone, Chrome has updated to another major version, or a session fails to start
+with it. Both live in browsers.json under the data root.
+
+  python browser_pool.py start [--browsers 2] [--headless]
+  python browser_pool.py status
+  python browser_pool.py stop
+
+`python cli.py update --warm` starts any missing browsers itself.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.request
+from config import config
+from global_logger import logger
+from util import getBrowserProfileDir, getBrowserStatePath
+
+# Browser binaries tried, in order, when the chrome_binary setting is empty
+CHROME_NAMES = ["google-chrome", "google-chrome-stable", "chrome", "chromium", "chromium-browser"]
+WINDOWS_CHROME_PATHS = [
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+]
+# Seconds to wait for a launched browser to open its debugging port
+LAUNCH_TIMEOUT = 20
+
+# Scrape worker threads share browsers.json, every read-modify-write holds this
+_state_lock = threading.RLock()
+# Driver path already checked against the installed Chrome by this process
+_checked_driver_path = None
+
+
+def loadState():
+    """
+    Returns:
+      (dict) "driver_path" and the "chrome_version" (major) it was installed
+          for (str or None), and "browsers", a list of {"port", "pid", "headless"}
+    """
+    try:
+        with open(getBrowserStatePath(), encoding="utf-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {"driver_path": None, "chrome_version": None, "browsers": []}
+
+
+def saveState(state: dict):
+    path = getBrowserStatePath()
+    # Unique per writer, so a concurrent save (e.g. from another process) can't replace it first
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with _state_lock:
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump(state, fp, indent=1)
+        os.replace(tmp_path, path)
+
+
+def chromeVersion():
+    """Major version of the installed Chrome, None if it can't be told"""
+    try:
+        from webdriver_manager.core.os_manager import ChromeType, OperationSystemManager
+
+        version = OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+    except Exception as e:
+        logger.debug(f"Couldn't read the Chrome version: {e}")
+        return None
+    return version.split(".")[0] if version else None
+
+
+def driverPath(refresh: bool = False):
+    """
+    chromedriver binary, installed by webdriver_manager only if the cached one
+      is gone, was installed for another Chrome major version, or refresh is
+      set (e.g. after it failed to start a session)
+    """
+    global _checked_driver_path
+    with _state_lock:
+        if not refresh and _checked_driver_path and os.path.isfile(_checked_driver_path):
+            return _checked_driver_path
+        state = loadState()
+        path = state.get("driver_path")
+        version = chromeVersion()
+        stale = version is not None and state.get("chrome_version") != version
+        if refresh or stale or not path or not os.path.isfile(path):
+            from webdriver_manager.chrome import ChromeDriverManager as chromeMgr
+
+            path = chromeMgr().install()
+            state["driver_path"] = path
+            state["chrome_version"] = version
+            saveState(state)
+            logger.info(f"Cached chromedriver at {path} for Chrome {version or '(unknown version)'}")
+        _checked_driver_path = path
+        return path
+
+
+def findChrome():
+    if config["chrome_binary"]:
+        return config["chrome_binary"]
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in WINDOWS_CHROME_PATHS:
+        if os.path.isfile(path):
+            return path
+    raise FileNotFoundError("No Chrome binary found, set chrome_binary in the config")
+
+
+def isAlive(port: int):
+    """Whether a browser answers on the debugging port"""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def freePort():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launchBrowser(port: int, headless: bool = False):
+    """
+    Starts a detached Chrome listening on port, which keeps running after this
+      process exits
+
+    Returns:
+      (int) its pid
+    """
+    args = [
+        findChrome(),
+        f"--remote-debugging-port={port}",
+        f"--user-data-dir={getBrowserProfileDir(port)}",
+        "--no-first-run",
+        "--no-default-browser-check",
+    ]
+    # Same window setup as web_scraping.createDriver
+    if headless:
+        args += ["--headless=new", "--window-size=1920,1080"]
+    else:
+        args.append("--start-maximized")
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+    process = subprocess.Popen(
+        args + ["about:blank"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **detach
+    )
+    deadline = time.monotonic() + LAUNCH_TIMEOUT
+    while not isAlive(port):
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"Chrome never opened its debugging port {port}")
+        time.sleep(0.1)
+    logger.info(f"Started a warm browser on port {port} (pid {process.pid})")
+    return process.pid
+
+
+def ensureBrowsers(count: int, headless: bool = False):
+    """
+    Makes sure `count` warm browsers with the given headless setting are
+      running, reusing live ones and starting the rest
+
+    Returns:
+      (list[int]) their debugging ports
+    """
+    with _state_lock:
+        state = loadState()
+        live = [browser for browser in state["browsers"] if isAlive(browser["port"])]
+        matching = [browser for browser in live if browser["headless"] == headless]
+        while len(matching) < count:
+            port = freePort()
+            browser = {"port": port, "pid": launchBrowser(port, headless), "headless": headless}
+            live.append(browser)
+            matching.append(browser)
+        state["browsers"] = live
+        saveState(state)
+    return [browser["port"] for browser in matching[:count]]
+
+
+def restartBrowser(port: int, headless: bool = False):
+    """Starts the browser on port again if it died, e.g. after a crash mid-scrape"""
+    if isAlive(port):
+        return
+    with _state_lock:
+        # Checked again under the lock, another worker may have just restarted it
+        if isAlive(port):
+            return
+        state = loadState()
+        for browser in state["browsers"]:
+            if browser["port"] == port:
+                browser["pid"] = launchBrowser(port, headless)
+        saveState(state)
+
+
+def attachDriver(service, port: int):
+    """Chrome driver on the warm browser listening on port"""
+    from selenium import webdriver
+    from selenium.webdriver import ChromeOptions
+
+    options = ChromeOptions()
+    options.debugger_address = f"127.0.0.1:{port}"
+    return webdriver.Chrome(service=service, options=options)
+
+
+def stopBrowsers():
+    """
+    Returns:
+      (int) number of browsers stopped
+    """
+    with _state_lock:
+        state = loadState()
+        stopped = 0
+        for browser in state["browsers"]:
+            # A dead browser's pid may belong to something else by now
+            if not isAlive(browser["port"]):
+                continue
+            try:
+                os.kill(browser["pid"], signal.SIGTERM)
+                stopped += 1
+            except OSError:
+                pass
+        state["browsers"] = []
+        saveState(state)
+    return stopped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm Chrome browsers for the scraper")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    start_parser = subparsers.add_parser("start", help="start browsers until N are running")
+    start_parser.add_argument("--browsers", type=int, default=config["scrape_workers"])
+    start_parser.add_argument("--headless", action="store_true", default=config["headless"])
+    subparsers.add_parser("status", help="list the browsers and the cached chromedriver")
+    subparsers.add_parser("stop", help="stop every browser")
+    args = parser.parse_args()
+
+    import global_logger
+
+    global_logger.init()
+    if args.command == "start":
+        driverPath()
+        ports = ensureBrowsers(args.browsers, args.headless)
+        print(f"{len(ports)} warm browser(s) on port(s) {', '.join(map(str, ports))}")
+    elif args.command == "status":
+        state = loadState()
+        print(
+            f"chromedriver: {state.get('driver_path') or 'not cached'}"
+            + (f" (Chrome {state['chrome_version']})" if state.get("chrome_version") else "")
+        )
+        for browser in state["browsers"]:
+            print(
+                f"  port {browser['port']:<6} pid {browser['pid']:<8} "
+                + ("headless " if browser["headless"] else "windowed ")
+                + ("alive" if isAlive(browser["port"]) else "dead")
+            )
+    else:
+        print(f"Stopped {stopBrowsers()} browser(s)")
+
+
+if __name__ == "__main__":
+    main()
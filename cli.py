@@ -0,0 +1,238 @@
+"""
+Single entry point for the pipeline. Heavy modules (pandas, selenium, bs4)
+are only imported by the subcommand that needs them, so a pick or a no-op
+update starts in a fraction of the time.
+
+  python cli.py update [--force] [--workers N] [--parse-workers N] [--headless] [--in-memory]
+                       [--patch 14.1] [--roster] [--warm] [--http [--concurrency N] [--rate R]]
+  python cli.py parse [--force] [--workers N]
+  python cli.py roster
+  python cli.py pick --role middle [--bans zed ahri] [--enemy top=garen ...]
+                     [--ally support=lux ...] [--pool ahri zed ...] [--scoring shrinkage]
+                     [--as-of 14.1] [--json | --detail]
+
+Every command takes --quiet (no progress output or per-champion tables) and
+--metrics PATH [--metrics-format jsonl|prometheus] to export stage timings and
+counters when it finishes, both defaulting to the config.
+"""
+import argparse
+import json
+import global_logger
+from global_logger import logger
+from config import SCORING_MODES, config
+from manifest import Manifest
+from util import ROLES, champ_pool
+
+
+def update(args):
+    pool = champ_pool
+    if args.roster:
+        import roster_tensor
+
+        # Every champion played in each role, once some tables exist to say who that is
+        pool = roster_tensor.rosterPool() or champ_pool
+    if args.http and not (config["http_matchups_url"] and config["http_synergies_url"]):
+        raise SystemExit(
+            "update --http needs http_matchups_url and http_synergies_url in the config, pages that serve "
+            + "the table cells in their HTML (the lolalytics pages render them client side)"
+        )
+    # One manifest read plans both the scrape and the parse
+    manifest = Manifest.load()
+    stale = manifest.planScrapes(pool, args.force)
+    if stale and args.http:
+        import http_fetch
+
+        http_fetch.fetchLolalyticsHttp(
+            pool,
+            force=args.force,
+            manifest=manifest,
+            patch=args.patch,
+            concurrency=args.concurrency,
+            rate=args.rate,
+        )
+    elif stale:
+        import web_scraping
+
+        web_scraping.fetchLolalytics(
+            pool,
+            force=args.force,
+            workers=args.workers,
+            headless=args.headless,
+            in_memory=args.in_memory,
+            manifest=manifest,
+            patch=args.patch,
+            warm=args.warm,
+        )
+    else:
+        print("All matchup & synergy data is already up-to-date")
+    parse(args, manifest, pool)
+    if args.roster:
+        roster(args)
+
+
+def parse(args, manifest: Manifest = None, pool: dict[str, list[str]] = None):
+    pool = champ_pool if pool is None else pool
+    if manifest is None:
+        manifest = Manifest.load()
+    pending, unchanged = manifest.planParses(pool, args.force)
+    if pending or unchanged:
+        import parse_lolalytics
+
+        parse_lolalytics.parseLolalytics(pool, force=args.force, workers=args.parse_workers, manifest=manifest)
+    else:
+        print("All current matchups and synergies are already parsed.")
+
+
+def roster(args):
+    import roster_tensor
+
+    for kind in ["matchups", "synergies"]:
+        if roster_tensor.updateRosterTensor(kind) is None:
+            print(f"No {kind} stored yet, nothing to build")
+            continue
+        roster_tensor.printFootprint(roster_tensor.loadRosterTensor(kind))
+
+
+def parseTeam(slots: list[str]):
+    team = {role: "" for role in ROLES}
+    for slot in slots:
+        role, _, champ = slot.partition("=")
+        if role not in team:
+            raise argparse.ArgumentTypeError(f"unknown role in {slot!r}, expected one of {ROLES}")
+        team[role] = champ
+    return team
+
+
+def pick(args):
+    import analysis
+
+    enemy_team = parseTeam(args.enemy)
+    ally_team = parseTeam(args.ally)
+    if args.pool and args.as_of:
+        raise SystemExit("--as-of reads the snapshots of the configured pool, it can't be combined with --pool")
+    if args.pool and args.detail:
+        raise SystemExit("--detail prints the configured pool's tables, it can't be combined with --pool")
+    if args.as_of:
+        try:
+            analysis.checkAsOf(dict(champ_pool), args.as_of)
+        except ValueError as e:
+            raise SystemExit(f"{e}, nothing to score as of {args.as_of}")
+    if args.detail:
+        # The full per-slot tables, which needs pandas
+        analysis.bestPick(
+            args.role, args.bans, dict(champ_pool), enemy_team, ally_team, args.scoring, args.as_of
+        )
+        return
+
+    draft = (args.role, args.bans, enemy_team, ally_team)
+    if args.pool:
+        import roster_tensor
+
+        tensors = roster_tensor.loadRosterTensors()
+        missing = [kind for kind, tensor in tensors.items() if tensor is None]
+        if missing:
+            raise SystemExit(f"No {' or '.join(missing)} roster tensor yet, run `cli.py roster` first")
+        # A hypothetical pool, sliced out of the whole-roster tensors
+        try:
+            result = roster_tensor.scoreDraft(draft, {args.role: args.pool}, tensors, args.scoring)
+        except KeyError as e:
+            raise SystemExit(f"unknown champion: {e.args[0]}")
+    else:
+        result = analysis.scoreDraft(
+            draft, champ_pool, analysis.loadPoolTables(champ_pool, args.as_of), args.scoring
+        )
+    if args.json:
+        print(json.dumps(result))
+        return
+    print(f"{'my_champ':<14}{'sc1':>6}{'sc2':>6}{'∑sc':>6}{'wr':>9}{'Δ1':>8}{'Δ2':>8}")
+    for ranking in result["rankings"]:
+        means = [ranking[column] for column in ["wr", "delta1", "delta2"]]
+        means = ["" if mean is None else f"{mean:.2f}" for mean in means]
+        print(
+            f"{ranking['my_champ']:<14}{ranking['sc1']:>6}{ranking['sc2']:>6}{ranking['sum']:>6}"
+            + f"{means[0]:>9}{means[1]:>8}{means[2]:>8}"
+        )
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="League of Legends best matchup tool")
+    parser.add_argument("--quiet", action="store_true", default=None, help="no progress output")
+    parser.add_argument("--metrics", metavar="PATH", help="write stage timings and counters here at exit")
+    parser.add_argument("--metrics-format", choices=global_logger.METRICS_FORMATS)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = subparsers.add_parser("update", help="scrape stale champions, then parse")
+    update_parser.add_argument("--force", action="store_true", help="ignore the staleness checks")
+    update_parser.add_argument(
+        "--workers", type=int, default=config["scrape_workers"], help="parallel Chrome drivers"
+    )
+    update_parser.add_argument(
+        "--parse-workers", type=int, default=config["parse_workers"], help="parallel parser processes"
+    )
+    update_parser.add_argument(
+        "--headless", action="store_true", default=config["headless"], help="hide the Chrome windows"
+    )
+    update_parser.add_argument("--in-memory", action="store_true", help="parse while scraping, no HTML files")
+    update_parser.add_argument("--patch", help="game patch being scraped, recorded in the manifest")
+    update_parser.add_argument(
+        "--roster", action="store_true", help="scrape the whole roster and update the roster tensors"
+    )
+    update_parser.add_argument(
+        "--warm",
+        action="store_true",
+        default=config["warm_browsers"],
+        help="scrape on browsers left running between updates (see browser_pool.py)",
+    )
+    update_parser.add_argument(
+        "--http", action="store_true", help="fetch the pages over plain HTTP instead of driving Chrome"
+    )
+    update_parser.add_argument(
+        "--concurrency", type=int, default=config["http_concurrency"], help="HTTP requests in flight"
+    )
+    update_parser.add_argument(
+        "--rate", type=float, default=config["http_rate"], help="HTTP requests per second, 0 for no limit"
+    )
+    update_parser.set_defaults(func=update)
+
+    parse_parser = subparsers.add_parser("parse", help="parse scraped HTML into the tables")
+    parse_parser.add_argument("--force", action="store_true", help="ignore the staleness checks")
+    parse_parser.add_argument(
+        "--workers",
+        dest="parse_workers",
+        type=int,
+        default=config["parse_workers"],
+        help="parallel parser processes",
+    )
+    parse_parser.set_defaults(func=parse)
+
+    roster_parser = subparsers.add_parser("roster", help="update the whole-roster tensors from the store")
+    roster_parser.set_defaults(func=roster)
+
+    pick_parser = subparsers.add_parser("pick", help="rank the pool for a draft")
+    pick_parser.add_argument("--role", required=True, choices=ROLES)
+    pick_parser.add_argument("--bans", nargs="*", default=[])
+    pick_parser.add_argument("--enemy", nargs="*", default=[], metavar="ROLE=CHAMP")
+    pick_parser.add_argument("--ally", nargs="*", default=[], metavar="ROLE=CHAMP")
+    pick_parser.add_argument("--pool", nargs="*", help="score this pool from the roster tensors instead")
+    pick_parser.add_argument(
+        "--scoring",
+        choices=SCORING_MODES,
+        default=config["scoring"],
+        help="drop matchups under the minimum games, or shrink every matchup by its sample size",
+    )
+    pick_parser.add_argument(
+        "--as-of", metavar="PATCH|DATE", help="score with the data as of a patch (14.1) or date (YYYY-MM-DD)"
+    )
+    output = pick_parser.add_mutually_exclusive_group()
+    output.add_argument("--json", action="store_true", help="print the rankings as JSON")
+    output.add_argument("--detail", action="store_true", help="print bestPick's full tables")
+    pick_parser.set_defaults(func=pick)
+
+    args = parser.parse_args(argv)
+    global_logger.init(args.quiet, args.metrics, args.metrics_format)
+    logger.debug(f"Running {args.command}")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
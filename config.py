@@ -0,0 +1,128 @@
+"""
+Settings for the pipeline: where the data lives, the champion pool, the
+staleness thresholds, how many scrapers/parsers run at once and how the
+HTTP fetcher paces its requests.
+
+Every setting has a default below. A JSON config file overrides them (the one
+named by BEST_MATCHUP_CONFIG, else config.json next to this file if there is
+one), and BEST_MATCHUP_<SETTING> environment variables override both for the
+scalar settings, e.g.
+
+  BEST_MATCHUP_DATA_ROOT=/mnt/tmpfs/bm BEST_MATCHUP_SCRAPE_WORKERS=4 python cli.py update
+
+so parallel jobs can each point at their own data root. A relative data_root
+in a config file is relative to that file. See config.example.json.
+"""
+import json
+import os
+from pathlib import Path
+
+ENV_PREFIX = "BEST_MATCHUP_"
+CONFIG_ENV = ENV_PREFIX + "CONFIG"
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent / "config.json"
+# Values of the scoring setting, see analysis.py
+SCORING_MODES = ["cutoff", "shrinkage"]
+
+DEFAULTS = {
+    "data_root": str(Path(__file__).resolve().parent / "data"),
+    "pool": {
+        "top": ["illaoi", "malphite", "yone", "akshan"],
+        "jungle": [],
+        "middle": ["ahri", "yone", "akshan", "lissandra"],
+        "bottom": [],
+        "support": [],
+    },
+    # Scrape a champion again once its data is this many days old
+    "scrape_max_age_days": 3,
+    # Without a manifest entry, re-parse a dump if its CSV is this many days old
+    "parse_max_age_days": 1,
+    "scrape_workers": 1,
+    "parse_workers": 1,
+    "headless": False,
+    # Keep a compressed history of every table written (see snapshot_store.py)
+    "snapshots": True,
+    # How pick scores matchups with few games, "cutoff" or "shrinkage" (see analysis.py)
+    "scoring": "cutoff",
+    # Keep the scrape browsers running between updates (see browser_pool.py)
+    "warm_browsers": False,
+    # Chrome for the warm browsers, "" to search the usual install locations
+    "chrome_binary": "",
+    # Silence progress output and per-champion tables (global_logger.show)
+    "quiet": False,
+    # Where global_logger writes its metrics at exit, "" for nowhere
+    "metrics_path": "",
+    "metrics_format": "jsonl",
+    # Pages fetched by `update --http`, {role} and {champ} are filled in. They
+    # must serve the table cells in the HTML, which the lolalytics pages don't
+    # (they render them client side), so there's no default and --http refuses
+    # to run until both are set, e.g. to a stub_lolalytics.py server
+    "http_matchups_url": "",
+    "http_synergies_url": "",
+    "http_concurrency": 8,
+    # Requests per second across every connection, 0 for no limit
+    "http_rate": 5.0,
+    "http_retries": 3,
+}
+
+
+def parseEnvValue(name: str, value: str, default):
+    """Converts an environment variable to the type of the setting's default"""
+    if isinstance(default, bool):
+        if value.lower() in ("1", "true", "yes", "on"):
+            return True
+        if value.lower() in ("0", "false", "no", "off", ""):
+            return False
+        raise ValueError(f"{name}={value!r} is not a boolean")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+def loadConfig(path: str = None, environ: dict[str, str] = None):
+    """
+    Builds the settings from the defaults, the config file and the environment
+
+    Parameters:
+      path (str): config file to read, else BEST_MATCHUP_CONFIG, else
+          config.json next to this module if it exists
+      environ (dict[str, str]): environment to read overrides from, os.environ
+          if None
+
+    Returns:
+      (dict) every key of DEFAULTS, with data_root an absolute path
+
+    Raises:
+      ValueError for a setting not in DEFAULTS, or a scoring not in
+          SCORING_MODES
+    """
+    environ = os.environ if environ is None else environ
+    config = json.loads(json.dumps(DEFAULTS))
+    if path is None:
+        path = environ.get(CONFIG_ENV)
+    if path is None and DEFAULT_CONFIG_PATH.exists():
+        path = DEFAULT_CONFIG_PATH
+
+    if path is not None:
+        path = Path(path)
+        with open(path, encoding="utf-8") as fp:
+            overrides = json.load(fp)
+        unknown = set(overrides) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"{path}: unknown settings {sorted(unknown)}, expected {sorted(DEFAULTS)}")
+        if "data_root" in overrides:
+            overrides["data_root"] = str(path.resolve().parent / Path(overrides["data_root"]).expanduser())
+        config.update(overrides)
+
+    for name, default in DEFAULTS.items():
+        env_name = ENV_PREFIX + name.upper()
+        if env_name in environ and not isinstance(default, dict):
+            config[name] = parseEnvValue(env_name, environ[env_name], default)
+    if config["scoring"] not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring {config['scoring']!r}, expected one of {SCORING_MODES}")
+    config["data_root"] = str(Path(config["data_root"]).expanduser().resolve())
+    return config
+
+
+config = loadConfig()
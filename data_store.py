@@ -0,0 +1,350 @@
+"""
+Columnar store for the parsed matchup and synergy tables.
+
+Every kind ("matchups", "synergies") is kept in its own directory as one .npy
+file per column plus an index.json mapping "<my_role>/<my_champ>" to the
+[start, stop) row range of that champion's block. Loading memory-maps the
+columns, so a whole pool is available after one open with no CSV parsing.
+
+Run this module directly to migrate an existing data/<role>/<kind>/*.csv tree
+into the store.
+
+pandas is only imported on the paths that build or read DataFrames, so
+reading the store for a pick needs nothing heavier than NumPy.
+"""
+from __future__ import annotations
+import json
+import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+import numpy as np
+from global_logger import logger, metrics
+from util import (
+    ROLES,
+    stat_types,
+    getStoreDir,
+    getMatchupCSVDir,
+    getSynergyCSVDir,
+    getCSVPath,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+KINDS = ["matchups", "synergies"]
+NAME_DTYPE = "<U24"
+COLUMN_DTYPES = {
+    "my_role": np.int8,
+    "my_champ": NAME_DTYPE,
+    "other_role": np.int8,
+    "other_champ": NAME_DTYPE,
+    "wr": np.float64,
+    "delta1": np.float64,
+    "delta2": np.float64,
+    "pr": np.float64,
+    "games": np.int64,
+}
+INDEX_FILE = "index.json"
+
+
+def storeKey(my_role: str, my_champ: str):
+    return my_role + "/" + my_champ
+
+
+class ChampTable:
+    """
+    All rows for one (my_role, my_champ) block
+
+    Attributes:
+      roles (np.ndarray): index into ROLES of the other champion's role
+      champs (np.ndarray): name of the other champion
+      stats (dict[str, np.ndarray]): one array per entry of stat_types
+      derived (dict): arrays computed from the stats once per table (e.g.
+          analysis.shrunkStats), so they go stale with the table itself
+    """
+
+    def __init__(self, roles: np.ndarray, champs: np.ndarray, stats: dict[str, np.ndarray]):
+        self.roles = roles
+        self.champs = champs
+        self.stats = stats
+        self.derived = {}
+        self._index = None
+
+    def __len__(self):
+        return len(self.champs)
+
+    @property
+    def index(self):
+        """(role, champ) -> row offset, built once on first use"""
+        if self._index is None:
+            index: dict[tuple[str, str], int] = {}
+            for row, (role, champ) in enumerate(zip(self.roles.tolist(), self.champs.tolist())):
+                # Keep the first row for a repeated key, as the old boolean-mask lookup did
+                index.setdefault((ROLES[role], champ), row)
+            self._index = index
+        return self._index
+
+    def lookup(self, role: str, champ: str):
+        """Returns the row offset of champ in role, None if the table has no such row"""
+        return self.index.get((role, champ))
+
+    def toDataFrame(self):
+        """Builds a DataFrame shaped like the per-champion CSVs (role, champ, stats)"""
+        import pandas as pd
+
+        df = pd.DataFrame(
+            {
+                "role": [ROLES[role] for role in self.roles],
+                "champ": self.champs.astype(str),
+            }
+        )
+        for stat in stat_types:
+            df[stat] = np.asarray(self.stats[stat])
+        return df
+
+    @staticmethod
+    def fromDataFrame(df: pd.DataFrame):
+        roles = np.array([ROLES.index(role) for role in df["role"]], dtype=np.int8)
+        champs = np.array(df["champ"].astype(str), dtype=NAME_DTYPE)
+        stats = {
+            stat: np.array(df[stat], dtype=COLUMN_DTYPES[stat]) for stat in stat_types
+        }
+        return ChampTable(roles, champs, stats)
+
+
+class ColumnStore:
+    """A loaded (memory-mapped) store of one kind"""
+
+    def __init__(self, kind: str, columns: dict[str, np.ndarray], offsets: dict[str, list[int]]):
+        self.kind = kind
+        self.columns = columns
+        self.offsets = offsets
+
+    def keys(self):
+        return [tuple(key.split("/")) for key in self.offsets]
+
+    def table(self, my_role: str, my_champ: str):
+        """Returns the ChampTable for my_champ in my_role, None if not stored"""
+        offset = self.offsets.get(storeKey(my_role, my_champ))
+        if offset is None:
+            return None
+        start, stop = offset
+        return ChampTable(
+            self.columns["other_role"][start:stop],
+            self.columns["other_champ"][start:stop],
+            {stat: self.columns[stat][start:stop] for stat in stat_types},
+        )
+
+
+def loadStore(kind: str, mmap: bool = True):
+    """
+    Opens the store for the given kind
+
+    Parameters:
+      kind (str): "matchups" or "synergies"
+      mmap (bool): memory-map the columns instead of reading them into memory
+
+    Returns:
+      (ColumnStore) or None if no store has been written yet
+    """
+    store_dir = getStoreDir(kind)
+    index_path = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, encoding="utf-8") as fp:
+        offsets = json.load(fp)
+    mmap_mode = "r" if mmap else None
+    columns = {}
+    for column in COLUMN_DTYPES:
+        columns[column] = np.load(os.path.join(store_dir, column + ".npy"), mmap_mode=mmap_mode)
+    return ColumnStore(kind, columns, offsets)
+
+
+def writeStore(kind: str, tables: dict[tuple[str, str], pd.DataFrame]):
+    """
+    Merges newly parsed tables into the store, replacing any existing block
+      for the same (my_role, my_champ)
+
+    Parameters:
+      kind (str): "matchups" or "synergies"
+      tables (dict[tuple[str, str], pd.DataFrame]): parsed tables keyed by
+          (my_role, my_champ)
+
+    Returns:
+      (int) number of rows in the rewritten store
+    """
+    blocks: dict[tuple[str, str], ChampTable] = {}
+    existing = loadStore(kind, mmap=False)
+    if existing is not None:
+        for key in existing.keys():
+            blocks[key] = existing.table(*key)
+    for key, df in tables.items():
+        blocks[key] = ChampTable.fromDataFrame(df)
+
+    columns: dict[str, list[np.ndarray]] = {column: [] for column in COLUMN_DTYPES}
+    offsets: dict[str, list[int]] = {}
+    num_rows = 0
+    for my_role, my_champ in sorted(blocks):
+        block = blocks[(my_role, my_champ)]
+        count = len(block)
+        offsets[storeKey(my_role, my_champ)] = [num_rows, num_rows + count]
+        num_rows += count
+        columns["my_role"].append(np.full(count, ROLES.index(my_role), dtype=np.int8))
+        columns["my_champ"].append(np.full(count, my_champ, dtype=NAME_DTYPE))
+        columns["other_role"].append(block.roles)
+        columns["other_champ"].append(block.champs)
+        for stat in stat_types:
+            columns[stat].append(block.stats[stat])
+
+    store_dir = getStoreDir(kind)
+    os.makedirs(store_dir, exist_ok=True)
+    for column, dtype in COLUMN_DTYPES.items():
+        data = np.concatenate(columns[column]) if columns[column] else np.empty(0)
+        tmp_path = os.path.join(store_dir, column + ".npy.tmp")
+        with open(tmp_path, "wb") as fp:
+            np.save(fp, data.astype(dtype))
+        os.replace(tmp_path, os.path.join(store_dir, column + ".npy"))
+    # The index goes last so readers never see offsets past the end of a column
+    tmp_path = os.path.join(store_dir, INDEX_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump(offsets, fp)
+    os.replace(tmp_path, os.path.join(store_dir, INDEX_FILE))
+    logger.info(f"Wrote {num_rows} rows for {len(offsets)} champions to the {kind} store")
+    return num_rows
+
+
+def getChampTable(store: ColumnStore, kind: str, my_role: str, my_champ: str):
+    """
+    Returns the table for my_champ in my_role from the store, falling back to
+      the per-champion CSV for champions the store doesn't have yet
+    """
+    table = store.table(my_role, my_champ) if store is not None else None
+    if table is not None:
+        return table
+    logger.warning(
+        f"{my_champ} {my_role} missing from the {kind} store, reading CSV "
+        + "(run data_store.py to migrate)"
+    )
+    import pandas as pd
+
+    return ChampTable.fromDataFrame(pd.read_csv(getCSVPath(kind, my_role, my_champ)))
+
+
+def _mtime(path: str):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class TableCache:
+    """
+    Long-lived LRU of loaded ChampTables keyed by (kind, my_role, my_champ), so
+      repeated queries in one session skip the store/CSV and reuse each
+      table's (role, champ) index.
+
+    Every entry remembers the mtime of the file it came from (the store's
+    index.json, or the CSV for champions not in the store yet) and is reloaded
+    when that changes.
+    """
+
+    def __init__(self, max_tables: int = 256):
+        self.max_tables = max_tables
+        self._tables: OrderedDict[tuple[str, str, str], tuple[str, int, ChampTable]] = OrderedDict()
+        self._stores: dict[str, tuple[int, ColumnStore]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def table(self, kind: str, my_role: str, my_champ: str):
+        key = (kind, my_role, my_champ)
+        entry = self._tables.get(key)
+        if entry is not None:
+            source_path, mtime, table = entry
+            if _mtime(source_path) == mtime:
+                self.hits += 1
+                metrics.count("table_cache.hits")
+                self._tables.move_to_end(key)
+                return table
+            self.invalidations += 1
+            metrics.count("table_cache.invalidations")
+            del self._tables[key]
+
+        self.misses += 1
+        metrics.count("table_cache.misses")
+        store = self._store(kind)
+        table = store.table(my_role, my_champ) if store is not None else None
+        if table is not None:
+            source_path = os.path.join(getStoreDir(kind), INDEX_FILE)
+        else:
+            source_path = getCSVPath(kind, my_role, my_champ)
+            table = getChampTable(None, kind, my_role, my_champ)
+        self._tables[key] = (source_path, _mtime(source_path), table)
+        while len(self._tables) > self.max_tables:
+            self._tables.popitem(last=False)
+            self.evictions += 1
+            metrics.count("table_cache.evictions")
+        return table
+
+    def _store(self, kind: str):
+        """The open store of a kind, reopened when its index.json changes"""
+        mtime = _mtime(os.path.join(getStoreDir(kind), INDEX_FILE))
+        cached = self._stores.get(kind)
+        if cached is None or cached[0] != mtime:
+            self._stores[kind] = (mtime, loadStore(kind))
+        return self._stores[kind][1]
+
+    def stats(self):
+        return {
+            "tables": len(self._tables),
+            "max_tables": self.max_tables,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        self._tables.clear()
+        self._stores.clear()
+
+
+# Shared by every query in this process
+table_cache = TableCache()
+
+
+def migrateCsvTree():
+    """
+    One-shot migration of the existing data/<role>/matchups|synergies/*.csv
+      tree into the columnar store
+
+    Returns:
+      (dict[str, int]) number of champion tables migrated per kind
+    """
+    import pandas as pd
+
+    migrated = {}
+    for kind in KINDS:
+        tables: dict[tuple[str, str], pd.DataFrame] = {}
+        for role in ROLES:
+            csv_dir = getMatchupCSVDir(role) if kind == "matchups" else getSynergyCSVDir(role)
+            if not os.path.isdir(csv_dir):
+                continue
+            for filename in sorted(os.listdir(csv_dir)):
+                if not filename.endswith(".csv"):
+                    continue
+                champ = filename[: -len(".csv")]
+                tables[(role, champ)] = pd.read_csv(os.path.join(csv_dir, filename))
+        if tables:
+            writeStore(kind, tables)
+        migrated[kind] = len(tables)
+        print(f"Migrated {len(tables)} {kind} tables")
+    return migrated
+
+
+if __name__ == "__main__":
+    import global_logger
+
+    global_logger.init()
+    migrateCsvTree()
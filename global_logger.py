@@ -1,4 +1,11 @@
+import atexit
+import functools
+import json
 import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
 
 logger = logging.getLogger("")
 '''
@@ -10,11 +17,142 @@ logger = logging.getLogger("")
      DEBUG     : 10
      NOTSET     :  0
 '''
-def init():
+METRIC_PREFIX = "best_matchup_"
+METRICS_FORMATS = ["jsonl", "prometheus"]
+
+# Set by init(quiet=True): show() stops printing, for batch runs
+quiet = False
+
+def init(quiet_mode:bool = None, metrics_path:str = None, metrics_format:str = None):
+  """
+  Sets up logging, and optionally quiet mode and a metrics export at exit.
+    Arguments left as None come from the config (quiet, metrics_path,
+    metrics_format, see config.py).
+
+  Parameters:
+    quiet_mode (bool): stop show() printing progress and per-champion tables
+    metrics_path (str): file the metrics are written to when the program exits
+    metrics_format (str): "jsonl" or "prometheus"
+  """
+  global quiet
+  from config import config
+  quiet = config["quiet"] if quiet_mode is None else quiet_mode
+  metrics_path = config["metrics_path"] if metrics_path is None else metrics_path
+  metrics_format = config["metrics_format"] if metrics_format is None else metrics_format
+  if metrics_format not in METRICS_FORMATS:
+    raise ValueError(f"metrics_format must be one of {METRICS_FORMATS}, not {metrics_format!r}")
+
   # function_only_format = "%(funcName)s(): %(message)s"
   # standard_format = "%(levelname)s: %(filename)s:%(lineno)d: %(funcName)s(): %(message)s"
   # logging.basicConfig(format=standard_format)
   standard_format = "%(levelname)s: %(message)s"
   logging.basicConfig(format=standard_format)
   logger.setLevel(logging.INFO)
-  logger.debug("Logging initialized on program start-up")
\ No newline at end of file
+  logger.debug("Logging initialized on program start-up")
+  if metrics_path:
+    atexit.register(metrics.write, metrics_path, metrics_format)
+
+def show(*args, **kwargs):
+  """print() for progress output and tables, silenced in quiet mode"""
+  if not quiet:
+    print(*args, **kwargs)
+
+class Metrics:
+  """
+  Process-wide counters and timing spans. Spans keep a count, total and max
+    per name rather than every sample, so hot paths can be timed for the
+    whole run. Safe to use from scraper threads; worker processes report
+    their timings back for the parent to observe().
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.started = time.time()
+    self.counters = {}
+    self.spans = {}
+
+  def count(self, name:str, value:int = 1):
+    with self._lock:
+      self.counters[name] = self.counters.get(name, 0) + value
+
+  def observe(self, name:str, seconds:float):
+    with self._lock:
+      span = self.spans.get(name)
+      if span is None:
+        span = self.spans[name] = {"count": 0, "total_s": 0.0, "max_s": 0.0}
+      span["count"] += 1
+      span["total_s"] += seconds
+      span["max_s"] = max(span["max_s"], seconds)
+
+  @contextmanager
+  def span(self, name:str):
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.observe(name, time.perf_counter() - start)
+
+  def timed(self, name:str):
+    """Decorator timing every call of a function as a span"""
+    def decorator(function):
+      @functools.wraps(function)
+      def wrapper(*args, **kwargs):
+        with self.span(name):
+          return function(*args, **kwargs)
+      return wrapper
+    return decorator
+
+  def snapshot(self):
+    with self._lock:
+      return {
+        "uptime_s": time.time() - self.started,
+        "counters": dict(self.counters),
+        "spans": {name: dict(span) for name, span in self.spans.items()},
+      }
+
+  def toJsonl(self):
+    """One JSON object per counter and span"""
+    snapshot = self.snapshot()
+    timestamp = time.time()
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+      lines.append(json.dumps({"ts": timestamp, "type": "counter", "name": name, "value": value}))
+    for name, span in sorted(snapshot["spans"].items()):
+      lines.append(json.dumps({"ts": timestamp, "type": "span", "name": name, **span}))
+    return "".join(line + "\n" for line in lines)
+
+  def toPrometheus(self):
+    """Prometheus text exposition format: counters as *_total, spans as a summary"""
+    snapshot = self.snapshot()
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+      metric = METRIC_PREFIX + re.sub(r"[^a-zA-Z0-9_]", "_", name) + "_total"
+      lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+    if snapshot["spans"]:
+      metric = METRIC_PREFIX + "span_seconds"
+      lines.append(f"# TYPE {metric} summary")
+      for name, span in sorted(snapshot["spans"].items()):
+        lines.append(f'{metric}_count{{span="{name}"}} {span["count"]}')
+        lines.append(f'{metric}_sum{{span="{name}"}} {span["total_s"]}')
+      lines.append(f"# TYPE {metric}_max gauge")
+      for name, span in sorted(snapshot["spans"].items()):
+        lines.append(f'{metric}_max{{span="{name}"}} {span["max_s"]}')
+    return "".join(line + "\n" for line in lines)
+
+  def write(self, path:str, metrics_format:str = "jsonl"):
+    """Appends JSON lines (one batch per run) or overwrites a Prometheus text file"""
+    if metrics_format == "prometheus":
+      with open(path, "w", encoding="utf-8") as fp:
+        fp.write(self.toPrometheus())
+    else:
+      with open(path, "a", encoding="utf-8") as fp:
+        fp.write(self.toJsonl())
+
+  def reset(self):
+    with self._lock:
+      self.started = time.time()
+      self.counters.clear()
+      self.spans.clear()
+
+# Shared by every module in this process
+metrics = Metrics()
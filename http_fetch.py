@@ -0,0 +1,343 @@
+"""
+Browser-free ingestion: fetches champion pages over plain HTTP with asyncio
+and parses them into the same matchup/synergy CSVs and store that the Selenium
+scraper produces (through parse_lolalytics.TableBuilder).
+
+One pooled keep-alive client (stdlib only, like server.py) is shared by every
+request, with at most `concurrency` requests in flight, a global rate limit
+and retries with exponential backoff on connection errors, timeouts, 429 and
+5xx responses (honouring Retry-After).
+
+The pages fetched per kind come from URL templates ({role} and {champ} are
+filled in), set by the http_matchups_url/http_synergies_url config settings.
+They must serve every cell of the table in the markup, which the
+client-rendered lolalytics build page doesn't, so neither has a default and
+nothing is fetched until both are set; stub_lolalytics.py serves such pages
+locally.
+
+  python cli.py update --http [--concurrency 16] [--rate 20]
+"""
+import asyncio
+import gzip
+import random
+import ssl
+import time
+from urllib.parse import urlsplit
+from config import config
+from global_logger import logger, metrics
+from data_store import writeStore
+from manifest import Manifest, contentHash, printScrapePlan
+from parse_lolalytics import TableBuilder, writeCSVAtomic
+from snapshot_store import snapshotTables
+from util import getCSVPath
+
+KINDS = ["matchups", "synergies"]
+USER_AGENT = "Mozilla/5.0 (compatible; best-matchup)"
+REQUEST_TIMEOUT = 20
+# First retry waits about this long, doubling (with jitter) after every failure
+BACKOFF_SECONDS = 0.5
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpError(Exception):
+    pass
+
+
+def configuredTemplates():
+    """
+    URL templates per kind from the config
+
+    Raises:
+      ValueError if either isn't set
+    """
+    templates = {kind: config[f"http_{kind}_url"] for kind in KINDS}
+    missing = [f"http_{kind}_url" for kind, template in templates.items() if not template]
+    if missing:
+        raise ValueError(
+            f"Set {' and '.join(missing)} in the config to pages that serve the table cells in their HTML "
+            + "(the lolalytics pages render them client side), e.g. a stub_lolalytics.py server"
+        )
+    return templates
+
+
+class RateLimiter:
+    """Spaces requests at least 1/rate seconds apart, across every task"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if self.interval == 0:
+            return
+        now = asyncio.get_running_loop().time()
+        # Claim the next slot before sleeping, so concurrent waiters queue up behind it
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class HttpPool:
+    """
+    Minimal HTTP/1.1 GET client keeping idle keep-alive connections per host.
+      Create it inside the running event loop.
+    """
+
+    def __init__(self, concurrency: int = 8, timeout: float = REQUEST_TIMEOUT):
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(concurrency)
+        self._idle: dict[tuple[str, str, int], list] = {}
+        self._ssl = ssl.create_default_context()
+
+    async def _connect(self, key: tuple[str, str, int]):
+        scheme, host, port = key
+        metrics.count("http.connections")
+        return await asyncio.open_connection(host, port, ssl=self._ssl if scheme == "https" else None)
+
+    async def get(self, url: str):
+        """
+        Returns:
+          (tuple[int, dict[str, str], bytes]) status, lower-cased headers and
+              the decoded body
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+        async with self._slots:
+            idle = self._idle.setdefault(key, [])
+            reused = bool(idle)
+            connection = idle.pop() if reused else await self._connect(key)
+            try:
+                status, headers, body, keep_alive = await asyncio.wait_for(
+                    self._request(connection, parts.netloc, target), self.timeout
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                connection[1].close()
+                if not reused:
+                    raise
+                # The server dropped an idle connection, which isn't worth a retry's backoff
+                logger.debug(f"Stale connection for {url}: {e}")
+                connection = await self._connect(key)
+                try:
+                    status, headers, body, keep_alive = await asyncio.wait_for(
+                        self._request(connection, parts.netloc, target), self.timeout
+                    )
+                except BaseException:
+                    connection[1].close()
+                    raise
+            except BaseException:
+                connection[1].close()
+                raise
+            if keep_alive:
+                idle.append(connection)
+            else:
+                connection[1].close()
+        return status, headers, body
+
+    async def _request(self, connection, host: str, target: str):
+        reader, writer = connection
+        writer.write(
+            (
+                f"GET {target} HTTP/1.1\r\n"
+                + f"Host: {host}\r\n"
+                + f"User-Agent: {USER_AGENT}\r\n"
+                + "Accept-Encoding: gzip\r\n"
+                + "Connection: keep-alive\r\n\r\n"
+            ).encode("latin-1")
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed before the response")
+        status = int(status_line.decode("latin-1").split(None, 2)[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";", 1)[0], 16)
+                if size == 0:
+                    # Skip any trailers up to the blank line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        if headers.get("content-encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return status, headers, body, keep_alive
+
+    def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+async def fetchWithRetries(client: HttpPool, limiter: RateLimiter, url: str, retries: int = 3):
+    """
+    GETs url, retrying connection errors, timeouts and RETRY_STATUSES with
+      exponential backoff
+
+    Returns:
+      (bytes) body of the 200 response
+    """
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        retry_after = None
+        try:
+            status, headers, body = await client.get(url)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+            error = f"{type(e).__name__}: {e}"
+        else:
+            if status == 200:
+                return body
+            if status not in RETRY_STATUSES:
+                raise HttpError(f"HTTP {status} for {url}")
+            error = f"HTTP {status}"
+            retry_after = headers.get("retry-after")
+        if attempt == retries:
+            raise HttpError(f"{error} for {url} after {retries + 1} attempts")
+        delay = BACKOFF_SECONDS * 2**attempt * random.uniform(0.5, 1.0)
+        if retry_after is not None and retry_after.isdigit():
+            delay = float(retry_after)
+        metrics.count("http.retries")
+        logger.warning(f"{error} for {url}, retrying in {delay:.2f}s (attempt {attempt + 1})")
+        await asyncio.sleep(delay)
+
+
+async def fetchChampion(
+    client: HttpPool, limiter: RateLimiter, my_role: str, champ: str, templates: dict[str, str], retries: int
+):
+    """
+    Fetches and parses both kinds of one champion
+
+    Returns:
+      (dict[str, pd.DataFrame]) table per kind
+    """
+    tables = {}
+    for kind in KINDS:
+        start = time.perf_counter()
+        body = await fetchWithRetries(client, limiter, templates[kind].format(role=my_role, champ=champ), retries)
+        metrics.observe("http.fetch", time.perf_counter() - start)
+        builder = TableBuilder(kind)
+        try:
+            builder.addHtml(body.decode("utf-8"))
+        except Exception as e:
+            # A bad encoding, broken markup or a malformed cell fails this champion only
+            raise HttpError(f"{kind} page for {champ} {my_role}: {type(e).__name__}: {e}")
+        if not builder.rows:
+            raise HttpError(f"{kind} page for {champ} {my_role} has no cells")
+        tables[kind] = builder.toDataFrame()
+    return tables
+
+
+async def fetchTables(
+    pool_keys: list[tuple[str, str]],
+    templates: dict[str, str] = None,
+    concurrency: int = None,
+    rate: float = None,
+    retries: int = None,
+):
+    """
+    Fetches every (my_role, champ) concurrently, a failed champion doesn't
+      stop the others. Unset arguments come from the config.
+
+    Returns:
+      (tuple[dict, dict]) DataFrames per kind keyed by (my_role, champ), and
+          the error of every champion that failed
+    """
+    templates = templates or configuredTemplates()
+    concurrency = config["http_concurrency"] if concurrency is None else concurrency
+    rate = config["http_rate"] if rate is None else rate
+    retries = config["http_retries"] if retries is None else retries
+
+    client = HttpPool(concurrency)
+    limiter = RateLimiter(rate)
+    tables = {kind: {} for kind in KINDS}
+    errors = {}
+
+    async def fetchOne(my_role: str, champ: str):
+        try:
+            champ_tables = await fetchChampion(client, limiter, my_role, champ, templates, retries)
+        except Exception as e:
+            # Anything unexpected is recorded too, so it can't cancel the rest of the gather
+            errors[(my_role, champ)] = str(e) if isinstance(e, HttpError) else f"{type(e).__name__}: {e}"
+            metrics.count("http.failures")
+            logger.error(f"Failed to fetch {champ} {my_role}: {e}")
+            return
+        for kind, df in champ_tables.items():
+            tables[kind][(my_role, champ)] = df
+        metrics.count("http.champions")
+
+    try:
+        await asyncio.gather(*(fetchOne(my_role, champ) for my_role, champ in pool_keys))
+    finally:
+        client.close()
+    return tables, errors
+
+
+def fetchLolalyticsHttp(
+    pool: dict[str, list[str]],
+    force: bool = False,
+    manifest: Manifest = None,
+    patch: str = None,
+    templates: dict[str, str] = None,
+    concurrency: int = None,
+    rate: float = None,
+    retries: int = None,
+):
+    """
+    HTTP counterpart of web_scraping.fetchLolalytics with in_memory: fetches
+      every stale champion, writes the CSVs and store, and records the
+      manifest
+
+    Returns:
+      (dict) "fetched" and "failed" champion counts, "errors" and "seconds"
+    """
+    print("\nFetching updated matchup data from Lolalytics over HTTP\n" + ("*" * 80))
+    templates = templates or configuredTemplates()
+    if manifest is None:
+        manifest = Manifest.load()
+    stale = manifest.planScrapes(pool, force)
+    printScrapePlan(pool, stale)
+    if not stale:
+        return {"fetched": 0, "failed": 0, "errors": {}, "seconds": 0.0}
+
+    start = time.perf_counter()
+    tables, errors = asyncio.run(fetchTables(stale, templates, concurrency, rate, retries))
+    seconds = time.perf_counter() - start
+    for kind, kind_tables in tables.items():
+        for (my_role, champ), df in kind_tables.items():
+            writeCSVAtomic(df, getCSVPath(kind, my_role, champ))
+            # Same as the in-memory scrape: the parsed table stands in for the HTML
+            table_hash = contentHash(df.to_csv().encode("utf-8"))
+            manifest.recordScrape(my_role, champ, kind, table_hash, patch)
+            manifest.recordParse(my_role, champ, kind, len(df), table_hash)
+        if kind_tables:
+            writeStore(kind, kind_tables)
+            snapshotTables(kind, kind_tables, manifest)
+    manifest.save()
+
+    fetched = len(stale) - len(errors)
+    logger.info(
+        f"Fetched {fetched}/{len(stale)} champions in {seconds:.2f}s "
+        + f"({fetched / max(seconds, 1e-9) * 60:.0f} champions/min)"
+    )
+    print("\nFetching complete.\n")
+    return {"fetched": fetched, "failed": len(errors), "errors": errors, "seconds": seconds}
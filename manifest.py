@@ -0,0 +1,167 @@
+"""
+Manifest of every scrape and parse, so staleness planning for a whole pool is
+one JSON read instead of a stat per CSV.
+
+manifest.json maps "<role>/<champ>/<kind>" to
+  scraped_at   epoch seconds of the last scrape
+  parsed_at    epoch seconds of the last parse into the CSV and store
+  patch        game patch the page was scraped for, None if unknown
+  rows         rows in the parsed table
+  hash         content hash of the last scraped HTML
+  parsed_hash  content hash of the HTML the current CSV was parsed from
+
+Champions missing from the manifest (data from before it existed) fall back to
+the old CSV mtime checks, and get an entry on their next scrape.
+"""
+import hashlib
+import json
+import os
+import time
+from config import config
+from global_logger import logger
+from util import (
+    getCSVPath,
+    getHTMLSavePath,
+    getManifestPath,
+    cutoffTimestamp,
+    needsUpdate,
+)
+
+KINDS = ["matchups", "synergies"]
+# Scrape a champion again once its data is this many days old
+SCRAPE_MAX_AGE_DAYS = config["scrape_max_age_days"]
+# Without a manifest entry, re-parse a dump if its CSV is this many days old
+PARSE_MAX_AGE_DAYS = config["parse_max_age_days"]
+
+
+def contentHash(data: bytes):
+    return hashlib.sha256(data).hexdigest()
+
+
+def manifestKey(role: str, champ: str, kind: str):
+    return role + "/" + champ + "/" + kind
+
+
+class Manifest:
+    """
+    The loaded manifest.json. Recording only updates memory, call save() once
+      the run is done.
+    """
+
+    def __init__(self, entries: dict[str, dict] = None, path: str = None):
+        self.entries = entries if entries is not None else {}
+        self.path = path if path is not None else getManifestPath()
+
+    @staticmethod
+    def load(path: str = None):
+        """Reads the manifest, an empty one if it doesn't exist or is unreadable"""
+        path = path if path is not None else getManifestPath()
+        try:
+            with open(path, encoding="utf-8") as fp:
+                return Manifest(json.load(fp), path)
+        except FileNotFoundError:
+            return Manifest({}, path)
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return Manifest({}, path)
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            json.dump(self.entries, fp, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def entry(self, role: str, champ: str, kind: str):
+        return self.entries.get(manifestKey(role, champ, kind))
+
+    def recordScrape(
+        self, role: str, champ: str, kind: str, content_hash: str, patch: str = None, scraped_at: float = None
+    ):
+        entry = self.entries.setdefault(manifestKey(role, champ, kind), {})
+        entry["scraped_at"] = time.time() if scraped_at is None else scraped_at
+        entry["patch"] = patch
+        entry["hash"] = content_hash
+
+    def recordParse(
+        self, role: str, champ: str, kind: str, rows: int, content_hash: str, parsed_at: float = None
+    ):
+        entry = self.entries.setdefault(manifestKey(role, champ, kind), {})
+        entry["parsed_at"] = time.time() if parsed_at is None else parsed_at
+        entry["rows"] = rows
+        entry["parsed_hash"] = content_hash
+
+    def planScrapes(self, pool: dict[str, list[str]], force: bool = False, num_days: int = SCRAPE_MAX_AGE_DAYS):
+        """
+        Finds the champions whose matchup or synergy data needs a fresh scrape
+
+        Parameters:
+          pool (dict[str, list[str]]): champions per role
+          force (bool): scrape everything regardless of age
+          num_days (int): age in days after which data is stale
+
+        Returns:
+          (list[tuple[str, str]]) (role, champ) to scrape, in pool order
+        """
+        cutoff = cutoffTimestamp(num_days)
+        stale = []
+        for role, champs in pool.items():
+            for champ in champs:
+                if force or any(self._scrapeStale(role, champ, kind, cutoff, num_days) for kind in KINDS):
+                    stale.append((role, champ))
+        return stale
+
+    def _scrapeStale(self, role: str, champ: str, kind: str, cutoff: float, num_days: int):
+        entry = self.entry(role, champ, kind)
+        if entry is None or "scraped_at" not in entry:
+            return needsUpdate(getCSVPath(kind, role, champ), num_days)
+        return entry["scraped_at"] < cutoff
+
+    def planParses(self, pool: dict[str, list[str]], force: bool = False, num_days: int = PARSE_MAX_AGE_DAYS):
+        """
+        Finds the scraped HTML dumps that need parsing. A dump whose content
+          hash matches the one its CSV was parsed from is unchanged and only
+          needs cleaning up.
+
+        Parameters:
+          pool (dict[str, list[str]]): champions per role
+          force (bool): re-parse every dump on disk, changed or not
+          num_days (int): without a manifest entry, re-parse if the CSV is
+              this many days old
+
+        Returns:
+          (tuple[list, list]) (role, champ, kind) to parse, and
+              (role, champ, kind) that are unchanged since their last parse
+        """
+        pending = []
+        unchanged = []
+        for role, champs in pool.items():
+            for champ in champs:
+                for kind in KINDS:
+                    job = (role, champ, kind)
+                    entry = self.entry(role, champ, kind)
+                    if entry is None or "scraped_at" not in entry:
+                        if os.path.exists(getHTMLSavePath(role, champ, kind)) and (
+                            force or needsUpdate(getCSVPath(kind, role, champ), num_days)
+                        ):
+                            pending.append(job)
+                        continue
+                    scraped_since = entry["scraped_at"] > entry.get("parsed_at", 0)
+                    if not (scraped_since or force) or not os.path.exists(getHTMLSavePath(role, champ, kind)):
+                        continue
+                    if not force and entry["hash"] == entry.get("parsed_hash"):
+                        unchanged.append(job)
+                    else:
+                        pending.append(job)
+        return pending, unchanged
+
+
+def printScrapePlan(pool: dict[str, list[str]], stale: list[tuple[str, str]]):
+    """Prints which champions will be scraped, before any browser is started"""
+    for role, champs in pool.items():
+        for champ in champs:
+            if (role, champ) not in stale:
+                print("Matchup & Synergy data for " + champ.capitalize() + " " + role + " is already up-to-date")
+    if stale:
+        print(f"\nFetching {len(stale)} champion page(s):")
+        for role, champ in stale:
+            print("  " + champ.capitalize() + " " + role)
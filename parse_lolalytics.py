@@ -1,126 +1,284 @@
-import re, os
+import re, os, time
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
-from global_logger import logger
+import lxml.html
+from global_logger import logger, metrics, show
 import pandas as pd
-from util import needsUpdate, getMatchupHTMLSavePath, getSynergyHTMLSavePath, getMatchupCSVPath, \
-  getSynergyCSVPath, cleanString
-ROLES = ["top", "jungle", "middle", "bottom", "support"]
-stat_types = ["wr", "delta1", "delta2", "pr", "games"]
+from data_store import writeStore
+from manifest import Manifest, contentHash
+from snapshot_store import snapshotTables
+from util import getHTMLSavePath, getCSVPath, ROLES, stat_types
 
-def parseLolalytics(pool:dict[str, list[str]], force:bool = False):
+CELL_CLASS = "Cell_cell__383UV"
+CELL_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' " + CELL_CLASS + " ')]"
+# The other champion's role is the vslane= (matchups) or lane= (synergies) value of the cell's link
+LANE_PATTERNS = {
+  "matchups": re.compile(r"vslane=(\w+)"),
+  "synergies": re.compile(r"lane=(\w+)"),
+}
+
+def parseLolalytics(pool:dict[str, list[str]], force:bool = False, workers:int = 1, manifest:Manifest = None):
+  """
+  Parses every HTML dump scraped since its last parse into the CSV and the
+    columnar store. Dumps identical to the one the CSV came from are only
+    removed, and every parse is recorded in the manifest.
+
+  Parameters:
+    pool (dict[str, list[str]]): champions to parse per role
+    force (bool): parse even if the CSV is up-to-date or the dump unchanged
+    workers (int): number of processes parsing (role, champ, kind) jobs
+    manifest (Manifest): already loaded manifest, read from disk if None
+
+  Returns:
+    (dict) "parsed" and "rows" counts, "errors" mapping each failed job to
+        its error, and "seconds" taken
+  """
   print("\n Parsing newly updated matchup data from Lolalytics\n" + ("*" * 80))
-  at_least_one_parsed = False
-  for my_role, my_champs in pool.items():
-    for champ in my_champs:
-      # Fix up the string to be all lower no apostophes
-      cleanString(champ)
-      
-      # If necessary, parse the matchup data for this champion in this role
-      matchup_csv_path = getMatchupCSVPath(my_role, champ)
-      matchup_html_path = getMatchupHTMLSavePath(my_role, champ)
-
-      if os.path.exists(matchup_html_path) and (needsUpdate(matchup_csv_path, 1) or force):
-        at_least_one_parsed = True
-        # Print which Champion is being Parsed
-        logger.info("PARSING DATA FOR " + champ.upper() + " " + my_role.upper())
-      
-        # Load the Matchup HTML page from file
-        with open(matchup_html_path, encoding="utf-8") as fp:
-          matchup_soup = BeautifulSoup(fp, 'lxml')
-        print(f"os.remove({matchup_html_path})")
-        os.remove(matchup_html_path)
-        matchups_df = getMatchupsDataFrame(matchup_soup)
-
-        matchups_df.to_csv(matchup_csv_path)
-      
-      # If necessary, parse the synergy data for this champion in this role
-      synergy_csv_path = getSynergyCSVPath(my_role, champ)
-      synergy_html_path = getSynergyHTMLSavePath(my_role, champ)
-
-      if os.path.exists(synergy_html_path) and (needsUpdate(synergy_csv_path, 1) or force):
-        at_least_one_parsed = True
-        # Load the Synergy HTML page from file
-        with open(synergy_html_path, encoding="utf-8") as fp:
-          synergy_soup = BeautifulSoup(fp, 'lxml')
-        print(f"os.remove({synergy_html_path})")
-        os.remove(synergy_html_path)
-        synergies_df = getSynergiesDataFrame(synergy_soup)
-
-        synergies_df.to_csv(synergy_csv_path)
-  if not at_least_one_parsed:
+  # If necessary, parse the matchup and synergy data for each champion in each role
+  if manifest is None:
+    manifest = Manifest.load()
+  jobs, unchanged = manifest.planParses(pool, force)
+  for my_role, champ, kind in unchanged:
+    entry = manifest.entry(my_role, champ, kind)
+    show(f"{kind.capitalize()} for {champ.capitalize()} {my_role} unchanged since the last parse, skipping")
+    metrics.count("parse.skipped_unchanged")
+    os.remove(getHTMLSavePath(my_role, champ, kind))
+    manifest.recordParse(my_role, champ, kind, entry.get("rows"), entry["hash"])
+
+  start = time.perf_counter()
+  if workers > 1 and len(jobs) > 1:
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+      results = list(executor.map(parseJob, jobs))
+  else:
+    results = [parseJob(job) for job in jobs]
+  seconds = time.perf_counter() - start
+  metrics.observe("parse", seconds)
+
+  parsed = {"matchups": {}, "synergies": {}}
+  errors = {}
+  num_rows = 0
+  for result in results:
+    my_role, champ, kind = result["job"]
+    if result["error"] != None:
+      logger.error(f"Failed to parse {kind} for {champ} {my_role}: {result['error']}")
+      errors[result["job"]] = result["error"]
+      metrics.count("parse.errors")
+      continue
+    parsed[kind][(my_role, champ)] = result["df"]
+    num_rows += len(result["df"])
+    # Timed in the worker, which can't reach this process' metrics
+    metrics.observe("parse.file", result["seconds"])
+    metrics.count("parse.files")
+    metrics.count("parse.rows", len(result["df"]))
+    manifest.recordParse(my_role, champ, kind, len(result["df"]), result["hash"])
+  if jobs or unchanged:
+    manifest.save()
+
+  if len(jobs) == 0:
     print("All current matchups and synergies are already parsed.")
+  else:
+    # Merge everything parsed this run into the columnar store in one write per kind
+    with metrics.span("parse.write_store"):
+      for kind, tables in parsed.items():
+        if tables:
+          writeStore(kind, tables)
+          snapshotTables(kind, tables, manifest)
+    num_parsed = len(jobs) - len(errors)
+    logger.info(
+      f"Parsed {num_parsed}/{len(jobs)} files, {num_rows} rows in {seconds:.2f}s "
+      + f"({num_parsed / max(seconds, 1e-9):.1f} files/s, {num_rows / max(seconds, 1e-9):.0f} rows/s)"
+    )
   print("\nParsing complete.\n")
+  return {
+    "parsed": len(jobs) - len(errors),
+    "rows": num_rows,
+    "errors": errors,
+    "seconds": seconds,
+  }
+
+def parseJob(job:tuple[str, str, str]):
+  """
+  Parses one (my_role, champ, kind) HTML dump into its CSV, runs in a worker
+    process. The HTML is only removed once the CSV is in place, and errors are
+    returned rather than raised so one bad page can't stop the whole run.
+
+  Returns:
+    (dict) "job", "df" (None on error), "hash" of the HTML parsed, "seconds"
+        taken and "error" (None on success)
+  """
+  start = time.perf_counter()
+  my_role, champ, kind = job
+  html_path = getHTMLSavePath(my_role, champ, kind)
+  csv_path = getCSVPath(kind, my_role, champ)
+  try:
+    # Print which Champion is being Parsed
+    logger.info("PARSING " + kind.upper() + " FOR " + champ.upper() + " " + my_role.upper())
+    with open(html_path, "rb") as fp:
+      html = fp.read()
+    soup = BeautifulSoup(html.decode("utf-8"), 'lxml')
+    if kind == "matchups":
+      df = getMatchupsDataFrame(soup)
+    else:
+      df = getSynergiesDataFrame(soup)
+    writeCSVAtomic(df, csv_path)
+    show(f"os.remove({html_path})")
+    os.remove(html_path)
+  except Exception as e:
+    error = f"{type(e).__name__}: {e}"
+    return {"job": job, "df": None, "hash": None, "seconds": time.perf_counter() - start, "error": error}
+  seconds = time.perf_counter() - start
+  return {"job": job, "df": df, "hash": contentHash(html), "seconds": seconds, "error": None}
+
+def writeCSVAtomic(df:pd.DataFrame, csv_path:str):
+  """Writes to a temp file and renames it, so a CSV is never left half written"""
+  tmp_path = csv_path + ".tmp"
+  df.to_csv(tmp_path)
+  os.replace(tmp_path, csv_path)
 
 def getMatchupsDataFrame(matchup_soup:BeautifulSoup):
-  matchups_df = pd.DataFrame(columns=(["id", "role", "champ"] + stat_types))
-  matchups_df.set_index("id")
+  # Rows are collected in a list and the DataFrame is built once at the end
+  rows = []
+  seen_ids = set()
 
+  cells_by_role = bucketCellsByRole(matchup_soup, "matchups")
   for cur_proc_role in ROLES:
-    print("Finding matchups for " + str(cur_proc_role))
-    matchup_cells = matchup_soup.find_all("div", {"class": "Cell_cell__383UV"})
-    cur_role_matchups = []
-    for matchup in matchup_cells:
-      regex = re.compile(r".+vslane=" + cur_proc_role)
-      if matchup.find('a', href = regex) != None:
-        cur_role_matchups.append(matchup)
-    parseMatchupsForRole(cur_proc_role, cur_role_matchups, matchups_df)
+    show("Finding matchups for " + str(cur_proc_role))
+    parseMatchupsForRole(cur_proc_role, cells_by_role[cur_proc_role], rows, seen_ids)
 
-  return matchups_df
+  return pd.DataFrame(rows, columns=(["id", "role", "champ"] + stat_types))
 
 def getSynergiesDataFrame(synergy_soup:BeautifulSoup):
-  synergies_df = pd.DataFrame(columns=(["id", "role", "champ"] + stat_types))
-  synergies_df.set_index("id")
+  # Rows are collected in a list and the DataFrame is built once at the end
+  rows = []
+  seen_ids = set()
 
+  cells_by_role = bucketCellsByRole(synergy_soup, "synergies")
   for cur_proc_role in ROLES:
-    print("Finding synergies for " + str(cur_proc_role))
-    synergy_cells = synergy_soup.find_all("div", {"class": "Cell_cell__383UV"})
-    cur_role_synergy = []
-    for synergy in synergy_cells:
-      regex = re.compile(r".+lane=" + cur_proc_role)
-      if synergy.find('a', href = regex) != None:
-        cur_role_synergy.append(synergy)
-    parseMatchupsForRole(cur_proc_role, cur_role_synergy, synergies_df)
+    show("Finding synergies for " + str(cur_proc_role))
+    parseMatchupsForRole(cur_proc_role, cells_by_role[cur_proc_role], rows, seen_ids)
   
-  return synergies_df
+  return pd.DataFrame(rows, columns=(["id", "role", "champ"] + stat_types))
 
-def parseMatchupsForRole(role:str, matchup_cells:BeautifulSoup, matchups_df:pd.DataFrame):
-  WR = 0
-  DELTA1 = 1
-  DELTA2 = 2
-  PR = 3
-  GAMES = 4
+def bucketCellsByRole(soup:BeautifulSoup, kind:str):
+  """Walks the cells once, grouping them by the role in their link (cells without one are dropped)"""
+  cells_by_role = {role: [] for role in ROLES}
+  for cell in soup.find_all("div", {"class": CELL_CLASS}):
+    role = getCellRole(cell, kind)
+    if role != None:
+      cells_by_role[role].append(cell)
+  return cells_by_role
+
+def parseMatchupsForRole(role:str, matchup_cells:BeautifulSoup, rows:list, seen_ids:set):
+  """
+  Appends a row per cell to rows. Every scroll snapshot repeats most cells,
+    so ids already in seen_ids are skipped (and added as they're parsed).
+  """
   logger.info("Parsing Matchups for " + role)
   for matchup_cell in matchup_cells:
     champ = getChampName(matchup_cell)
     id = role + champ
-    if (id in matchups_df.index):
-      print(champ + " already added to matchup dataframe")
+    if (id in seen_ids):
+      logger.debug(champ + " already added to matchup dataframe")
       continue
+    seen_ids.add(id)
 
     row = [id, role]
     row.append(champ)
-    divs = matchup_cell.find_all("div")
+    stats = getCellStats(matchup_cell)
     
-    if len(divs) != 5:
-      logger.error("Invalid number of divs in the matchup cell, could cause improper parsing")
-      logger.error("Exiting!")
-      exit(-1)
-    div_num = 0
-    for div in divs:
-      # Convert div value to number
-      if div_num != GAMES:
-        val = float(div.text.strip())
-      else:
-        div_text = div.text.strip()
-        div_text = "".join(div_text.split(','))
-        val = int(div_text)
-      row.append(val)
-      div_num += 1
-    matchups_df.loc[len(matchups_df.index)] = row
+    if stats is None:
+      raise ValueError("Invalid number of divs in the " + champ + " " + role + " cell")
+    row += stats
+    rows.append(row)
+
+def getCellStats(matchup_cell:BeautifulSoup):
+  """Returns the cell's [wr, delta1, delta2, pr, games], None if it isn't a 5 stat cell"""
+  return parseStatTexts([div.text for div in matchup_cell.find_all("div")])
+
+def parseStatTexts(div_texts:list[str]):
+  GAMES = 4
+  if len(div_texts) != 5:
+    return None
+  stats = []
+  div_num = 0
+  for div_text in div_texts:
+    # Convert div value to number
+    if div_num != GAMES:
+      val = float(div_text.strip())
+    else:
+      div_text = div_text.strip()
+      div_text = "".join(div_text.split(','))
+      val = int(div_text)
+    stats.append(val)
+    div_num += 1
+  return stats
+
+def getRoleFromHref(href:str, kind:str):
+  match = LANE_PATTERNS[kind].search(href)
+  if match != None and match.group(1) in ROLES:
+    return match.group(1)
+  return None
+
+def getCellRole(cell:BeautifulSoup, kind:str):
+  """Returns the role a matchup or synergy cell belongs to, None for non-champion cells"""
+  for link in cell.find_all('a', href = True):
+    role = getRoleFromHref(link['href'], kind)
+    if role != None:
+      return role
+  return None
+
+def iterCells(html:str, kind:str):
+  """
+  Single pass over the cells of raw panel HTML using lxml directly, skipping
+    the BeautifulSoup tree. Yields (role, champ, cell) for every champion cell,
+    pass the cell to getLxmlCellStats for its stats.
+  """
+  root = lxml.html.document_fromstring(html)
+  for cell in root.xpath(CELL_XPATH):
+    role = None
+    for href in cell.xpath(".//a/@href"):
+      role = getRoleFromHref(href, kind)
+      if role != None:
+        break
+    if role is None:
+      continue
+    imgs = cell.xpath(".//img[@alt]")
+    yield role, cleanChampAlt(imgs[0].get("alt")), cell
+
+def getLxmlCellStats(cell):
+  return parseStatTexts([div.text_content() for div in cell.xpath(".//div")])
+
+class TableBuilder:
+  """
+  Collects the cells of one champion's matchup or synergy table straight from
+    the scraped panel HTML, one scroll snapshot at a time. Cells already seen
+    in an earlier snapshot are skipped, so only the new rows are ever kept.
+  """
+  def __init__(self, kind:str):
+    self.kind = kind
+    self.rows: dict[tuple[str, str], list] = {}
+
+  def addHtml(self, html:str):
+    for role, champ, cell in iterCells(html, self.kind):
+      if (role, champ) in self.rows:
+        continue
+      stats = getLxmlCellStats(cell)
+      # Raised as an AssertionError so the scraper treats it like any other partial page
+      assert stats is not None, "Invalid number of divs in the " + self.kind + " cell"
+      self.rows[(role, champ)] = stats
+
+  def toDataFrame(self):
+    # Rows are grouped by role in ROLES order, like getMatchupsDataFrame
+    keys = sorted(self.rows, key=lambda key: ROLES.index(key[0]))
+    rows = [[role + champ, role, champ] + self.rows[(role, champ)] for role, champ in keys]
+    return pd.DataFrame(rows, columns=(["id", "role", "champ"] + stat_types))
 
 def getChampName(matchup_cell:BeautifulSoup):
     img = matchup_cell.find('img', alt=True)      # Pull alt text from champion image
-    champ_name = "".join(img['alt'].split())      # Remove Spaces
+    return cleanChampAlt(img['alt'])
+
+def cleanChampAlt(alt:str):
+    champ_name = "".join(alt.split())             # Remove Spaces
     champ_name = "".join(champ_name.split('\''))  # Remove Apostrophes
     champ_name = champ_name.lower()               # Make all lower case
     return champ_name
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+Finds the N-champion pool for a role that maximizes the expected ∑sc over a
+corpus of drafts, to decide which champions to learn.
+
+In each draft of the role you'd pick the pool champion with the best ∑sc
+(analysis.calcScore summed over the draft) among those still available, so a
+pool is worth the mean of that best ∑sc over the corpus. Every candidate is
+scored against every draft once, sliced out of the roster tensors (see
+roster_tensor.py), then pools are searched on that (draft x candidate) matrix:
+greedily, or by branch and bound, which proves the best pool within a node
+budget.
+
+  python pool_optimizer.py drafts.jsonl --role middle --size 4 [--method bnb]
+      [--workers 4] [--candidates ahri zed ...]
+"""
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import global_logger
+from global_logger import logger
+from analysis import (
+    _chunked,
+    cleanChampNamesList,
+    parseDraft,
+    prepareDraft,
+    readDraftsJsonl,
+    scoreSlots,
+    teamSlots,
+)
+from roster_tensor import RosterTensor, loadRosterTensors
+
+METHODS = ["greedy", "bnb"]
+# Search nodes branch and bound may visit before settling for its best pool so far
+MAX_NODES = 200000
+
+
+def candidateChamps(tensors: dict[str, RosterTensor], my_role: str):
+    """Champions with both a matchup and a synergy table in my_role"""
+    return sorted(
+        my_champ
+        for my_champ in tensors["matchups"].champs
+        if tensors["matchups"].hasBlock(my_role, my_champ) and tensors["synergies"].hasBlock(my_role, my_champ)
+    )
+
+
+def scoreCandidates(draft, my_role: str, candidates: list[str], tensors: dict[str, RosterTensor]):
+    """
+    ∑sc of every candidate in one draft, and whether each is still available
+
+    Returns:
+      (tuple[np.ndarray, np.ndarray]) int sums and bool availability, one per
+          candidate
+    """
+    _, bans, enemy_team, ally_team = parseDraft(draft)
+    available, enemy_team, ally_team = prepareDraft(candidates, bans, enemy_team, ally_team)
+    enemy_slots = teamSlots(enemy_team)
+    ally_slots = teamSlots(ally_team)
+    pool_scores = scoreSlots(
+        my_role,
+        enemy_slots,
+        ally_slots,
+        tensors["matchups"].poolStats(my_role, candidates, enemy_slots),
+        tensors["synergies"].poolStats(my_role, candidates, ally_slots),
+    )
+    return pool_scores["sum"], np.isin(candidates, available)
+
+
+# Tensors of the worker process, loaded once by _initOptimizerWorker
+_worker_tensors = None
+
+
+def _initOptimizerWorker():
+    global _worker_tensors
+    _worker_tensors = loadRosterTensors()
+
+
+def _scoreChunk(drafts: list, my_role: str, candidates: list[str]):
+    rows = [scoreCandidates(draft, my_role, candidates, _worker_tensors) for draft in drafts]
+    return [sums for sums, _ in rows], [available for _, available in rows]
+
+
+def draftMatrix(drafts: list, my_role: str, candidates: list[str], workers: int = 1, chunk_size: int = 256):
+    """
+    Scores every candidate against every draft
+
+    Returns:
+      (tuple[np.ndarray, np.ndarray]) (draft x candidate) ∑sc and availability
+    """
+    sums = []
+    available = []
+    if workers <= 1:
+        _initOptimizerWorker()
+        for chunk in _chunked(drafts, chunk_size):
+            chunk_sums, chunk_available = _scoreChunk(chunk, my_role, candidates)
+            sums.extend(chunk_sums)
+            available.extend(chunk_available)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initOptimizerWorker) as executor:
+            pending = deque()
+            chunks = _chunked(drafts, chunk_size)
+            for chunk in chunks:
+                pending.append(executor.submit(_scoreChunk, chunk, my_role, candidates))
+                if len(pending) >= 2 * workers:
+                    chunk_sums, chunk_available = pending.popleft().result()
+                    sums.extend(chunk_sums)
+                    available.extend(chunk_available)
+            while pending:
+                chunk_sums, chunk_available = pending.popleft().result()
+                sums.extend(chunk_sums)
+                available.extend(chunk_available)
+    shape = (len(sums), len(candidates))
+    if not sums:
+        return np.zeros(shape), np.zeros(shape, dtype=bool)
+    return np.array(sums, dtype=np.float64), np.array(available, dtype=bool)
+
+
+def greedyPool(values: np.ndarray, size: int, no_pick: float):
+    """
+    Adds the candidate with the biggest gain in mean best ∑sc, size times
+
+    Parameters:
+      values (np.ndarray): (draft x candidate) ∑sc, no_pick where unavailable
+      size (int): number of champions in the pool
+      no_pick (float): value of a draft with no pool champion available
+
+    Returns:
+      (list[int]) candidate columns of the pool, in the order they were added
+    """
+    best = np.full(len(values), no_pick)
+    pool = []
+    for _ in range(min(size, values.shape[1])):
+        gains = np.maximum(best[:, None], values).mean(axis=0)
+        gains[pool] = -np.inf
+        column = int(np.argmax(gains))
+        pool.append(column)
+        best = np.maximum(best, values[:, column])
+    return pool
+
+
+def branchAndBoundPool(values: np.ndarray, size: int, no_pick: float, max_nodes: int = MAX_NODES):
+    """
+    Exact search for the pool with the best mean ∑sc, starting from the greedy
+      pool. A partial pool is pruned when even adding the best remaining
+      candidate to every draft at once couldn't beat the best pool found.
+
+    Returns:
+      (tuple[list[int], bool]) candidate columns of the pool, and whether it
+          is proven best (False if max_nodes ran out first)
+    """
+    num_candidates = values.shape[1]
+    size = min(size, num_candidates)
+    # Strongest candidates first so good pools, and tight bounds, come early
+    order = np.argsort(-values.mean(axis=0), kind="stable")
+    ordered = values[:, order]
+    # suffix_best[:, i] = per draft best value of any candidate from order[i:]
+    suffix_best = np.maximum.accumulate(ordered[:, ::-1], axis=1)[:, ::-1]
+
+    incumbent = greedyPool(values, size, no_pick)
+    incumbent_value = np.maximum.reduce([values[:, column] for column in incumbent]).mean() if incumbent else no_pick
+    nodes = 0
+    exhausted = False
+
+    def search(start: int, chosen: list[int], best: np.ndarray):
+        nonlocal incumbent, incumbent_value, nodes, exhausted
+        nodes += 1
+        if nodes > max_nodes:
+            exhausted = True
+            return
+        if len(chosen) == size:
+            value = best.mean()
+            if value > incumbent_value:
+                incumbent, incumbent_value = [int(order[i]) for i in chosen], value
+            return
+        if start >= num_candidates or np.maximum(best, suffix_best[:, start]).mean() <= incumbent_value:
+            return
+        for i in range(start, num_candidates - (size - len(chosen)) + 1):
+            search(i + 1, chosen + [i], np.maximum(best, ordered[:, i]))
+            if exhausted:
+                return
+
+    search(0, [], np.full(len(values), no_pick))
+    return incumbent, not exhausted
+
+
+def optimizePool(
+    drafts,
+    my_role: str,
+    size: int,
+    candidates: list[str] = None,
+    method: str = "greedy",
+    workers: int = 1,
+    chunk_size: int = 256,
+    max_nodes: int = MAX_NODES,
+):
+    """
+    Searches for the best `size` champion pool for my_role over a draft corpus
+
+    Parameters:
+      drafts: iterable of drafts (see analysis.parseDraft) or the path of a
+          JSONL file, drafts for other roles are skipped
+      my_role (str): role to build the pool for
+      size (int): number of champions in the pool
+      candidates (list[str]): champions to choose from, every champion of the
+          role in the roster tensors by default
+      method (str): "greedy" or "bnb" (branch and bound)
+      workers (int): processes scoring the drafts
+      max_nodes (int): branch and bound node budget
+
+    Returns:
+      (dict) "pool", "expected_sum" (mean best ∑sc), "picks" (drafts each pool
+          champion was the best pick in), "no_pick" (drafts where every pool
+          champion was taken), "optimal", "drafts", "candidates" and "seconds"
+    """
+    start = time.perf_counter()
+    if isinstance(drafts, str):
+        drafts = readDraftsJsonl(drafts)
+    drafts = [draft for draft in drafts if parseDraft(draft)[0] == my_role]
+
+    tensors = loadRosterTensors()
+    if tensors["matchups"] is None or tensors["synergies"] is None:
+        raise FileNotFoundError("No roster tensors yet, run `python cli.py roster` first")
+    known = candidateChamps(tensors, my_role)
+    if candidates is None:
+        candidates = known
+    else:
+        candidates = [champ for champ in cleanChampNamesList(candidates) if champ in known]
+    if not candidates or not drafts:
+        raise ValueError(f"Nothing to optimize: {len(candidates)} candidates, {len(drafts)} {my_role} drafts")
+
+    sums, available = draftMatrix(drafts, my_role, candidates, workers, chunk_size)
+    # A draft where every pool champion is taken counts as the worst ∑sc in the corpus
+    no_pick = float(sums.min())
+    values = np.where(available, sums, no_pick)
+    scored = time.perf_counter()
+
+    if method == "bnb":
+        pool, optimal = branchAndBoundPool(values, size, no_pick, max_nodes)
+    else:
+        pool, optimal = greedyPool(values, size, no_pick), False
+    pool_values = values[:, pool]
+    pool_available = available[:, pool]
+    # Only among the pool champions still available, a draft with none of them has no pick
+    best_pick = np.argmax(np.where(pool_available, pool_values, -np.inf), axis=1)
+    has_pick = pool_available.any(axis=1)
+    logger.info(
+        f"Scored {len(candidates)} candidates over {len(drafts)} drafts in {scored - start:.2f}s, "
+        + f"searched ({method}) in {time.perf_counter() - scored:.2f}s"
+    )
+    return {
+        "pool": [candidates[column] for column in pool],
+        "expected_sum": float(pool_values.max(axis=1).mean()),
+        "picks": {
+            candidates[column]: int(np.count_nonzero((best_pick == num) & has_pick)) for num, column in enumerate(pool)
+        },
+        "no_pick": int(np.count_nonzero(~has_pick)),
+        "optimal": optimal,
+        "drafts": len(drafts),
+        "candidates": len(candidates),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the champion pool with the best expected ∑sc")
+    parser.add_argument("drafts", help="JSONL file with one draft per line")
+    parser.add_argument("--role", required=True, help="role to build the pool for")
+    parser.add_argument("--size", type=int, required=True, help="champions in the pool")
+    parser.add_argument("--method", choices=METHODS, default="greedy")
+    parser.add_argument("--candidates", nargs="*", help="champions to choose from (default: whole roster)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--max-nodes", type=int, default=MAX_NODES, help="branch and bound node budget")
+    args = parser.parse_args()
+
+    global_logger.init()
+    result = optimizePool(
+        args.drafts,
+        args.role,
+        args.size,
+        candidates=args.candidates,
+        method=args.method,
+        workers=args.workers,
+        max_nodes=args.max_nodes,
+    )
+    print(f"Best {args.role} pool of {args.size} over {result['drafts']} drafts ({result['candidates']} candidates):")
+    for champ in result["pool"]:
+        print(f"  {champ:<14} best pick in {result['picks'][champ]} drafts")
+    if result["no_pick"]:
+        print(f"  {'(none left)':<14} every pool champion taken in {result['no_pick']} drafts")
+    print(f"Expected ∑sc: {result['expected_sum']:.3f}" + (" (proven best)" if result["optimal"] else ""))
+
+
+if __name__ == "__main__":
+    main()
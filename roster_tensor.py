@@ -0,0 +1,343 @@
+"""
+Whole-roster matchup and synergy tensors.
+
+For each kind, every stored (my_role, my_champ) table is packed into one dense
+float32 array indexed [my_role, my_champ, other_role, other_champ, stat] (stat
+in util.stat_types order, NaN where the table has no row), next to a JSON
+vocabulary of champion names. Any hypothetical pool can then be scored by
+slicing, with no per-champion tables to load.
+
+  store/roster/<kind>.npy   the tensor
+  store/roster/<kind>.json  {"champs": [name per id], "blocks": {"role/champ": hash}}
+
+The published stats have two decimals, so rounding the float32 values back to
+two decimals on read gives exactly the parsed values (checked on build).
+
+Run this module to bring both tensors up to date with the store and print
+their memory footprint.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+from global_logger import logger
+from analysis import (
+    MIN_GAMES,
+    ROLE_INDEX,
+    parseDraft,
+    prepareDraft,
+    rankPool,
+    scoreSlots,
+    shrinkStats,
+    teamSlots,
+)
+from config import config
+from data_store import INDEX_FILE, KINDS, COLUMN_DTYPES, ChampTable, ColumnStore, loadStore, storeKey
+from util import ROLES, stat_types, getStoreDir
+
+ROSTER_DIR = "roster"
+TENSOR_DTYPE = np.float32
+STAT_DECIMALS = 2
+ROUNDED_STATS = ["wr", "delta1", "delta2", "pr"]
+STAT_INDEX = {stat: num for num, stat in enumerate(stat_types)}
+# What a slot without (usable) data counts as, like analysis.gatherPoolStats
+STAT_DEFAULTS = {"wr": 50.0, "delta1": 0.0, "delta2": 0.0}
+
+
+def tensorPaths(kind: str):
+    """(tensor .npy path, vocabulary .json path) of a kind"""
+    roster_dir = getStoreDir(ROSTER_DIR)
+    return os.path.join(roster_dir, kind + ".npy"), os.path.join(roster_dir, kind + ".json")
+
+
+def blockHash(table: ChampTable):
+    """Content hash of one stored table, to find the blocks that changed"""
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(table.roles).tobytes())
+    digest.update(np.ascontiguousarray(table.champs).tobytes())
+    for stat in stat_types:
+        digest.update(np.ascontiguousarray(table.stats[stat]).tobytes())
+    return digest.hexdigest()
+
+
+class RosterTensor:
+    """
+    A loaded tensor of one kind
+
+    Attributes:
+      data (np.ndarray): float32 [my_role, my_champ, other_role, other_champ, stat]
+      champs (list[str]): champion name of every id
+      blocks (dict[str, str]): blockHash of every filled "my_role/my_champ"
+    """
+
+    def __init__(self, kind: str, data: np.ndarray, champs: list[str], blocks: dict[str, str]):
+        self.kind = kind
+        self.data = data
+        self.champs = champs
+        self.blocks = blocks
+        self.champ_ids = {champ: num for num, champ in enumerate(champs)}
+
+    def hasBlock(self, my_role: str, my_champ: str):
+        return storeKey(my_role, my_champ) in self.blocks
+
+    def poolStats(self, my_role: str, my_champs: list[str], slots: list[tuple[str, str]], scoring: str = None):
+        """
+        analysis.gatherPoolStats straight from the tensor: the stats of every
+          slot for every pool champion as (len(my_champs), len(slots)) arrays.
+          With "shrinkage" scoring only the gathered cells are shrunk.
+
+        Returns:
+          (dict[str, np.ndarray]) "wr", "delta1", "delta2", "games" and "found"
+        """
+        missing = [my_champ for my_champ in my_champs if not self.hasBlock(my_role, my_champ)]
+        if missing:
+            raise KeyError(f"{missing} {my_role} not in the {self.kind} roster tensor")
+        my_ids = np.array([self.champ_ids[my_champ] for my_champ in my_champs], dtype=np.intp)
+        slot_roles = np.array([ROLE_INDEX[role] for role, _ in slots], dtype=np.intp)
+        # A champion the roster has never seen can't have a row in any table
+        known = np.array([champ in self.champ_ids for _, champ in slots], dtype=bool)
+        slot_ids = np.array([self.champ_ids.get(champ, 0) for _, champ in slots], dtype=np.intp)
+
+        values = self.data[ROLE_INDEX[my_role]][my_ids[:, None], slot_roles[None, :], slot_ids[None, :]]
+        values = values.astype(np.float64)
+        games = values[..., STAT_INDEX["games"]]
+        found = ~np.isnan(games) & known[None, :]
+        sufficient = found & (games >= MIN_GAMES)
+
+        def rounded(name: str):
+            return np.round(values[..., STAT_INDEX[name]], STAT_DECIMALS)
+
+        if (config["scoring"] if scoring is None else scoring) == "shrinkage":
+            shrunk = shrinkStats(rounded("wr"), rounded("delta1"), rounded("delta2"), games, rounded("pr"))
+            stats = {name: np.where(found, shrunk[name], default) for name, default in STAT_DEFAULTS.items()}
+        else:
+            stats = {name: np.where(sufficient, rounded(name), default) for name, default in STAT_DEFAULTS.items()}
+        stats["games"] = np.where(found, games, 0).astype(np.int64)
+        stats["found"] = found
+        return stats
+
+
+def rosterVocabulary(store: ColumnStore):
+    """Every champion named in the store, as a pool champion or in a row"""
+    names = set(np.unique(store.columns["other_champ"]).tolist())
+    names.update(my_champ for _, my_champ in store.keys())
+    return sorted(names)
+
+
+def _fillBlock(data: np.ndarray, my_role: str, my_champ: str, table: ChampTable, champ_ids: dict[str, int]):
+    """Writes one table into its [my_role, my_champ] slab, returns False if float32 lost precision"""
+    num_champs = len(champ_ids)
+    slab = np.full((len(ROLES), num_champs, len(stat_types)), np.nan, dtype=TENSOR_DTYPE)
+    lossless = True
+    if len(table) != 0:
+        other_ids = np.array([champ_ids[champ] for champ in table.champs.tolist()], dtype=np.intp)
+        cells = table.roles.astype(np.intp) * num_champs + other_ids
+        # Keep the first row for a repeated key, as ChampTable.lookup does
+        _, first = np.unique(cells, return_index=True)
+        flat = slab.reshape(-1, len(stat_types))
+        for stat_num, stat in enumerate(stat_types):
+            column = np.asarray(table.stats[stat])[first]
+            packed = column.astype(TENSOR_DTYPE)
+            restored = packed.astype(np.float64)
+            if stat in ROUNDED_STATS:
+                restored = np.round(restored, STAT_DECIMALS)
+            lossless = lossless and bool(np.array_equal(restored, column))
+            flat[cells[first], stat_num] = packed
+    data[ROLE_INDEX[my_role], champ_ids[my_champ]] = slab
+    return lossless
+
+
+def _writeVocabulary(kind: str, champs: list[str], blocks: dict[str, str]):
+    vocab_path = tensorPaths(kind)[1]
+    tmp_path = vocab_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        json.dump({"champs": champs, "blocks": blocks}, fp)
+    os.replace(tmp_path, vocab_path)
+
+
+def buildRosterTensor(kind: str, store: ColumnStore = None):
+    """
+    Rebuilds the tensor of a kind from every table in the store
+
+    Returns:
+      (RosterTensor) or None if nothing has been stored yet
+    """
+    store = loadStore(kind) if store is None else store
+    if store is None:
+        return None
+    champs = rosterVocabulary(store)
+    champ_ids = {champ: num for num, champ in enumerate(champs)}
+    shape = (len(ROLES), len(champs), len(ROLES), len(champs), len(stat_types))
+
+    tensor_path = tensorPaths(kind)[0]
+    tmp_path = tensor_path + ".tmp"
+    data = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=TENSOR_DTYPE, shape=shape)
+    data[:] = np.nan
+    blocks = {}
+    for my_role, my_champ in store.keys():
+        table = store.table(my_role, my_champ)
+        if not _fillBlock(data, my_role, my_champ, table, champ_ids):
+            logger.warning(f"{kind} for {my_champ} {my_role} doesn't round-trip through {np.dtype(TENSOR_DTYPE)}")
+        blocks[storeKey(my_role, my_champ)] = blockHash(table)
+    data.flush()
+    del data
+    os.replace(tmp_path, tensor_path)
+    # The vocabulary goes last, like the store's index
+    _writeVocabulary(kind, champs, blocks)
+    logger.info(f"Built the {kind} roster tensor: {len(blocks)} tables, {len(champs)} champions")
+    return loadRosterTensor(kind)
+
+
+def updateRosterTensor(kind: str):
+    """
+    Brings the tensor of a kind up to date with the store, rewriting only the
+      [my_role, my_champ] slabs whose table changed. A full rebuild happens
+      when there's no tensor yet or the store names champions it doesn't have.
+
+    Returns:
+      (dict) "rebuilt" (bool), "rewritten" and "unchanged" table counts, or
+          None if nothing has been stored yet
+    """
+    store = loadStore(kind)
+    if store is None:
+        return None
+    tensor = loadRosterTensor(kind, mmap=False, load_data=False)
+    if tensor is None or not set(rosterVocabulary(store)) <= set(tensor.champs):
+        built = buildRosterTensor(kind, store)
+        return {"rebuilt": True, "rewritten": len(built.blocks), "unchanged": 0}
+
+    data = np.load(tensorPaths(kind)[0], mmap_mode="r+")
+    blocks = dict(tensor.blocks)
+    rewritten = 0
+    for my_role, my_champ in store.keys():
+        table = store.table(my_role, my_champ)
+        block_hash = blockHash(table)
+        key = storeKey(my_role, my_champ)
+        if blocks.get(key) == block_hash:
+            continue
+        if not _fillBlock(data, my_role, my_champ, table, tensor.champ_ids):
+            logger.warning(f"{kind} for {my_champ} {my_role} doesn't round-trip through {np.dtype(TENSOR_DTYPE)}")
+        blocks[key] = block_hash
+        rewritten += 1
+    if rewritten:
+        data.flush()
+        _writeVocabulary(kind, tensor.champs, blocks)
+    del data
+    logger.info(f"Updated the {kind} roster tensor: {rewritten} tables rewritten")
+    return {"rebuilt": False, "rewritten": rewritten, "unchanged": len(blocks) - rewritten}
+
+
+def loadRosterTensor(kind: str, mmap: bool = True, load_data: bool = True):
+    """
+    Opens the tensor of a kind
+
+    Parameters:
+      kind (str): "matchups" or "synergies"
+      mmap (bool): memory-map the tensor instead of reading it into memory
+      load_data (bool): False to only read the vocabulary
+
+    Returns:
+      (RosterTensor) or None if it hasn't been built yet
+    """
+    tensor_path, vocab_path = tensorPaths(kind)
+    if not os.path.exists(vocab_path):
+        return None
+    with open(vocab_path, encoding="utf-8") as fp:
+        vocab = json.load(fp)
+    data = None
+    if load_data:
+        data = np.load(tensor_path, mmap_mode="r" if mmap else None)
+    return RosterTensor(kind, data, vocab["champs"], vocab["blocks"])
+
+
+def loadRosterTensors():
+    """Both kinds' tensors keyed by kind, None for a kind not built yet"""
+    return {kind: loadRosterTensor(kind) for kind in KINDS}
+
+
+def rosterPool(min_games: int = MIN_GAMES):
+    """
+    Every champion the stored matchup tables show being played in each role,
+      the pool to scrape for the whole roster
+
+    Returns:
+      (dict[str, list[str]]) champions per role, or {} if nothing is stored
+    """
+    store = loadStore("matchups")
+    if store is None:
+        return {}
+    played = np.asarray(store.columns["games"]) >= min_games
+    other_roles = np.asarray(store.columns["other_role"])[played]
+    other_champs = np.asarray(store.columns["other_champ"])[played]
+    pool = {}
+    for role_num, role in enumerate(ROLES):
+        pool[role] = sorted(set(other_champs[other_roles == role_num].tolist()))
+    return pool
+
+
+def footprint(tensor: RosterTensor):
+    """
+    Memory used by a tensor, and by the columnar store it was built from
+
+    Returns:
+      (dict) "shape", "tensor_bytes", "blocks" filled out of "block_capacity",
+          "cell_density" (fraction of cells with a row) and "store_bytes"
+    """
+    store_dir = getStoreDir(tensor.kind)
+    store_bytes = 0
+    for name in list(COLUMN_DTYPES) + [INDEX_FILE]:
+        file_path = os.path.join(store_dir, name if name == INDEX_FILE else name + ".npy")
+        if os.path.exists(file_path):
+            store_bytes += os.path.getsize(file_path)
+    games = tensor.data[..., STAT_INDEX["games"]]
+    return {
+        "shape": list(tensor.data.shape),
+        "tensor_bytes": int(tensor.data.nbytes),
+        "blocks": len(tensor.blocks),
+        "block_capacity": len(ROLES) * len(tensor.champs),
+        "cell_density": float(np.count_nonzero(~np.isnan(games))) / max(games.size, 1),
+        "store_bytes": store_bytes,
+    }
+
+
+def printFootprint(tensor: RosterTensor):
+    usage = footprint(tensor)
+    print(
+        f"{tensor.kind:<10} {'x'.join(str(size) for size in usage['shape']):<18}"
+        + f"{usage['tensor_bytes'] / 2**20:8.1f} MiB tensor, {usage['store_bytes'] / 2**20:6.1f} MiB store, "
+        + f"{usage['blocks']}/{usage['block_capacity']} tables, {usage['cell_density']:.1%} of cells filled"
+    )
+    return usage
+
+
+def scoreDraft(draft, my_pool: dict[str, list[str]], tensors: dict[str, RosterTensor], scoring: str = None):
+    """
+    analysis.scoreDraft for any pool, sliced out of the roster tensors
+      (see loadRosterTensors) instead of per-champion tables
+
+    Returns:
+      (dict) "my_role" and "rankings", see analysis.scoreDraft
+    """
+    my_role, bans, enemy_team, ally_team = parseDraft(draft)
+    my_champs, enemy_team, ally_team = prepareDraft(my_pool[my_role], bans, enemy_team, ally_team)
+    enemy_slots = teamSlots(enemy_team)
+    ally_slots = teamSlots(ally_team)
+    pool_scores = scoreSlots(
+        my_role,
+        enemy_slots,
+        ally_slots,
+        tensors["matchups"].poolStats(my_role, my_champs, enemy_slots, scoring),
+        tensors["synergies"].poolStats(my_role, my_champs, ally_slots, scoring),
+    )
+    return {"my_role": my_role, "rankings": rankPool(my_champs, pool_scores)}
+
+
+if __name__ == "__main__":
+    import global_logger
+
+    global_logger.init()
+    for kind in KINDS:
+        if updateRosterTensor(kind) is None:
+            print(f"No {kind} stored yet, parse some data first")
+            continue
+        printFootprint(loadRosterTensor(kind))
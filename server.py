@@ -0,0 +1,194 @@
+"""
+Long-running local recommendation server for the draft overlay. Every table
+for util.champ_pool is loaded at startup, so a query costs only the scoring.
+
+  python server.py [--host 127.0.0.1] [--port 8765]
+
+  POST /best-pick  {"my_role": "middle", "bans": [...], "enemy_team": {...},
+                    "ally_team": {...}}  -> analysis.scoreDraft JSON rankings
+  GET  /metrics    request counts, p50/p99 latency per endpoint, cache stats
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from collections import deque
+import global_logger
+
+global_logger.init()
+
+from global_logger import logger
+import analysis
+from data_store import table_cache
+from util import champ_pool
+
+# Latencies kept per endpoint for the percentiles on /metrics
+LATENCY_WINDOW = 10000
+MAX_BODY_BYTES = 1 << 20
+ROUTES = ["/best-pick", "/metrics"]
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.requests: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        self.latencies: dict[str, deque] = {}
+
+    def record(self, endpoint: str, status: int, seconds: float):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        self.latencies.setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def snapshot(self):
+        endpoints = {}
+        for endpoint, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            endpoints[endpoint] = {
+                "requests": self.requests[endpoint],
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+            }
+        return {
+            "uptime_s": time.time() - self.started,
+            "endpoints": endpoints,
+            "table_cache": table_cache.stats(),
+            # Stage spans and counters from global_logger (loads, scoring, cache)
+            "pipeline": global_logger.metrics.snapshot(),
+        }
+
+
+def percentile(ordered: list[float], pct: float):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+metrics = Metrics()
+
+
+def bestPickHandler(body: bytes):
+    draft = json.loads(body)
+    if not isinstance(draft, dict) or draft.get("my_role") not in champ_pool:
+        raise ValueError("expected a JSON object with my_role, bans, enemy_team and ally_team")
+    # Shape errors are the client's, checked before any table is loaded
+    analysis.parseDraft(draft)
+    # Cache hits after the startup preload, but still picks up re-parsed tables
+    pool_tables = analysis.loadPoolTables(champ_pool)
+    return analysis.scoreDraft(draft, champ_pool, pool_tables)
+
+
+def route(method: str, path: str, body: bytes):
+    """Returns (status, JSON-able response) for one request"""
+    if path == "/best-pick":
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            return 200, bestPickHandler(body)
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": f"{type(e).__name__}: {e}"}
+        except FileNotFoundError as e:
+            # A pool champion's table was never scraped
+            logger.error(f"Missing data for /best-pick: {type(e).__name__}: {e}")
+            return 503, {"error": f"champion data not available, run `cli.py update`: {type(e).__name__}: {e}"}
+        except Exception as e:
+            logger.exception(f"Error handling /best-pick: {e}")
+            return 500, {"error": f"internal error: {type(e).__name__}"}
+    if path == "/metrics":
+        if method != "GET":
+            return 405, {"error": "use GET"}
+        return 200, metrics.snapshot()
+    return 404, {"error": f"no route for {path}"}
+
+
+async def handleConnection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Serves HTTP/1.1 requests on one connection until the client closes it"""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            start = time.perf_counter()
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                status, response = 413, {"error": "body too large"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                status, response = route(method, path.split("?", 1)[0], body)
+
+            payload = json.dumps(response).encode("utf-8")
+            keep_alive = headers.get("connection", "").lower() != "close"
+            writer.write(
+                (
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    + "Content-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n"
+                    + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode("latin-1")
+                + payload
+            )
+            await writer.drain()
+            endpoint = path.split("?", 1)[0]
+            # Unknown paths share one bucket so random probes can't grow the metrics
+            metrics.record(endpoint if endpoint in ROUTES else "other", status, time.perf_counter() - start)
+            if not keep_alive:
+                break
+    except (ValueError, asyncio.IncompleteReadError, ConnectionError) as e:
+        logger.debug(f"Dropping connection: {e}")
+    finally:
+        writer.close()
+
+
+def preload():
+    start = time.perf_counter()
+    pool_tables = analysis.loadPoolTables(champ_pool)
+    for tables in pool_tables.values():
+        for table in tables.values():
+            table.index  # build every (role, champ) index up front
+    logger.info(
+        f"Preloaded {sum(len(tables) for tables in pool_tables.values())} tables in "
+        + f"{(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+
+
+async def serve(host: str, port: int):
+    preload()
+    server = await asyncio.start_server(handleConnection, host, port)
+    logger.info(f"Serving best picks on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local best-pick recommendation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,518 @@
+"""
+Append-only history of the parsed matchup and synergy tables, so trends
+across patches survive the in-place CSV and store rewrites.
+
+Every table written to the columnar store is also snapshotted: its content
+goes to a compressed object named by the hash of the table's columns, so an
+unchanged table costs no disk space, and one line is appended to the log
+saying which object a (kind, my_role, my_champ) had at that time and on which
+patch (from the manifest).
+
+An object only holds the rows that changed since the table's previous object
+(its base), plus where each of the other rows sits in the base, as long as at
+most half the rows changed and the chain of bases stays under
+MAX_DELTA_CHAIN objects. Otherwise it holds the whole table.
+
+  snapshots/log.jsonl                 {"taken_at", "patch", "kind", "role", "champ", "hash", "rows"}
+  snapshots/objects/<hh>/<hash>.npz   one table's columns, or its changed rows (np.savez_compressed)
+
+Point-in-time reads ("score as of patch 14.1", or as of a date) pick the last
+snapshot at or before that point, and diffs list the rows that changed
+between two points. Reads of the latest data don't go through here at all,
+they stay on data_store. Compaction thins old history down to the last
+snapshot per patch (or per day for untagged snapshots) and deletes the
+objects no longer referenced, directly or as a base.
+
+  python snapshot_store.py list [--kind matchups] [--role middle] [--champ ahri]
+  python snapshot_store.py diff 14.1 14.2 [--kind matchups] [--role middle] [--champ ahri]
+  python snapshot_store.py record [--patch 14.1]
+  python snapshot_store.py compact [--older-than 30]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from config import config
+from global_logger import logger, metrics
+from data_store import COLUMN_DTYPES, KINDS, ChampTable, loadStore
+from util import ROLES, cleanString, getSnapshotDir, stat_types
+
+LOG_FILE = "log.jsonl"
+OBJECTS_DIR = "objects"
+# Snapshots younger than this are never compacted
+COMPACT_AFTER_DAYS = 30
+# Tables read back from objects, which never change once written
+MAX_CACHED_OBJECTS = 512
+# Longest chain of delta objects read to rebuild one table, a full object starts a new one
+MAX_DELTA_CHAIN = 8
+# A table with a larger share of changed rows is stored whole
+MAX_DELTA_SHARE = 0.5
+
+
+def tableHash(table: ChampTable):
+    """sha256 of a table's columns, the same for equal tables however they were built"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(table.roles, dtype=np.int8).tobytes())
+    digest.update(np.ascontiguousarray(table.champs, dtype=COLUMN_DTYPES["other_champ"]).tobytes())
+    for stat in stat_types:
+        digest.update(np.ascontiguousarray(table.stats[stat], dtype=COLUMN_DTYPES[stat]).tobytes())
+    return digest.hexdigest()
+
+
+def patchKey(patch: str):
+    """Sortable form of a patch, so "14.10" comes after "14.9" """
+    return tuple(int(part) for part in re.findall(r"\d+", patch))
+
+
+def parseAsOf(as_of: str):
+    """
+    Reads a point in time given as a date (YYYY-MM-DD) or a patch ("14.1")
+
+    Returns:
+      (tuple) ("date", epoch seconds at the end of that day) or
+          ("patch", patchKey)
+    """
+    try:
+        day = datetime.strptime(as_of, "%Y-%m-%d")
+    except ValueError:
+        if not patchKey(as_of):
+            raise ValueError(f"{as_of!r} is neither a YYYY-MM-DD date nor a patch like 14.1")
+        return "patch", patchKey(as_of)
+    return "date", (day + timedelta(days=1)).timestamp()
+
+
+def describeAsOf(as_of: str):
+    """as_of in words, for messages"""
+    mode, _ = parseAsOf(as_of)
+    return f"tagged with a patch ≤ {as_of}" if mode == "patch" else f"taken on or before {as_of}"
+
+
+def sameRows(table: ChampTable, base: ChampTable):
+    """
+    Row of base with the same (role, champ) and stats as each row of table
+
+    Returns:
+      (np.ndarray) base row offsets, -1 where the row is new or changed
+    """
+    base_rows = np.array(
+        [base.index.get((ROLES[role], champ), -1) for role, champ in zip(table.roles.tolist(), table.champs.tolist())],
+        dtype=np.int32,
+    )
+    found = base_rows >= 0
+    same = found.copy()
+    for stat in stat_types:
+        values = table.stats[stat][found]
+        base_values = base.stats[stat][base_rows[found]]
+        equal = values == base_values
+        if values.dtype.kind == "f":
+            equal |= np.isnan(values) & np.isnan(base_values)
+        same[found] &= equal
+    base_rows[~same] = -1
+    return base_rows
+
+
+def emptyTable():
+    """A table with no rows, for champions that had no data yet at some point in time"""
+    return ChampTable(
+        np.empty(0, dtype=np.int8),
+        np.empty(0, dtype=COLUMN_DTYPES["other_champ"]),
+        {stat: np.empty(0, dtype=COLUMN_DTYPES[stat]) for stat in stat_types},
+    )
+
+
+class SnapshotStore:
+    """
+    The snapshot log, read into a per (kind, my_role, my_champ) history
+
+    Attributes:
+      history (dict[tuple[str, str, str], list[dict]]): log entries per key,
+          oldest first
+    """
+
+    def __init__(self, root: str, history: dict[tuple[str, str, str], list[dict]]):
+        self.root = root
+        self.history = history
+        self._tables: OrderedDict[str, ChampTable] = OrderedDict()
+
+    @staticmethod
+    def load(root: str = None):
+        root = getSnapshotDir() if root is None else root
+        history = {}
+        try:
+            with open(os.path.join(root, LOG_FILE), encoding="utf-8") as fp:
+                for line in fp:
+                    if line.strip():
+                        entry = json.loads(line)
+                        history.setdefault((entry["kind"], entry["role"], entry["champ"]), []).append(entry)
+        except FileNotFoundError:
+            pass
+        return SnapshotStore(root, history)
+
+    def objectPath(self, content_hash: str):
+        return os.path.join(self.root, OBJECTS_DIR, content_hash[:2], content_hash + ".npz")
+
+    def record(self, kind: str, tables: dict[tuple[str, str], ChampTable], patches: dict = None, taken_at: float = None):
+        """
+        Snapshots tables of one kind. A table identical to its last snapshot,
+          on the same patch, adds nothing.
+
+        Parameters:
+          tables (dict[tuple[str, str], ChampTable]): keyed by (my_role, my_champ)
+          patches (dict[tuple[str, str], str]): patch of each table, if known
+          taken_at (float): epoch seconds of the snapshot, now by default
+
+        Returns:
+          (int) number of log entries appended
+        """
+        taken_at = time.time() if taken_at is None else taken_at
+        patches = patches or {}
+        lines = []
+        for (my_role, my_champ), table in tables.items():
+            content_hash = tableHash(table)
+            patch = patches.get((my_role, my_champ))
+            entries = self.history.setdefault((kind, my_role, my_champ), [])
+            if entries and entries[-1]["hash"] == content_hash and entries[-1]["patch"] == patch:
+                continue
+            if not os.path.exists(self.objectPath(content_hash)):
+                self._writeObject(content_hash, table, entries[-1]["hash"] if entries else None)
+            entry = {
+                "taken_at": taken_at,
+                "patch": patch,
+                "kind": kind,
+                "role": my_role,
+                "champ": my_champ,
+                "hash": content_hash,
+                "rows": len(table),
+            }
+            entries.append(entry)
+            lines.append(json.dumps(entry) + "\n")
+        if lines:
+            # One append per run, objects first, so the log never names a missing object
+            with open(os.path.join(self.root, LOG_FILE), "a", encoding="utf-8") as fp:
+                fp.write("".join(lines))
+        metrics.count("snapshots.entries", len(lines))
+        return len(lines)
+
+    def _writeObject(self, content_hash: str, table: ChampTable, base_hash: str = None):
+        """Writes table's object, as a delta against base_hash when that's worth it"""
+        columns = {"roles": table.roles, "champs": table.champs, **{stat: table.stats[stat] for stat in stat_types}}
+        if base_hash is not None and os.path.exists(self.objectPath(base_hash)):
+            depth = self._objectDepth(base_hash) + 1
+            if depth < MAX_DELTA_CHAIN:
+                base_rows = sameRows(table, self.objectTable(base_hash))
+                stored = base_rows < 0
+                if np.count_nonzero(stored) <= MAX_DELTA_SHARE * len(table):
+                    columns = {column: values[stored] for column, values in columns.items()}
+                    columns.update(base=np.array(base_hash), depth=np.array(depth), base_rows=base_rows)
+                    metrics.count("snapshots.delta_objects")
+
+        object_path = self.objectPath(content_hash)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = object_path + ".tmp"
+        with open(tmp_path, "wb") as fp:
+            np.savez_compressed(fp, **columns)
+        os.replace(tmp_path, object_path)
+        metrics.count("snapshots.objects")
+
+    def _objectBase(self, content_hash: str):
+        """Hash of the object a delta object was stored against, None for a whole table"""
+        with np.load(self.objectPath(content_hash)) as columns:
+            return str(columns["base"]) if "base" in columns.files else None
+
+    def _objectDepth(self, content_hash: str):
+        with np.load(self.objectPath(content_hash)) as columns:
+            return int(columns["depth"]) if "depth" in columns.files else 0
+
+    def objectTable(self, content_hash: str):
+        """The table an object holds, rebuilt from its bases if it's a delta"""
+        table = self._tables.get(content_hash)
+        if table is not None:
+            self._tables.move_to_end(content_hash)
+            return table
+        with np.load(self.objectPath(content_hash)) as columns:
+            stored = {column: columns[column] for column in columns.files}
+        if "base" in stored:
+            base = self.objectTable(str(stored["base"]))
+            base_rows = stored["base_rows"]
+            from_base = base_rows >= 0
+
+            def rebuild(values: np.ndarray, base_values: np.ndarray):
+                merged = np.empty(len(base_rows), dtype=base_values.dtype)
+                merged[from_base] = base_values[base_rows[from_base]]
+                merged[~from_base] = values
+                return merged
+
+            table = ChampTable(
+                rebuild(stored["roles"], base.roles),
+                rebuild(stored["champs"], base.champs),
+                {stat: rebuild(stored[stat], base.stats[stat]) for stat in stat_types},
+            )
+        else:
+            table = ChampTable(stored["roles"], stored["champs"], {stat: stored[stat] for stat in stat_types})
+        self._tables[content_hash] = table
+        if len(self._tables) > MAX_CACHED_OBJECTS:
+            self._tables.popitem(last=False)
+        return table
+
+    def entryAsOf(self, kind: str, my_role: str, my_champ: str, as_of: str):
+        """Last log entry of the table at or before as_of (see parseAsOf), None if there is none"""
+        mode, point = parseAsOf(as_of)
+        found = None
+        for entry in self.history.get((kind, my_role, my_champ), []):
+            if mode == "date" and entry["taken_at"] <= point:
+                found = entry
+            elif mode == "patch" and entry["patch"] is not None and patchKey(entry["patch"]) <= point:
+                found = entry
+        return found
+
+    def checkAsOf(self, keys: list[tuple[str, str]], as_of: str):
+        """
+        Makes sure some of the (my_role, my_champ) keys have snapshots of each
+          kind at as_of, rather than scoring them all with empty tables
+
+        Raises:
+          ValueError if none of them do for a kind
+        """
+        for kind in KINDS:
+            if keys and all(self.entryAsOf(kind, my_role, my_champ, as_of) is None for my_role, my_champ in keys):
+                raise ValueError(
+                    f"No {kind} snapshots {describeAsOf(as_of)} for any of the {len(keys)} pool champion(s)"
+                )
+
+    def table(self, kind: str, my_role: str, my_champ: str, as_of: str):
+        """
+        The table as it was at as_of, an empty table if it hadn't been
+          snapshotted yet (see checkAsOf for when none of the pool had been)
+        """
+        entry = self.entryAsOf(kind, my_role, my_champ, as_of)
+        if entry is None:
+            logger.warning(f"No {kind} snapshot of {my_champ} {my_role} as of {as_of}, scoring it without data")
+            return emptyTable()
+        return self.objectTable(entry["hash"])
+
+    def changes(self, kind: str, my_role: str, my_champ: str, since: str, until: str):
+        """
+        Rows of a table that differ between two points in time (see
+          parseAsOf), a table not snapshotted yet counting as empty
+
+        Returns:
+          (dict) "added" and "removed" rows as (role, champ) lists, and
+              "changed" rows as {"role", "champ", stat: (before, after)} with
+              only the stats that changed
+        """
+        tables = []
+        for as_of in (since, until):
+            entry = self.entryAsOf(kind, my_role, my_champ, as_of)
+            tables.append(emptyTable() if entry is None else self.objectTable(entry["hash"]))
+        before, after = tables
+        found = {"added": [], "removed": [], "changed": []}
+        if before is after:
+            return found
+
+        base_rows = sameRows(after, before)
+        for row in np.flatnonzero(base_rows < 0).tolist():
+            key = (ROLES[int(after.roles[row])], str(after.champs[row]))
+            before_row = before.lookup(*key)
+            if before_row is None:
+                found["added"].append(key)
+                continue
+            changed = {"role": key[0], "champ": key[1]}
+            for stat in stat_types:
+                old, new = before.stats[stat][before_row].item(), after.stats[stat][row].item()
+                if old != new and not (old != old and new != new):
+                    changed[stat] = (old, new)
+            found["changed"].append(changed)
+        found["removed"] = [key for key in before.index if after.lookup(*key) is None]
+        return found
+
+    def compact(self, older_than_days: int = COMPACT_AFTER_DAYS, now: float = None):
+        """
+        Keeps only the last snapshot per patch (per day when untagged) among
+          those older than older_than_days, and the latest snapshot of every
+          table whatever its age, then deletes unreferenced objects
+
+        Returns:
+          (dict) "entries" and "objects" removed, "bytes" freed
+        """
+        cutoff = (time.time() if now is None else now) - older_than_days * 86400
+        removed_entries = 0
+        for key, entries in self.history.items():
+            kept = []
+            for num, entry in enumerate(entries):
+                if entry["taken_at"] >= cutoff or num == len(entries) - 1:
+                    kept.append(entry)
+                    continue
+                following = entries[num + 1]
+                if entry["patch"] is not None:
+                    superseded = following["patch"] == entry["patch"]
+                else:
+                    day = datetime.fromtimestamp(entry["taken_at"]).date()
+                    superseded = following["patch"] is None and datetime.fromtimestamp(following["taken_at"]).date() == day
+                if superseded:
+                    removed_entries += 1
+                else:
+                    kept.append(entry)
+            self.history[key] = kept
+
+        log_path = os.path.join(self.root, LOG_FILE)
+        tmp_path = log_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fp:
+            for entries in self.history.values():
+                for entry in entries:
+                    fp.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, log_path)
+
+        referenced = {entry["hash"] for entries in self.history.values() for entry in entries}
+        # Shallowest first, so a delta is only rewritten if its base still depends on a dropped object
+        for content_hash in sorted(referenced, key=self._objectDepth):
+            # A delta object whose chain runs through a dropped snapshot is stored whole instead,
+            #   so the dropped objects can go
+            base_hash = self._objectBase(content_hash)
+            while base_hash is not None and base_hash in referenced:
+                base_hash = self._objectBase(base_hash)
+            if base_hash is not None:
+                self._writeObject(content_hash, self.objectTable(content_hash))
+        removed_objects = 0
+        freed = 0
+        objects_dir = os.path.join(self.root, OBJECTS_DIR)
+        for prefix in os.listdir(objects_dir) if os.path.isdir(objects_dir) else []:
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                if name.endswith(".npz") and name[: -len(".npz")] not in referenced:
+                    path = os.path.join(objects_dir, prefix, name)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                    removed_objects += 1
+        self._tables.clear()
+        logger.info(f"Compacted snapshots: {removed_entries} entries, {removed_objects} objects, {freed} bytes")
+        return {"entries": removed_entries, "objects": removed_objects, "bytes": freed}
+
+    def diskUsage(self):
+        """Bytes taken by the log and the objects"""
+        total = 0
+        for directory, _, names in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(directory, name)) for name in names)
+        return total
+
+
+# Snapshot log by root, reloaded when the log changes on disk
+_loaded: dict[str, tuple[tuple[int, int], SnapshotStore]] = {}
+
+
+def loadSnapshots():
+    """SnapshotStore of the current data root, cached until its log changes"""
+    root = getSnapshotDir()
+    try:
+        stat = os.stat(os.path.join(root, LOG_FILE))
+        version = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        version = None
+    cached = _loaded.get(root)
+    if cached is None or cached[0] != version:
+        _loaded[root] = (version, SnapshotStore.load(root))
+    return _loaded[root][1]
+
+
+def snapshotTables(kind: str, tables: dict, manifest=None, taken_at: float = None):
+    """
+    Snapshots freshly written tables, tagged with the patch their scrape was
+      recorded with in the manifest. Does nothing with the snapshots setting
+      off.
+
+    Parameters:
+      tables (dict[tuple[str, str], pd.DataFrame]): keyed by (my_role, my_champ),
+          as passed to data_store.writeStore
+
+    Returns:
+      (int) number of log entries appended
+    """
+    if not config["snapshots"]:
+        return 0
+    patches = {}
+    if manifest is not None:
+        for my_role, my_champ in tables:
+            entry = manifest.entry(my_role, my_champ, kind)
+            if entry is not None:
+                patches[(my_role, my_champ)] = entry.get("patch")
+    champ_tables = {key: ChampTable.fromDataFrame(df) for key, df in tables.items()}
+    with metrics.span("snapshots.record"):
+        return SnapshotStore.load().record(kind, champ_tables, patches, taken_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History of the matchup and synergy tables")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    list_parser = subparsers.add_parser("list", help="print the snapshots")
+    list_parser.add_argument("--kind", choices=KINDS)
+    list_parser.add_argument("--role", choices=ROLES)
+    list_parser.add_argument("--champ")
+    diff_parser = subparsers.add_parser("diff", help="print the rows that changed between two points in time")
+    diff_parser.add_argument("since", metavar="SINCE", help="patch (14.1) or date (YYYY-MM-DD)")
+    diff_parser.add_argument("until", metavar="UNTIL", help="patch (14.2) or date (YYYY-MM-DD)")
+    diff_parser.add_argument("--kind", choices=KINDS)
+    diff_parser.add_argument("--role", choices=ROLES)
+    diff_parser.add_argument("--champ")
+    record_parser = subparsers.add_parser("record", help="snapshot everything in the columnar store now")
+    record_parser.add_argument("--patch", help="patch to tag the snapshot with")
+    compact_parser = subparsers.add_parser("compact", help="thin out old snapshots")
+    compact_parser.add_argument("--older-than", type=int, default=COMPACT_AFTER_DAYS, metavar="DAYS")
+    args = parser.parse_args()
+
+    import global_logger
+
+    global_logger.init()
+    store = SnapshotStore.load()
+    if args.command in ("list", "diff"):
+        champ = cleanString(args.champ) if args.champ else None
+        keys = [
+            key
+            for key in sorted(store.history)
+            if (args.kind or key[0]) == key[0] and (args.role or key[1]) == key[1] and (champ or key[2]) == key[2]
+        ]
+    if args.command == "list":
+        for kind, my_role, my_champ in keys:
+            print(f"{kind} {my_champ} {my_role}")
+            for entry in store.history[(kind, my_role, my_champ)]:
+                taken = datetime.fromtimestamp(entry["taken_at"]).strftime("%Y-%m-%d %H:%M")
+                print(f"  {taken}  patch {entry['patch'] or '-':<8} {entry['rows']:>5} rows  {entry['hash'][:12]}")
+    elif args.command == "diff":
+        for kind, my_role, my_champ in keys:
+            found = store.changes(kind, my_role, my_champ, args.since, args.until)
+            if not any(found.values()):
+                continue
+            print(
+                f"{kind} {my_champ} {my_role}: {len(found['added'])} added, "
+                + f"{len(found['removed'])} removed, {len(found['changed'])} changed"
+            )
+            # Row by row only for one champion, a whole-store diff would be unreadable
+            if champ is None:
+                continue
+            for role, other_champ in found["added"]:
+                print(f"  + {other_champ} {role}")
+            for role, other_champ in found["removed"]:
+                print(f"  - {other_champ} {role}")
+            for changed in found["changed"]:
+                stats = ", ".join(
+                    f"{stat} {before:g} -> {after:g}" for stat, (before, after) in list(changed.items())[2:]
+                )
+                print(f"  ~ {changed['champ']} {changed['role']}: {stats}")
+    elif args.command == "record":
+        for kind in KINDS:
+            column_store = loadStore(kind, mmap=False)
+            if column_store is None:
+                print(f"No {kind} stored yet, nothing to snapshot")
+                continue
+            tables = {key: column_store.table(*key) for key in column_store.keys()}
+            patches = {key: args.patch for key in tables}
+            print(f"{kind}: {store.record(kind, tables, patches)} new snapshot(s)")
+    else:
+        store.compact(args.older_than)
+    print(f"Snapshots take {store.diskUsage() / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Local stand-in for lolalytics over plain HTTP, for testing and benchmarking
+http_fetch without the network. Every champion page is generated from a seed
+of its (kind, role, champ), so repeated fetches return identical tables.
+
+  GET /matchups/<role>/<champ>    the five counter panels, every cell rendered
+  GET /synergies/<role>/<champ>   the four teammate panels
+
+Point http_fetch at it by setting the http_matchups_url/http_synergies_url
+config settings to the templates from stubTemplates(port). Failures and
+latency can be injected to exercise the fetcher's retries:
+
+  python stub_lolalytics.py [--port 8766] [--fail-rate 0.1] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import gzip
+import random
+import zlib
+from global_logger import logger
+from util import ROLES
+
+CELL_CLASS = "Cell_cell__383UV"
+# Roughly the live champion count
+ROSTER_SIZE = 168
+
+
+def stubRoster(roster_size: int = ROSTER_SIZE):
+    return ["champ" + chr(97 + num // 26) + chr(97 + num % 26) for num in range(roster_size)]
+
+
+def stubPage(kind: str, my_role: str, my_champ: str, roster_size: int = ROSTER_SIZE):
+    """Panel HTML of one champion page, shaped like the scraped dumps"""
+    rnd = random.Random(zlib.crc32(f"{kind}/{my_role}/{my_champ}".encode("utf-8")))
+    roles = ROLES if kind == "matchups" else [role for role in ROLES if role != my_role]
+    panels = []
+    for role in roles:
+        cells = []
+        for champ in stubRoster(roster_size):
+            if kind == "matchups":
+                href = f"/lol/{my_champ}/vs/{champ}/build/?lane={my_role}&amp;vslane={role}"
+            else:
+                href = f"/lol/{champ}/build/?lane={role}"
+            cells.append(
+                f'<div class="{CELL_CLASS}"><a href="{href}"><img alt="{champ}" src="{champ}.webp"/></a>'
+                + f"<div>{rnd.uniform(40, 60):.2f}</div><div>{rnd.uniform(-8, 8):.2f}</div>"
+                + f"<div>{rnd.uniform(-8, 8):.2f}</div><div>{rnd.uniform(0.1, 20):.2f}</div>"
+                + f"<div>{rnd.randint(0, 50000):,}</div></div>"
+            )
+        panels.append('<div class="CountersPanel_counters__U8zc5"><div class="Panel_data__dtE8F">' + "".join(cells) + "</div></div>")
+    return "<html><body>" + "".join(panels) + "</body></html>"
+
+
+def stubTemplates(port: int, host: str = "127.0.0.1"):
+    """URL templates per kind for http_fetch, pointing at a stub on host:port"""
+    return {kind: f"http://{host}:{port}/{kind}/{{role}}/{{champ}}" for kind in ["matchups", "synergies"]}
+
+
+class StubServer:
+    """
+    Attributes:
+      requests (int): requests served, failures included
+      failures (int): 503s injected
+    """
+
+    def __init__(self, fail_rate: float = 0.0, latency: float = 0.0, seed: int = 0):
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.requests = 0
+        self.failures = 0
+        self._rnd = random.Random(seed)
+        self._server = None
+        # Tasks serving open (keep-alive) connections, cancelled by stop()
+        self._connections: set[asyncio.Task] = set()
+
+    def respond(self, path: str):
+        """Returns (status, body) for one GET"""
+        parts = path.split("?", 1)[0].strip("/").split("/")
+        if len(parts) != 3 or parts[0] not in ("matchups", "synergies") or parts[1] not in ROLES:
+            return 404, b"not found"
+        if self._rnd.random() < self.fail_rate:
+            self.failures += 1
+            return 503, b"try again"
+        kind, my_role, my_champ = parts
+        return 200, stubPage(kind, my_role, my_champ).encode("utf-8")
+
+    async def handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, body = self.respond(path)
+                extra = ""
+                if status == 503:
+                    extra = "Retry-After: 0\r\n"
+                if "gzip" in headers.get("accept-encoding", ""):
+                    body = gzip.compress(body)
+                    extra += "Content-Encoding: gzip\r\n"
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                        + "Content-Type: text/html; charset=utf-8\r\n"
+                        + f"Content-Length: {len(body)}\r\n"
+                        + extra
+                        + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, ConnectionError) as e:
+            logger.debug(f"Stub dropping connection: {e}")
+        except asyncio.CancelledError:
+            # stop() with the connection still open
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        """Starts serving, returns the bound port (port=0 picks a free one)"""
+        self._server = await asyncio.start_server(self.handleConnection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """Stops listening and closes every open connection"""
+        self._server.close()
+        connections = list(self._connections)
+        for task in connections:
+            task.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+
+async def _serve(host: str, port: int, fail_rate: float, latency: float):
+    stub = StubServer(fail_rate, latency)
+    port = await stub.start(host, port)
+    logger.info(f"Stub lolalytics on http://{host}:{port}, templates {stubTemplates(port, host)}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    import global_logger
+
+    global_logger.init()
+    parser = argparse.ArgumentParser(description="Local stub of the lolalytics champion pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before every response")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.fail_rate, args.latency))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,84 @@
+"""
+Shared fixtures and helpers: every test gets its own data root, and a small
+corpus built from stub_lolalytics pages where it needs stored tables.
+"""
+import asyncio
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config
+from data_store import table_cache, writeStore
+from parse_lolalytics import TableBuilder
+from stub_lolalytics import StubServer, stubPage, stubRoster
+
+# Small enough that building the corpus takes well under a second
+CORPUS_ROSTER = 12
+CORPUS_ROLES = ["top", "middle", "support"]
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    """A fresh, empty data root for one test"""
+    monkeypatch.setitem(config, "data_root", str(tmp_path))
+    table_cache.clear()
+    yield tmp_path
+    table_cache.clear()
+
+
+def stubTables(kind: str, my_role: str, champs: list[str], roster_size: int = CORPUS_ROSTER):
+    """Parsed stub pages of champs, keyed by (my_role, my_champ) like writeStore takes them"""
+    tables = {}
+    for champ in champs:
+        builder = TableBuilder(kind)
+        builder.addHtml(stubPage(kind, my_role, champ, roster_size))
+        tables[(my_role, champ)] = builder.toDataFrame()
+    return tables
+
+
+@pytest.fixture
+def corpus(data_root):
+    """
+    Every stub roster champion stored in CORPUS_ROLES, with the roster tensors
+      built from them
+    """
+    import roster_tensor
+
+    champs = stubRoster(CORPUS_ROSTER)
+    for kind in ["matchups", "synergies"]:
+        tables = {}
+        for my_role in CORPUS_ROLES:
+            tables.update(stubTables(kind, my_role, champs))
+        writeStore(kind, tables)
+        roster_tensor.updateRosterTensor(kind)
+    return {"champs": champs, "roles": CORPUS_ROLES, "root": data_root}
+
+
+@pytest.fixture
+def stub_server():
+    """(StubServer, port) served from a background event loop"""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    stub = StubServer(seed=1)
+    port = asyncio.run_coroutine_threadsafe(stub.start(), loop).result(5)
+    yield stub, port
+    asyncio.run_coroutine_threadsafe(stub.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def assertSameRankings(rankings: list[dict], expected: list[dict]):
+    assert [ranking["my_champ"] for ranking in rankings] == [ranking["my_champ"] for ranking in expected]
+    for ranking, expected_ranking in zip(rankings, expected):
+        for column in ["sc1", "sc2", "sum"]:
+            assert ranking[column] == expected_ranking[column], (ranking["my_champ"], column)
+        for column in ["wr", "delta1", "delta2"]:
+            if expected_ranking[column] is None:
+                assert ranking[column] is None
+            else:
+                assert ranking[column] == pytest.approx(expected_ranking[column], abs=1e-6)
@@ -0,0 +1,34 @@
+import json
+import pytest
+from config import DEFAULTS, loadConfig
+
+
+def writeConfig(tmp_path, settings: dict):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(settings), encoding="utf-8")
+    return str(path)
+
+
+def test_file_and_environment_override_defaults(tmp_path):
+    path = writeConfig(tmp_path, {"data_root": "bm", "scrape_workers": 2, "scoring": "shrinkage"})
+    settings = loadConfig(path, {"BEST_MATCHUP_SCRAPE_WORKERS": "4", "BEST_MATCHUP_HEADLESS": "true"})
+
+    assert settings["data_root"] == str((tmp_path / "bm").resolve())
+    assert settings["scrape_workers"] == 4 and settings["headless"] is True
+    assert settings["scoring"] == "shrinkage"
+    assert settings["http_rate"] == DEFAULTS["http_rate"]
+
+
+def test_unknown_setting_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="unknown settings"):
+        loadConfig(writeConfig(tmp_path, {"scrape_wrokers": 2}), {})
+
+
+@pytest.mark.parametrize("source", ["file", "environment"])
+def test_unknown_scoring_is_rejected(tmp_path, source):
+    if source == "file":
+        path, environ = writeConfig(tmp_path, {"scoring": "median"}), {}
+    else:
+        path, environ = writeConfig(tmp_path, {}), {"BEST_MATCHUP_SCORING": "median"}
+    with pytest.raises(ValueError, match="Unknown scoring 'median'"):
+        loadConfig(path, environ)
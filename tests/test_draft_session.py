@@ -0,0 +1,65 @@
+import pytest
+import analysis
+from config import SCORING_MODES
+from conftest import assertSameRankings
+
+POOL_SIZE = 6
+
+
+def draftOf(session: analysis.DraftSession, bans: list[str]):
+    """The draft a session has arrived at, for scoring it in one go"""
+    enemy_team = {role: "" for role in analysis.ROLES}
+    ally_team = {role: "" for role in analysis.ROLES}
+    for (kind, role), (champ, _) in session.slots.items():
+        (enemy_team if kind == "matchups" else ally_team)[role] = champ
+    return (session.my_role, bans, enemy_team, ally_team)
+
+
+@pytest.mark.parametrize("scoring", SCORING_MODES)
+def test_draft_session_matches_score_draft(corpus, scoring):
+    champs = corpus["champs"]
+    pool = {"middle": champs[:POOL_SIZE]}
+    pool_tables = analysis.loadPoolTables(pool)
+    session = analysis.DraftSession("middle", pool["middle"], scoring)
+    bans = []
+
+    steps = [
+        ("enemy", "top", champs[7]),
+        ("ally", "support", champs[8]),
+        ("ban", None, champs[9]),
+        ("enemy", "middle", champs[0]),
+        # Re-picks: the earlier champion's contribution goes, and a pool champion comes back
+        ("enemy", "middle", champs[10]),
+        ("ally", "support", champs[1]),
+        ("ally", "support", champs[11]),
+        ("enemy", "top", ""),
+    ]
+    for action, role, champ in steps:
+        if action == "ban":
+            session.ban(champ)
+            bans.append(champ)
+        elif action == "enemy":
+            session.enemy_pick(role, champ)
+        else:
+            session.ally_pick(role, champ)
+        expected = analysis.scoreDraft(draftOf(session, bans), pool, pool_tables, scoring)
+        assertSameRankings(session.rankings(), expected["rankings"])
+
+    ranked = [ranking["my_champ"] for ranking in session.rankings()]
+    assert champs[0] in ranked and champs[1] in ranked
+
+
+def test_draft_session_keeps_banned_champions_out(corpus):
+    champs = corpus["champs"]
+    session = analysis.DraftSession("middle", champs[:POOL_SIZE])
+    session.ban(champs[0])
+    session.enemy_pick("top", champs[0])
+    session.enemy_pick("top", champs[7])
+    # Picked in two slots, replacing one of them leaves it taken
+    session.ally_pick("support", champs[1])
+    session.enemy_pick("bottom", champs[1])
+    session.ally_pick("support", champs[8])
+
+    ranked = [ranking["my_champ"] for ranking in session.rankings()]
+    assert champs[0] not in ranked and champs[1] not in ranked
+    assert len(ranked) == POOL_SIZE - 2
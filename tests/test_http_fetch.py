@@ -0,0 +1,27 @@
+import asyncio
+import http_fetch
+from stub_lolalytics import stubTemplates
+
+
+def test_fetch_tables_retries_against_the_stub(stub_server, monkeypatch):
+    stub, port = stub_server
+    stub.fail_rate = 0.3
+    monkeypatch.setattr(http_fetch, "BACKOFF_SECONDS", 0.0)
+    pool_keys = [("middle", "champaa"), ("middle", "champab"), ("top", "champac")]
+    tables, errors = asyncio.run(http_fetch.fetchTables(pool_keys, stubTemplates(port), 4, 0, 8))
+
+    assert errors == {}
+    assert stub.failures > 0
+    for kind in http_fetch.KINDS:
+        assert set(tables[kind]) == set(pool_keys)
+        assert all(len(df) > 0 for df in tables[kind].values())
+
+
+def test_fetch_tables_records_unretried_errors(stub_server):
+    _, port = stub_server
+    templates = {kind: f"http://127.0.0.1:{port}/nowhere/{{role}}/{{champ}}" for kind in http_fetch.KINDS}
+    tables, errors = asyncio.run(http_fetch.fetchTables([("middle", "champaa")], templates, 2, 0, 3))
+
+    assert list(errors) == [("middle", "champaa")]
+    assert "HTTP 404" in errors[("middle", "champaa")]
+    assert tables == {kind: {} for kind in http_fetch.KINDS}
@@ -0,0 +1,82 @@
+import os
+import time
+from manifest import Manifest
+from util import getCSVPath, getHTMLSavePath
+
+DAY = 86400
+POOL = {"top": ["garen"], "middle": ["ahri", "zed"]}
+
+
+def touch(path: str, age_days: float = 0):
+    with open(path, "w", encoding="utf-8") as fp:
+        fp.write("x")
+    mtime = time.time() - age_days * DAY
+    os.utime(path, (mtime, mtime))
+
+
+def recordBoth(manifest: Manifest, role: str, champ: str, age_days: float, content_hash: str = "h"):
+    for kind in ["matchups", "synergies"]:
+        manifest.recordScrape(role, champ, kind, content_hash, "14.1", time.time() - age_days * DAY)
+
+
+def test_plan_scrapes_by_age(data_root):
+    manifest = Manifest.load()
+    recordBoth(manifest, "top", "garen", age_days=1)
+    recordBoth(manifest, "middle", "ahri", age_days=5)
+    # zed has no entry and no CSV, so it has never been scraped
+
+    assert manifest.planScrapes(POOL, num_days=3) == [("middle", "ahri"), ("middle", "zed")]
+    assert manifest.planScrapes(POOL, num_days=10) == [("middle", "zed")]
+    assert manifest.planScrapes(POOL, force=True, num_days=10) == [("top", "garen"), ("middle", "ahri"), ("middle", "zed")]
+
+
+def test_plan_scrapes_when_one_kind_is_stale(data_root):
+    manifest = Manifest.load()
+    recordBoth(manifest, "middle", "ahri", age_days=1)
+    manifest.recordScrape("middle", "ahri", "synergies", "h", None, time.time() - 5 * DAY)
+
+    assert manifest.planScrapes({"middle": ["ahri"]}, num_days=3) == [("middle", "ahri")]
+
+
+def test_plan_scrapes_falls_back_to_csv_age(data_root):
+    for kind in ["matchups", "synergies"]:
+        touch(getCSVPath(kind, "middle", "ahri"), age_days=1)
+        touch(getCSVPath(kind, "middle", "zed"), age_days=5)
+
+    assert Manifest.load().planScrapes({"middle": ["ahri", "zed"]}, num_days=3) == [("middle", "zed")]
+
+
+def test_plan_parses_skips_unchanged_dumps(data_root):
+    manifest = Manifest.load()
+    for kind in ["matchups", "synergies"]:
+        touch(getHTMLSavePath("middle", "ahri", kind))
+        touch(getHTMLSavePath("middle", "zed", kind))
+    # ahri was scraped again but its page is identical, zed's page changed
+    for champ, new_hash in [("ahri", "same"), ("zed", "new")]:
+        for kind in ["matchups", "synergies"]:
+            manifest.recordParse("middle", champ, kind, 10, "same", time.time() - DAY)
+            manifest.recordScrape("middle", champ, kind, new_hash, "14.1")
+
+    pending, unchanged = manifest.planParses({"middle": ["ahri", "zed"]})
+    assert pending == [("middle", "zed", "matchups"), ("middle", "zed", "synergies")]
+    assert unchanged == [("middle", "ahri", "matchups"), ("middle", "ahri", "synergies")]
+
+    pending, unchanged = manifest.planParses({"middle": ["ahri", "zed"]}, force=True)
+    assert len(pending) == 4 and unchanged == []
+
+
+def test_manifest_round_trips(data_root):
+    manifest = Manifest.load()
+    recordBoth(manifest, "middle", "ahri", age_days=0, content_hash="abc")
+    manifest.save()
+
+    entry = Manifest.load().entry("middle", "ahri", "matchups")
+    assert entry["hash"] == "abc" and entry["patch"] == "14.1"
+
+
+def test_unreadable_manifest_loads_empty(data_root):
+    manifest = Manifest.load()
+    with open(manifest.path, "w", encoding="utf-8") as fp:
+        fp.write("{not json")
+
+    assert Manifest.load().entries == {}
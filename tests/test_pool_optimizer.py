@@ -0,0 +1,80 @@
+import itertools
+import numpy as np
+import pytest
+import analysis
+from pool_optimizer import branchAndBoundPool, draftMatrix, greedyPool, optimizePool
+
+
+def corpusDrafts(champs: list[str]):
+    """A handful of middle drafts over the corpus roster, plus one top draft that's ignored"""
+    drafts = []
+    for num in range(8):
+        drafts.append(
+            {
+                "my_role": "middle",
+                "bans": [champs[num % 4]],
+                "enemy_team": {"top": champs[(num + 5) % 12], "middle": champs[(num + 1) % 6]},
+                "ally_team": {"support": champs[(num + 9) % 12]},
+            }
+        )
+    drafts.append({"my_role": "top", "bans": [], "enemy_team": {}, "ally_team": {}})
+    return drafts
+
+
+def test_branch_and_bound_beats_greedy():
+    # A is the best single pick, but B and C together cover every draft
+    values = np.array([[5.0, 9.0, 0.0], [5.0, 9.0, 0.0], [5.0, 0.0, 9.0], [5.0, 0.0, 9.0]])
+
+    assert greedyPool(values, 2, 0.0) == [0, 1]
+    pool, optimal = branchAndBoundPool(values, 2, 0.0)
+    assert sorted(pool) == [1, 2] and optimal
+
+
+def test_optimize_pool_finds_the_best_pool(corpus):
+    champs = corpus["champs"]
+    candidates = champs[:6]
+    drafts = corpusDrafts(champs)
+    result = optimizePool(drafts, "middle", 2, candidates=candidates, method="bnb")
+
+    assert result["drafts"] == 8 and result["candidates"] == 6 and result["optimal"]
+    # Same as trying every pool of two on the same (draft x candidate) matrix
+    sums, available = draftMatrix([draft for draft in drafts if draft["my_role"] == "middle"], "middle", candidates)
+    values = np.where(available, sums, sums.min())
+    best = max(values[:, list(pool)].max(axis=1).mean() for pool in itertools.combinations(range(6), 2))
+    assert result["expected_sum"] == pytest.approx(best)
+    assert optimizePool(drafts, "middle", 2, candidates=candidates)["expected_sum"] <= result["expected_sum"] + 1e-9
+
+
+def test_optimize_pool_matches_score_draft(corpus):
+    champs = corpus["champs"]
+    drafts = corpusDrafts(champs)[:-1]
+    result = optimizePool(drafts, "middle", 3, candidates=champs[:6])
+
+    pool = {"middle": result["pool"]}
+    pool_tables = analysis.loadPoolTables(pool)
+    best_sums = []
+    for draft in drafts:
+        rankings = analysis.scoreDraft(draft, pool, pool_tables)["rankings"]
+        # Every draft here leaves at least one pool champion available
+        assert rankings
+        best_sums.append(rankings[0]["sum"])
+    assert result["expected_sum"] == pytest.approx(np.mean(best_sums))
+    assert sum(result["picks"].values()) == len(drafts) and result["no_pick"] == 0
+
+
+def test_optimize_pool_counts_drafts_without_a_pick(corpus):
+    champs = corpus["champs"]
+    drafts = corpusDrafts(champs)[:-1]
+    # Both candidates gone in this one
+    drafts.append({"my_role": "middle", "bans": [champs[4]], "enemy_team": {"top": champs[5]}, "ally_team": {}})
+    result = optimizePool(drafts, "middle", 2, candidates=champs[4:6])
+
+    assert result["no_pick"] == 1
+    assert sum(result["picks"].values()) == len(drafts) - 1
+
+
+def test_optimize_pool_needs_drafts_and_candidates(corpus):
+    with pytest.raises(ValueError):
+        optimizePool(corpusDrafts(corpus["champs"]), "middle", 2, candidates=["nobody"])
+    with pytest.raises(ValueError):
+        optimizePool([], "middle", 2)
@@ -0,0 +1,31 @@
+import pytest
+import analysis
+import cli
+import roster_tensor
+from config import SCORING_MODES
+from conftest import assertSameRankings
+
+POOL_SIZE = 6
+
+
+@pytest.mark.parametrize("scoring", SCORING_MODES)
+def test_roster_tensor_matches_pool_tables(corpus, scoring):
+    champs = corpus["champs"]
+    pool = {"middle": champs[:POOL_SIZE]}
+    draft = (
+        "middle",
+        [champs[9]],
+        {"top": champs[7], "middle": champs[2]},
+        {"support": champs[8], "top": ""},
+    )
+    expected = analysis.scoreDraft(draft, pool, analysis.loadPoolTables(pool), scoring)
+    result = roster_tensor.scoreDraft(draft, pool, roster_tensor.loadRosterTensors(), scoring)
+
+    assertSameRankings(result["rankings"], expected["rankings"])
+
+
+def test_pick_pool_rejects_unknown_champions(corpus):
+    with pytest.raises(SystemExit, match="unknown champion"):
+        cli.main(["--quiet", "pick", "--role", "middle", "--pool", corpus["champs"][0], "nobody"])
+    with pytest.raises(SystemExit, match="can't be combined with --pool"):
+        cli.main(["--quiet", "pick", "--role", "middle", "--pool", corpus["champs"][0], "--detail"])
@@ -0,0 +1,129 @@
+import urllib.error
+import urllib.request
+from selenium.common.exceptions import WebDriverException
+import web_scraping
+from parse_lolalytics import TableBuilder
+from stub_lolalytics import stubTemplates
+
+
+class FakeDriver:
+    """Just enough of a WebDriver for scrapeWorker, loading pages from the stub over urllib"""
+
+    def __init__(self):
+        self.window_handles = ["tab"]
+        self.current_window_handle = "tab"
+        self.switch_to = self
+        self.page_source = ""
+        self.quit_calls = 0
+
+    def new_window(self, kind):
+        pass
+
+    def window(self, handle):
+        pass
+
+    def close(self):
+        pass
+
+    def quit(self):
+        self.quit_calls += 1
+
+    def get(self, url: str):
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.page_source = response.read().decode("utf-8")
+        except urllib.error.HTTPError as e:
+            # What an error page does to the scraper: a driver error, not a partial page
+            raise WebDriverException(f"HTTP {e.code}")
+
+
+def stubScrape(driver: FakeDriver, url: str, my_role: str, champ: str, tables: dict):
+    driver.get(url)
+    builder = TableBuilder("matchups")
+    builder.addHtml(driver.page_source)
+    assert builder.rows, "no cells"
+    tables[(my_role, champ)] = builder.toDataFrame()
+    return {"load": 0.0}
+
+
+def runWorker(monkeypatch, stub_server, champs: list[str], retries: int, scrape=stubScrape):
+    _, port = stub_server
+    drivers = []
+
+    def openDriver(service, headless=False, port=None):
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    monkeypatch.setattr(web_scraping, "openDriver", openDriver)
+    template = stubTemplates(port)["matchups"]
+    tables = {}
+    jobs = [(template.format(role="middle", champ=champ), "middle", champ, tables) for champ in champs]
+    stats = web_scraping.scrapeWorker(0, None, jobs, True, retries, scrape)
+    return stats, tables, drivers
+
+
+def test_scrape_worker_retries_failed_pages(monkeypatch, stub_server):
+    stub, _ = stub_server
+    stub.fail_rate = 0.4
+    champs = ["champaa", "champab", "champac", "champad"]
+    stats, tables, drivers = runWorker(monkeypatch, stub_server, champs, retries=6)
+
+    assert stats["scraped"] == len(champs) and stats["failed"] == 0
+    assert set(tables) == {("middle", champ) for champ in champs}
+    assert stub.failures > 0
+    # Every failed page restarts the driver, and each one is quit exactly once
+    assert len(drivers) == stub.failures + 1
+    assert all(driver.quit_calls == 1 for driver in drivers)
+
+
+def test_scrape_worker_gives_up_after_retries(monkeypatch, stub_server):
+    stub, _ = stub_server
+    stub.fail_rate = 1.0
+    stats, tables, _ = runWorker(monkeypatch, stub_server, ["champaa"], retries=2)
+
+    assert stats["scraped"] == 0 and stats["failed"] == 1
+    assert tables == {}
+    assert stub.requests == 3
+
+
+def test_scrape_worker_retries_partial_pages(monkeypatch, stub_server):
+    attempts = []
+
+    def flakyScrape(driver, url, my_role, champ, tables):
+        attempts.append(url)
+        # The first load of every page comes back before its cells rendered
+        assert attempts.count(url) > 1, "partial page"
+        return stubScrape(driver, url, my_role, champ, tables)
+
+    stats, tables, drivers = runWorker(monkeypatch, stub_server, ["champaa", "champab"], 1, flakyScrape)
+
+    assert stats["scraped"] == 2 and len(attempts) == 4
+    # A partial page is retried on the same driver
+    assert len(drivers) == 1
+
+
+def test_scrape_worker_fails_only_the_broken_page(monkeypatch, stub_server):
+    def brokenScrape(driver, url, my_role, champ, tables):
+        if champ == "champab":
+            # What a malformed cell does to the parser
+            raise ValueError("could not convert string to float: '-'")
+        return stubScrape(driver, url, my_role, champ, tables)
+
+    stats, tables, _ = runWorker(monkeypatch, stub_server, ["champaa", "champab", "champac"], 2, brokenScrape)
+
+    assert stats["scraped"] == 2 and stats["failed"] == 1
+    assert set(tables) == {("middle", "champaa"), ("middle", "champac")}
+
+
+def test_scrape_worker_survives_driver_teardown_errors(monkeypatch, stub_server):
+    stub, _ = stub_server
+    stub.fail_rate = 0.5
+
+    def quit(self):
+        raise WebDriverException("chrome not reachable")
+
+    monkeypatch.setattr(FakeDriver, "quit", quit)
+    champs = ["champaa", "champab", "champac"]
+    stats, tables, drivers = runWorker(monkeypatch, stub_server, champs, retries=8)
+
+    assert stats["scraped"] == len(champs) and len(drivers) > 1
@@ -0,0 +1,54 @@
+import json
+import pytest
+import analysis
+import server
+
+
+@pytest.mark.parametrize(
+    "values, pct, expected",
+    [
+        (range(1, 11), 50, 5),
+        (range(1, 11), 90, 9),
+        (range(1, 11), 100, 10),
+        (range(1, 101), 99, 99),
+        (range(1, 101), 1, 1),
+        ([7], 50, 7),
+        ([], 99, 0.0),
+    ],
+)
+def test_percentile_is_nearest_rank(values, pct, expected):
+    assert server.percentile(sorted(values), pct) == expected
+
+
+def bestPick(draft):
+    return server.route("POST", "/best-pick", json.dumps(draft).encode("utf-8"))
+
+
+@pytest.mark.parametrize(
+    "draft",
+    [
+        {"my_role": "middle", "enemy_team": {"top": None}},
+        {"my_role": "middle", "enemy_team": ["zed"]},
+        {"my_role": "middle", "ally_team": {"mid": "lux"}},
+        {"my_role": "middle", "bans": "zed"},
+        {"my_role": "middle", "bans": [1]},
+        ["middle"],
+    ],
+)
+def test_malformed_drafts_are_client_errors(draft):
+    status, response = bestPick(draft)
+    assert status == 400 and "error" in response
+
+
+def test_missing_data_is_unavailable(data_root):
+    status, response = bestPick({"my_role": "middle"})
+    assert status == 503 and "cli.py update" in response["error"]
+
+
+def test_unexpected_errors_are_json_500s(monkeypatch):
+    def broken(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(analysis, "loadPoolTables", broken)
+    status, response = bestPick({"my_role": "middle"})
+    assert status == 500 and response == {"error": "internal error: RuntimeError"}
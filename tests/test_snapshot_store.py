@@ -0,0 +1,147 @@
+import os
+from datetime import datetime
+import numpy as np
+import pytest
+import analysis
+from config import config
+from data_store import ChampTable, writeStore
+from manifest import Manifest
+from snapshot_store import MAX_DELTA_CHAIN, SnapshotStore, snapshotTables, tableHash
+from util import stat_types
+from conftest import stubTables
+
+DAY = 86400
+START = 1.7e9
+KEY = ("middle", "champaa")
+
+
+def changedTable(table: ChampTable, rows: list[int]):
+    """A copy of table with one more game in each of rows"""
+    stats = {stat: values.copy() for stat, values in table.stats.items()}
+    stats["games"][rows] += 1
+    return ChampTable(table.roles.copy(), table.champs.copy(), stats)
+
+
+@pytest.fixture
+def table():
+    return ChampTable.fromDataFrame(stubTables("matchups", "middle", ["champaa"])[KEY])
+
+
+def recordHistory(store: SnapshotStore, table: ChampTable, patches: list[str]):
+    """Snapshots table once per patch, a day apart, with a row changed each time"""
+    tables = []
+    for num, patch in enumerate(patches):
+        table = changedTable(table, [num]) if num else table
+        store.record("matchups", {KEY: table}, {KEY: patch}, START + num * DAY)
+        tables.append(table)
+    return tables
+
+
+def test_record_and_read_as_of(data_root, table):
+    store = SnapshotStore.load()
+    tables = recordHistory(store, table, ["14.1", "14.2", "14.10"])
+    # The same table on the same patch adds nothing
+    assert store.record("matchups", {KEY: tables[-1]}, {KEY: "14.10"}, START + 5 * DAY) == 0
+
+    store = SnapshotStore.load()
+    assert len(store.history[("matchups",) + KEY]) == 3
+    assert tableHash(store.table("matchups", *KEY, "14.1")) == tableHash(tables[0])
+    assert tableHash(store.table("matchups", *KEY, "14.9")) == tableHash(tables[1])
+    assert tableHash(store.table("matchups", *KEY, "14.10")) == tableHash(tables[2])
+    day_two = datetime.fromtimestamp(START + DAY).strftime("%Y-%m-%d")
+    assert tableHash(store.table("matchups", *KEY, day_two)) == tableHash(tables[1])
+    assert len(store.table("matchups", *KEY, "13.24")) == 0
+
+
+def test_objects_are_row_deltas(data_root, table):
+    store = SnapshotStore.load()
+    patches = [f"14.{num}" for num in range(1, MAX_DELTA_CHAIN + 3)]
+    tables = recordHistory(store, table, patches)
+
+    entries = store.history[("matchups",) + KEY]
+    depths = [store._objectDepth(entry["hash"]) for entry in entries]
+    assert depths == [num % MAX_DELTA_CHAIN for num in range(len(patches))]
+    for entry, depth in zip(entries, depths):
+        with np.load(store.objectPath(entry["hash"])) as columns:
+            # Only the one changed row in a delta, every row in a whole table
+            assert len(columns["champs"]) == (1 if depth else len(table))
+
+    store = SnapshotStore.load()
+    for patch, expected in zip(patches, tables):
+        assert tableHash(store.table("matchups", *KEY, patch)) == tableHash(expected)
+
+
+def test_changes_between_points(data_root, table):
+    store = SnapshotStore.load()
+    recordHistory(store, table, ["14.1", "14.2", "14.3"])
+
+    found = store.changes("matchups", *KEY, "14.1", "14.3")
+    assert found["added"] == [] and found["removed"] == []
+    assert len(found["changed"]) == 2
+    assert all(set(changed) == {"role", "champ", "games"} for changed in found["changed"])
+    before, after = found["changed"][0]["games"]
+    assert after == before + 1
+
+    found = store.changes("matchups", *KEY, "13.1", "14.1")
+    assert len(found["added"]) == len(table) and found["changed"] == []
+
+
+def test_compact_keeps_the_last_snapshot_per_patch(data_root, table):
+    store = SnapshotStore.load()
+    tables = recordHistory(store, table, ["14.1", "14.1", "14.1", "14.2", "14.2"])
+
+    removed = store.compact(older_than_days=1, now=START + 30 * DAY)
+    assert removed["entries"] == 3 and removed["objects"] > 0
+
+    store = SnapshotStore.load()
+    assert [entry["patch"] for entry in store.history[("matchups",) + KEY]] == ["14.1", "14.2"]
+    assert tableHash(store.table("matchups", *KEY, "14.1")) == tableHash(tables[2])
+    assert tableHash(store.table("matchups", *KEY, "14.2")) == tableHash(tables[4])
+    referenced = {entry["hash"] + ".npz" for entry in store.history[("matchups",) + KEY]}
+    objects = {name for _, _, names in os.walk(data_root / "snapshots" / "objects") for name in names}
+    assert objects == referenced
+
+
+def test_compact_spares_recent_snapshots(data_root, table):
+    store = SnapshotStore.load()
+    recordHistory(store, table, ["14.1", "14.1", "14.1"])
+
+    assert store.compact(older_than_days=30, now=START + 3 * DAY)["entries"] == 0
+    assert len(SnapshotStore.load().history[("matchups",) + KEY]) == 3
+
+
+def test_snapshot_tables_tags_the_manifest_patch(data_root, monkeypatch):
+    tables = stubTables("synergies", "middle", ["champaa"])
+    manifest = Manifest.load()
+    manifest.recordScrape("middle", "champaa", "synergies", "h", "14.3")
+    assert snapshotTables("synergies", tables, manifest, START) == 1
+    assert SnapshotStore.load().history[("synergies", "middle", "champaa")][0]["patch"] == "14.3"
+
+    monkeypatch.setitem(config, "snapshots", False)
+    assert snapshotTables("synergies", tables, manifest, START + DAY) == 0
+
+
+def test_as_of_without_snapshots_raises(data_root):
+    pool = {"middle": ["champaa", "champab"]}
+    for kind in ["matchups", "synergies"]:
+        tables = stubTables(kind, "middle", pool["middle"])
+        writeStore(kind, tables)
+        snapshotTables(kind, tables, None, START)
+
+    assert len(analysis.loadPoolTables(pool, "2099-01-01")["matchups"][("middle", "champaa")]) > 0
+    with pytest.raises(ValueError, match="No matchups snapshots tagged with a patch ≤ 14.1"):
+        analysis.loadPoolTables(pool, "14.1")
+    with pytest.raises(ValueError, match="taken on or before 2000-01-01"):
+        analysis.loadPoolTables(pool, "2000-01-01")
+
+
+def test_stats_survive_a_round_trip(data_root, table):
+    table.stats["wr"][0] = np.nan
+    store = SnapshotStore.load()
+    store.record("matchups", {KEY: table}, {KEY: "14.1"}, START)
+    store.record("matchups", {KEY: changedTable(table, [1])}, {KEY: "14.2"}, START + DAY)
+
+    read = SnapshotStore.load().table("matchups", *KEY, "14.2")
+    assert np.isnan(read.stats["wr"][0])
+    for stat in stat_types:
+        assert read.stats[stat].dtype == table.stats[stat].dtype
@@ -1,10 +1,5 @@
-import global_logger
+import cli
 
-global_logger.init()
-
-import web_scraping
-import parse_lolalytics
-from util import champ_pool
-
-web_scraping.fetchLolalytics(champ_pool, force=bool(0))
-parse_lolalytics.parseLolalytics(champ_pool)
+# Guarded so parse worker processes (spawned on Windows) don't re-run the update on import
+if __name__ == "__main__":
+    cli.main(["update"])
@@ -1,85 +1,108 @@
 from datetime import datetime, date, timedelta
 from global_logger import logger
+import logging
 from os import path
+from pathlib import Path
 import re
+from config import config
+
+ROLES = ["top", "jungle", "middle", "bottom", "support"]
+stat_types = ["wr", "delta1", "delta2", "pr", "games"]
+
+def cutoffTimestamp(num_days: int):
+    """Epoch seconds of midnight num_days ago, anything older is out of date"""
+    cutoff_date = date.today() - timedelta(days=num_days)
+    return datetime.combine(cutoff_date, datetime.min.time()).timestamp()
+
 
 def needsUpdate(filepath: str, num_days: int):
-    if not path.exists(filepath):
-        return True
-    else:
+    try:
         epoch_time = path.getmtime(filepath)
-        last_updated_date = datetime.fromtimestamp(epoch_time).date()
-        todays_date = date.today()
-        logger.debug(str(todays_date + timedelta(days=-(num_days)))
-            + " >=? " + str(last_updated_date) + " = " + str((todays_date + 
-            timedelta(days=-(4.5))) > last_updated_date))
-        if (todays_date + timedelta(days=-(num_days))) > last_updated_date:
-            return True
-        else:
-            return False
+    except OSError:
+        return True
+    needs_update = epoch_time < cutoffTimestamp(num_days)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{filepath} last updated {datetime.fromtimestamp(epoch_time)}, needs update: {needs_update}")
+    return needs_update
 
 
 def cleanString(string: str) -> str:
     alphabetical_regex = re.compile('[^a-z]')
     return alphabetical_regex.sub('', string.lower())
 
+def getDataRoot():
+    return Path(config["data_root"])
+
+
+_made_dirs: set[Path] = set()
+
+
+def ensureDir(directory: Path):
+    """Creates directory (and its parents) the first time it's asked for"""
+    if directory not in _made_dirs:
+        directory.mkdir(parents=True, exist_ok=True)
+        _made_dirs.add(directory)
+    return directory
+
+
 def getMatchupHTMLSavePath(role: str, champ: str):
-    return (
-        "C:\\dev\\repos\\Python\\Best_Matchup\\data\\"
-        + role
-        + "\\html\\"
-        + champ
-        + "_matchups.html"
-    )
+    return str(ensureDir(getDataRoot() / role / "html") / (champ + "_matchups.html"))
 
 
 def getSynergyHTMLSavePath(role: str, champ: str):
-    return (
-        "C:\\dev\\repos\\Python\\Best_Matchup\\data\\"
-        + role
-        + "\\html\\"
-        + champ
-        + "_synergies.html"
-    )
+    return str(ensureDir(getDataRoot() / role / "html") / (champ + "_synergies.html"))
 
 
 def getMatchupCSVPath(role: str, champ: str):
-    return (
-        "C:\\dev\\repos\\Python\\Best_Matchup\\data\\"
-        + role
-        + "\\matchups\\"
-        + champ
-        + ".csv"
-    )
+    return str(ensureDir(getDataRoot() / role / "matchups") / (champ + ".csv"))
 
 
 def getSynergyCSVPath(role: str, champ: str):
-    return (
-        "C:\\dev\\repos\\Python\\Best_Matchup\\data\\"
-        + role
-        + "\\synergies\\"
-        + champ
-        + ".csv"
-    )
-champ_pool: dict[str, list[str]]= {
-    "top":["illaoi", "malphite", "yone", "akshan"],
-    "jungle": [],
-    "middle": ["ahri", "yone", "akshan", "lissandra",],
-    "bottom": [],
-    "support": [],
-}
-# expanded_champ_pool: dict[str, list[str]]= {
-#     "top":["yone", "garen", "illaoi", "malphite", "akshan", "diana", "lissandra"],
-#     "jungle": [],
-#     "middle": ["orianna", "ahri", "yone", "akshan", "diana", "lissandra", "viktor"],
-#     "bottom": [],
-#     "support": [],
-# }
-# expanded_champ_pool: dict[str, list[str]]= {
-#     "top":["yone", "illaoi", "malphite", "akshan", "lissandra", "diana", "jax"],
-#     "jungle": ["kayn", "jax", "brand", "diana"],
-#     "middle": ["orianna", "ahri", "yone", "akshan", "diana", "lissandra", "viktor"],
-#     "bottom": [],
-#     "support": [],
-# }
-# champ_pool = expanded_champ_pool
\ No newline at end of file
+    return str(ensureDir(getDataRoot() / role / "synergies") / (champ + ".csv"))
+
+
+def getHTMLSavePath(role: str, champ: str, kind: str):
+    if kind == "matchups":
+        return getMatchupHTMLSavePath(role, champ)
+    return getSynergyHTMLSavePath(role, champ)
+
+
+def getCSVPath(kind: str, role: str, champ: str):
+    if kind == "matchups":
+        return getMatchupCSVPath(role, champ)
+    return getSynergyCSVPath(role, champ)
+
+
+def getMatchupCSVDir(role: str):
+    return str(ensureDir(getDataRoot() / role / "matchups"))
+
+
+def getSynergyCSVDir(role: str):
+    return str(ensureDir(getDataRoot() / role / "synergies"))
+
+
+def getStoreDir(kind: str):
+    return str(ensureDir(getDataRoot() / "store" / kind))
+
+
+def getManifestPath():
+    return str(ensureDir(getDataRoot()) / "manifest.json")
+
+
+def getSnapshotDir():
+    return str(ensureDir(getDataRoot() / "snapshots"))
+
+
+def getBrowserStatePath():
+    return str(ensureDir(getDataRoot()) / "browsers.json")
+
+
+def getBrowserProfileDir(port: int):
+    return str(ensureDir(getDataRoot() / "browsers" / str(port)))
+
+
+# Set in the config file (see config.py), not here
+champ_pool: dict[str, list[str]] = config["pool"]
+for pool_role in champ_pool:
+    if pool_role not in ROLES:
+        raise ValueError(f"Unknown role {pool_role!r} in the configured pool, expected one of {ROLES}")
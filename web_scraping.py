@@ -1,4 +1,4 @@
-from global_logger import logger
+from global_logger import logger, metrics
 from selenium import webdriver
 from bs4 import BeautifulSoup
 from selenium.webdriver import ChromeOptions
@@ -7,10 +7,22 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from webdriver_manager.chrome import ChromeDriverManager as chromeMgr
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import (
+    SessionNotCreatedException,
+    WebDriverException,
+    TimeoutException,
+    StaleElementReferenceException,
+)
+from concurrent.futures import ThreadPoolExecutor
 import time
+import pandas as pd
+import browser_pool
+from data_store import writeStore
+from manifest import Manifest, contentHash, printScrapePlan
+from parse_lolalytics import TableBuilder, writeCSVAtomic
+from snapshot_store import snapshotTables
 from util import (
-    needsUpdate,
     getMatchupHTMLSavePath,
     getSynergyHTMLSavePath,
     getSynergyCSVPath,
@@ -18,6 +30,13 @@ from util import (
     cleanString,
 )
 
+PANEL_CLASS = "CountersPanel_counters__U8zc5"
+CELL_CLASS = "Cell_cell__383UV"
+# Seconds to wait for a page's panels, and for new cells after each scroll drag that moved
+PAGE_LOAD_TIMEOUT = 15
+SCROLL_TIMEOUT = 1.5
+MAX_DRAGS = 7
+
 
 def getLolalyticsUrl(role: str, champ: str):
     return (
@@ -28,84 +47,455 @@ def getLolalyticsUrl(role: str, champ: str):
     )
 
 
+def createDriver(service: Service, headless: bool = False):
+    options = ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+        # Headless windows can't be maximized, and the scroll offsets assume a desktop width
+        options.add_argument("--window-size=1920,1080")
+    else:
+        options.add_argument("start-maximized")
+    options.add_experimental_option("excludeSwitches", ['enable-logging'])
+    return webdriver.Chrome(service=service, options=options)
+
+
+def openDriver(service: Service, headless: bool = False, port: int = None):
+    """
+    Attaches to the warm browser on port, or starts a new Chrome without one.
+      If the cached chromedriver can't start a session (e.g. Chrome updated
+      since it was installed), a fresh one is installed and tried once more.
+    """
+    if port is not None:
+        browser_pool.restartBrowser(port, headless)
+    try:
+        if port is None:
+            return createDriver(service, headless)
+        return browser_pool.attachDriver(service, port)
+    except SessionNotCreatedException as e:
+        logger.warning(f"{e.msg}: Installing chromedriver again")
+        service = Service(browser_pool.driverPath(refresh=True))
+        if port is None:
+            return createDriver(service, headless)
+        return browser_pool.attachDriver(service, port)
+
+
+def quitDriver(driver: WebDriver, worker_num: int):
+    """Quits a driver that may already be dead, without raising"""
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning(f"[worker {worker_num}] Couldn't quit the driver: {type(e).__name__}: {e}")
+
+
+def recycleTab(driver: WebDriver):
+    """
+    Opens a blank tab for the next url and closes the others, so no page
+      state (scroll position, the previous page's scripts) carries over
+    """
+    old_handles = driver.window_handles
+    driver.switch_to.new_window("tab")
+    new_handle = driver.current_window_handle
+    for handle in old_handles:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(new_handle)
+
+
+def freshActions(driver: WebDriver):
+    """
+    ActionChains for one url. Clearing the actions also releases any mouse
+      button a failed drag on the previous page left held down.
+    """
+    actions = ActionChains(driver)
+    actions.reset_actions()
+    return actions
+
+
+def scrapeUrl(driver: WebDriver, url: str, matchup_save_path: str, synergy_save_path: str):
+    """
+    Scrapes one champion page and saves its matchup and synergy HTML
+
+    Returns:
+      (dict[str, float]) seconds spent in each phase: load, matchups,
+          synergies, save
+    """
+    timings = {}
+    phase_start = time.perf_counter()
+
+    def endPhase(phase: str):
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[phase] = now - phase_start
+        phase_start = now
+
+    driver.get(url)
+    actions = freshActions(driver)
+    endPhase("load")
+
+    # scrapeMatchup/scrapeSynergy wait for their panels to render instead of a fixed sleep
+    matchups_html: str = scrapeMatchup(driver, actions)
+    endPhase("matchups")
+    synergies_html: str = scrapeSynergy(driver, actions)
+    endPhase("synergies")
+
+    matchup_soup = BeautifulSoup(matchups_html, "lxml")
+    with open(matchup_save_path, "w", encoding="utf-8") as file:
+        file.write(str(matchup_soup.prettify()))
+
+    synergy_soup = BeautifulSoup(synergies_html, "lxml")
+    with open(synergy_save_path, "w", encoding="utf-8") as file:
+        file.write(str(synergy_soup.prettify()))
+    endPhase("save")
+    return timings
+
+
+def scrapeUrlToTables(
+    driver: WebDriver,
+    url: str,
+    my_role: str,
+    champ: str,
+    tables: dict[str, dict[tuple[str, str], pd.DataFrame]],
+    debug_html: bool = False,
+):
+    """
+    In-memory variant of scrapeUrl: every panel snapshot is parsed into rows as
+      it is scraped (see parse_lolalytics.TableBuilder), then the matchup and
+      synergy CSVs are written directly and the DataFrames added to `tables`.
+      With debug_html the raw snapshots are also dumped to the usual HTML paths.
+
+    Returns:
+      (dict[str, float]) seconds spent in each phase: load, matchups,
+          synergies, save
+    """
+    timings = {}
+    phase_start = time.perf_counter()
+
+    def endPhase(phase: str):
+        nonlocal phase_start
+        now = time.perf_counter()
+        timings[phase] = now - phase_start
+        phase_start = now
+
+    builders = {"matchups": TableBuilder("matchups"), "synergies": TableBuilder("synergies")}
+    snapshots = {"matchups": [], "synergies": []}
+
+    def collector(kind: str):
+        def collect(html: str):
+            builders[kind].addHtml(html)
+            if debug_html:
+                snapshots[kind].append(html)
+
+        return collect
+
+    driver.get(url)
+    actions = freshActions(driver)
+    endPhase("load")
+
+    scrapeMatchup(driver, actions, collector("matchups"))
+    endPhase("matchups")
+    scrapeSynergy(driver, actions, collector("synergies"))
+    endPhase("synergies")
+
+    matchups_df = builders["matchups"].toDataFrame()
+    writeCSVAtomic(matchups_df, getMatchupCSVPath(my_role, champ))
+    synergies_df = builders["synergies"].toDataFrame()
+    writeCSVAtomic(synergies_df, getSynergyCSVPath(my_role, champ))
+    if debug_html:
+        with open(getMatchupHTMLSavePath(my_role, champ), "w", encoding="utf-8") as file:
+            file.write("".join(snapshots["matchups"]))
+        with open(getSynergyHTMLSavePath(my_role, champ), "w", encoding="utf-8") as file:
+            file.write("".join(snapshots["synergies"]))
+    tables["matchups"][(my_role, champ)] = matchups_df
+    tables["synergies"][(my_role, champ)] = synergies_df
+    endPhase("save")
+    return timings
+
+
+def scrapeWorker(
+    worker_num: int,
+    service: Service,
+    jobs: list[tuple],
+    headless: bool,
+    retries: int,
+    scrape=scrapeUrl,
+    port: int = None,
+):
+    """
+    Scrapes one shard of jobs with its own driver, retrying each url up to
+      `retries` more times, each attempt in a fresh tab. Each job is the
+      argument tuple for scrape after the driver, starting with the url:
+      (url, matchup_save_path, synergy_save_path) for scrapeUrl. With a port
+      the driver attaches to that warm browser (see browser_pool), which
+      stays running afterwards. Partial pages and driver errors are retried,
+      any other error (e.g. a malformed cell) fails only that url.
+
+    Returns:
+      (dict) worker number, pages scraped, pages failed, seconds taken and the
+          per phase timings of every scraped url
+    """
+    start = time.perf_counter()
+    scraped = 0
+    failed = 0
+    timings: dict[str, dict[str, float]] = {}
+    # Opened lazily, so a driver that fails to start fails the url rather than the worker
+    driver = None
+    try:
+        for job in jobs:
+            url = job[0]
+            for attempt in range(retries + 1):
+                logger.info(f"[worker {worker_num}] Scraping {url}")
+                try:
+                    if driver is None:
+                        driver = openDriver(service, headless, port)
+                    recycleTab(driver)
+                    timings[url] = scrape(driver, *job)
+                except AssertionError as e:
+                    logger.warning(f"[worker {worker_num}] {e}: Partial page for {url} (attempt {attempt + 1})")
+                    metrics.count("scrape.retries")
+                    continue
+                except WebDriverException as e:
+                    logger.warning(f"[worker {worker_num}] {e.msg}: Restarting driver for {url} (attempt {attempt + 1})")
+                    if driver is not None:
+                        quitDriver(driver, worker_num)
+                    driver = None
+                    metrics.count("scrape.retries")
+                    continue
+                except Exception as e:
+                    # Like http_fetch.fetchChampion: a bad page fails this champion, not the whole update
+                    logger.error(f"[worker {worker_num}] {type(e).__name__}: {e} for {url}")
+                    break
+                scraped += 1
+                metrics.count("scrape.champions")
+                metrics.observe("scrape.page", sum(timings[url].values()))
+                for phase, seconds in timings[url].items():
+                    metrics.observe("scrape." + phase, seconds)
+                logger.info(
+                    f"[worker {worker_num}] Successfully loaded {url} in "
+                    + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings[url].items())
+                )
+                break
+            if url not in timings:
+                failed += 1
+                metrics.count("scrape.failures")
+                logger.error(f"[worker {worker_num}] Failed to scrape data for {url}")
+    finally:
+        if driver is not None:
+            quitDriver(driver, worker_num)
+    return {
+        "worker": worker_num,
+        "scraped": scraped,
+        "failed": failed,
+        "seconds": time.perf_counter() - start,
+        "timings": timings,
+    }
+
+
 def webToHtmlFile(
     urls: list[str],
     matchup_save_paths: list[str],
     synergy_save_paths: list[str],
+    workers: int = 1,
+    headless: bool = False,
+    retries: int = 1,
+    warm: bool = False,
 ):
+    """
+    Scrapes every url with a pool of `workers` Chrome drivers, each taking
+      every workers-th url, on warm browsers if `warm`
+
+    Returns:
+      (list[dict]) per worker throughput, see scrapeWorker
+    """
     if len(urls) != len(matchup_save_paths) or len(urls) != len(
         synergy_save_paths
     ):
         print("webToHtmlFile: ERROR lists different sizes")
         exit(0)
- 
-    options = ChromeOptions()
-    options.add_argument("start-maximized")
-    options.add_experimental_option("excludeSwitches", ['enable-logging'])
 
-    service = Service(chromeMgr().install())
-    driver = webdriver.Chrome(service=service, options=options)
-    for index in range(len(urls)):
-        logger.info("Scraping " + urls[index])
-        driver.get(urls[index])
-        # sometimes driver.get moves too fast and pulls in the partially loaded webpage
-        time.sleep(2.5)  
-        actions = ActionChains(driver)
-
-        try:
-            matchups_html: str = scrapeMatchup(driver, actions)
-        except AssertionError as e:
-            logger.error(f"{e}: Failed to scrape data for {urls[index]}")
-            continue
-        matchup_soup = BeautifulSoup(matchups_html, "lxml")
-        with open(matchup_save_paths[index], "w", encoding="utf-8") as file:
-            file.write(str(matchup_soup.prettify()))
+    jobs = list(zip(urls, matchup_save_paths, synergy_save_paths))
+    return runScrapeWorkers(jobs, workers, headless, retries, scrapeUrl, warm)
 
-        synergies_html: str = scrapeSynergy(driver, actions)
-        synergy_soup = BeautifulSoup(synergies_html, "lxml")
 
-        with open(synergy_save_paths[index], "w", encoding="utf-8") as file:
-            file.write(str(synergy_soup.prettify()))
+def webToTables(
+    urls: list[str],
+    pool_keys: list[tuple[str, str]],
+    workers: int = 1,
+    headless: bool = False,
+    retries: int = 1,
+    debug_html: bool = False,
+    tables: dict[str, dict[tuple[str, str], pd.DataFrame]] = None,
+    warm: bool = False,
+):
+    """
+    In-memory pipeline: scrapes every url straight into matchup/synergy CSVs
+      and the columnar store, with no HTML written unless debug_html is set
 
-        logger.info("Successfully loaded " + urls[index])
+    Parameters:
+      urls (list[str]): champion pages to scrape
+      pool_keys (list[tuple[str, str]]): (my_role, champ) of each url
+      tables (dict): filled with the scraped DataFrames per kind, keyed by
+          (my_role, champ)
+      warm (bool): scrape on the warm browsers, see browser_pool
 
-    driver.close()
-    driver.quit()
+    Returns:
+      (list[dict]) per worker throughput, see scrapeWorker
+    """
+    if tables is None:
+        tables = {"matchups": {}, "synergies": {}}
+    jobs = [
+        (url, my_role, champ, tables, debug_html) for url, (my_role, champ) in zip(urls, pool_keys)
+    ]
+    worker_stats = runScrapeWorkers(jobs, workers, headless, retries, scrapeUrlToTables, warm)
+    for kind, kind_tables in tables.items():
+        if kind_tables:
+            writeStore(kind, kind_tables)
+    return worker_stats
+
+
+def runScrapeWorkers(
+    jobs: list[tuple], workers: int, headless: bool, retries: int, scrape, warm: bool = False
+):
+    # Look the driver up once up front rather than racing one download per worker
+    service_path = browser_pool.driverPath()
+    workers = max(1, min(workers, len(jobs)))
+    shards = [jobs[worker_num::workers] for worker_num in range(workers)]
+    ports = browser_pool.ensureBrowsers(workers, headless) if warm else [None] * workers
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                scrapeWorker,
+                worker_num,
+                Service(service_path),
+                shard,
+                headless,
+                retries,
+                scrape,
+                ports[worker_num],
+            )
+            for worker_num, shard in enumerate(shards)
+        ]
+        worker_stats = [future.result() for future in futures]
+
+    for stats in worker_stats:
+        logger.info(
+            f"[worker {stats['worker']}] {stats['scraped']} scraped, {stats['failed']} failed in "
+            + f"{stats['seconds']:.1f}s ({stats['scraped'] / max(stats['seconds'], 1e-9) * 60:.1f} pages/min)"
+        )
+    return worker_stats
+
+
+def findLoadedPanels(driver: WebDriver, count: int):
+    """
+    Wait condition: the counter panels once exactly `count` are on the page
+      and every one of them has rendered its cells, False otherwise
+    """
+    elements: list[WebElement] = driver.find_elements(By.CLASS_NAME, PANEL_CLASS)
+    if len(elements) != count:
+        return False
+    for element in elements:
+        if not element.find_elements(By.CLASS_NAME, CELL_CLASS):
+            return False
+    return elements
+
+
+def waitForPanels(driver: WebDriver, count: int):
+    try:
+        return WebDriverWait(
+            driver, PAGE_LOAD_TIMEOUT, ignored_exceptions=[StaleElementReferenceException]
+        ).until(lambda driver: findLoadedPanels(driver, count))
+    except TimeoutException:
+        elements = driver.find_elements(By.CLASS_NAME, PANEL_CLASS)
+        # Fail the same way a wrong panel count always has, so callers can retry the page
+        assert len(elements) == count, f"Expected {count} panels, found {len(elements)}"
+        raise AssertionError("Panels never finished rendering their cells")
+
+
+def renderedChamps(driver: WebDriver, element: WebElement):
+    """Names of the champions whose cells are currently rendered in a panel (one round trip)"""
+    return set(
+        driver.execute_script(
+            "return Array.from(arguments[0].querySelectorAll(arguments[1]), img => img.alt);",
+            element,
+            "." + CELL_CLASS + " img[alt]",
+        )
+    )
 
 
-def scrapeMatchup(driver: WebDriver, actions):
-    # Find all Counters panels (We expect 5)
-    elements: list[WebElement] = driver.find_elements(
-        By.CLASS_NAME, "CountersPanel_counters__U8zc5"
+def scrollPosition(driver: WebDriver, scroller: WebElement):
+    """
+    Returns:
+      (tuple[float, float, float]) scrollLeft, clientWidth and scrollWidth
+          of the scrollable element
+    """
+    return tuple(
+        driver.execute_script(
+            "return [arguments[0].scrollLeft, arguments[0].clientWidth, arguments[0].scrollWidth];", scroller
+        )
     )
-    assert len(elements) == 5
 
-    # Initialize our HTML string that will store all our scraped data
-    html: str = ""
+
+def scrapePanel(driver: WebDriver, element: WebElement, actions, move_offset: int, collect):
+    """
+    Drags a panel's scrollbar by move_offset until it reaches the end of the
+      panel, passing the panel's HTML to collect() initially and after every
+      drag that revealed new cells. Only a drag that moved the scroller waits
+      for new cells, so the end of a panel costs no timeout.
+    """
+    # Move web page to the current counter panel
+    actions.move_to_element(element).perform()
+
+    # Get the scrollbar element in the panel so we can scroll right to get all the data
+    scrollbar = element.find_element(By.CLASS_NAME, "Panel_data__dtE8F")
+
+    # Get the add the initial scroll position to the final html
+    collect(element.get_attribute("innerHTML"))
+    seen = renderedChamps(driver, element)
+    scroll_left, client_width, scroll_width = scrollPosition(driver, scrollbar)
+    if scroll_width <= client_width:
+        # Everything fits, there's nothing to scroll to
+        return
+
+    for rep in range(0, MAX_DRAGS):
+        actions.click_and_hold(scrollbar).move_by_offset(
+            move_offset, 0
+        ).release().perform()
+        # A drag that doesn't move the scroller is already at the end of the panel
+        previous_left = scroll_left
+        scroll_left = scrollPosition(driver, scrollbar)[0]
+        if scroll_left == previous_left:
+            break
+        try:
+            WebDriverWait(
+                driver, SCROLL_TIMEOUT, ignored_exceptions=[StaleElementReferenceException]
+            ).until(lambda driver: renderedChamps(driver, element) - seen)
+        except TimeoutException:
+            # Nothing new rendered, we've scrolled to the end of the panel
+            break
+        collect(element.get_attribute("innerHTML"))
+        seen |= renderedChamps(driver, element)
+        # scrollLeft counts down from 0 in a right-to-left panel, so compare its distance from the start
+        if abs(scroll_left) + client_width >= scroll_width - 1:
+            break
+
+
+def scrapeMatchup(driver: WebDriver, actions, collect=None):
+    # Wait for all Counters panels (We expect 5) to render
+    elements: list[WebElement] = waitForPanels(driver, 5)
+
+    # Without a collector, keep every snapshot and return them as one HTML string
+    snapshots: list[str] = []
+    if collect is None:
+        collect = snapshots.append
 
     # Loop through the counter panels on the site corresponding to each role
     for element in elements:
-        # Move web page to the current counter panel
-        actions.move_to_element(element).perform()
+        scrapePanel(driver, element, actions, -900, collect)
 
-        # Get the scrollbar element in the panel so we can scroll right to get all the data
-        scrollbar = element.find_element(By.CLASS_NAME, "Panel_data__dtE8F")
+    return "".join(snapshots)
 
-        # Get the add the initial scroll position to the final html
-        html += element.get_attribute("innerHTML")
 
-        # Move by right by 900 pixels 5 times, appending the html each time to scrape all the matchup data
-        move_offset = -900
-        for rep in range(0, 7):
-            actions.click_and_hold(scrollbar).move_by_offset(
-                move_offset, 0
-            ).release().perform()
-            html += element.get_attribute("innerHTML")
-
-    return html
-
-
-def scrapeSynergy(driver: WebDriver, actions):
+def scrapeSynergy(driver: WebDriver, actions, collect=None):
     # Find the Table of buttons that controls the Counters and Synergies Section, Move into View
     buttonTable: WebElement = driver.find_element(
         By.CLASS_NAME, "CounterButtons_set__99iaF"
@@ -115,37 +505,31 @@ def scrapeSynergy(driver: WebDriver, actions):
     # Click the "Common Teammates" button to switch the page to display synergies
     buttonTable.find_element(By.CSS_SELECTOR, "[data-id='4']").click()
 
-    # Find all Synergy panels (We expect 4)
-    elements: list[WebElement] = driver.find_elements(
-        By.CLASS_NAME, "CountersPanel_counters__U8zc5"
-    )
-    assert len(elements) == 4
+    # Wait for the page to switch to the Synergy panels (We expect 4)
+    elements: list[WebElement] = waitForPanels(driver, 4)
 
-    # Initialize our HTML string that will store all our scraped data
-    html: str = ""
+    # Without a collector, keep every snapshot and return them as one HTML string
+    snapshots: list[str] = []
+    if collect is None:
+        collect = snapshots.append
 
     # Loop through the synergy panels on the site corresponding to each role (besides our own)
     for element in elements:
-        # Move web page to the current counter panel
-        actions.move_to_element(element).perform()
-
-        # Get the scrollbar element in the panel so we can scroll right to get all the data
-        scrollbar = element.find_element(By.CLASS_NAME, "Panel_data__dtE8F")
-
-        # Get the add the initial scroll position to the final html
-        html += element.get_attribute("innerHTML")
-
-        # Move by right by 900 pixels 5 times, appending the html each time to scrape all the matchup data
-        move_offset = 900
-        for rep in range(0, 7):
-            actions.click_and_hold(scrollbar).move_by_offset(
-                move_offset, 0
-            ).release().perform()
-            html += element.get_attribute("innerHTML")
-    return html
-
-
-def fetchLolalytics(pool: dict[str, list[str]], force: bool = False):
+        scrapePanel(driver, element, actions, 900, collect)
+    return "".join(snapshots)
+
+
+def fetchLolalytics(
+    pool: dict[str, list[str]],
+    force: bool = False,
+    workers: int = 1,
+    headless: bool = False,
+    in_memory: bool = False,
+    debug_html: bool = False,
+    manifest: Manifest = None,
+    patch: str = None,
+    warm: bool = False,
+):
     """
     Fetches matchup stats for all given champsions and saves the matchup data
       per champion
@@ -153,39 +537,60 @@ def fetchLolalytics(pool: dict[str, list[str]], force: bool = False):
     Parameters:
       champions (list[str]): List of strings of champion names that will have
           their matchup stats fetched from lolalytics.com and saved
+      workers (int): number of Chrome drivers scraping in parallel
+      headless (bool): run the drivers without a visible window
+      in_memory (bool): parse cells while scraping and write the CSVs and store
+          directly, skipping the HTML files and parse_lolalytics
+      debug_html (bool): with in_memory, still dump the raw HTML per champion
+      manifest (Manifest): already loaded manifest, read from disk if None
+      patch (str): game patch being scraped, recorded in the manifest
+      warm (bool): attach to browsers left running between runs (started if
+          missing) instead of starting a Chrome per worker
 
     Returns:
       (None)
     """
     print("\nScraping updated matchup data from Lolalytics\n" + ("*" * 80))
+    if manifest is None:
+        manifest = Manifest.load()
+    stale = manifest.planScrapes(pool, force)
+    # The whole plan is printed before a browser is started
+    printScrapePlan(pool, stale)
     urls = []
-    matchup_csvs = []
-    synergies_csvs = []
-    for my_role, champs in pool.items():
-        for champ in champs:
-            matchups_path = getMatchupHTMLSavePath(my_role, champ)
-            synergies_path = getSynergyHTMLSavePath(my_role, champ)
-            if (
-                needsUpdate(getMatchupCSVPath(my_role, champ), 3)
-                or needsUpdate(getSynergyCSVPath(my_role, champ), 3)
-                or force
-            ):
-                # Fix up the string to be all lower no apostophes
-                cleanString(champ)
-                champion_url = getLolalyticsUrl(my_role, champ)
-                urls.append(champion_url)
-                matchup_csvs.append(matchups_path)
-                synergies_csvs.append(synergies_path)
-            else:
-                print(
-                    "Matchup & Synergy data for "
-                    + champ.capitalize()
-                    + " "
-                    + my_role
-                    + " is already up-to-date"
-                )
-
-    if len(urls) != 0:
-        webToHtmlFile(urls, matchup_csvs, synergies_csvs)
+    pool_keys = []
+    for my_role, champ in stale:
+        # Fix up the string to be all lower no apostophes
+        cleanString(champ)
+        urls.append(getLolalyticsUrl(my_role, champ))
+        pool_keys.append((my_role, champ))
+
+    if len(urls) != 0 and in_memory:
+        tables = {"matchups": {}, "synergies": {}}
+        webToTables(urls, pool_keys, workers, headless, debug_html=debug_html, tables=tables, warm=warm)
+        for kind, kind_tables in tables.items():
+            for (my_role, champ), df in kind_tables.items():
+                # No HTML to hash, so the parsed table stands in for it
+                table_hash = contentHash(df.to_csv().encode("utf-8"))
+                manifest.recordScrape(my_role, champ, kind, table_hash, patch)
+                manifest.recordParse(my_role, champ, kind, len(df), table_hash)
+            if kind_tables:
+                snapshotTables(kind, kind_tables, manifest)
+        manifest.save()
+    elif len(urls) != 0:
+        matchup_paths = [getMatchupHTMLSavePath(my_role, champ) for my_role, champ in pool_keys]
+        synergy_paths = [getSynergyHTMLSavePath(my_role, champ) for my_role, champ in pool_keys]
+        worker_stats = webToHtmlFile(urls, matchup_paths, synergy_paths, workers, headless, warm=warm)
+        scraped_urls = set()
+        for stats in worker_stats:
+            scraped_urls.update(stats["timings"])
+        for url, (my_role, champ), matchup_path, synergy_path in zip(
+            urls, pool_keys, matchup_paths, synergy_paths
+        ):
+            if url not in scraped_urls:
+                continue
+            for kind, html_path in (("matchups", matchup_path), ("synergies", synergy_path)):
+                with open(html_path, "rb") as file:
+                    manifest.recordScrape(my_role, champ, kind, contentHash(file.read()), patch)
+        manifest.save()
 
     print("\nScraping complete.\n")